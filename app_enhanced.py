@@ -5,7 +5,7 @@ from datetime import time as datetime_time
 from utils.supabase_client import get_db
 from utils.auth import AuthManager
 from utils.llm_generator import NewsletterGenerator
-from utils.content_aggregator import ContentAggregator
+from utils.content_aggregator import ContentAggregator, TrendDetector as TopicDetector
 from utils.trend_detector import TrendDetector
 from utils.delivery_scheduler import DeliveryScheduler
 from utils.scheduler import init_scheduler
@@ -1169,14 +1169,27 @@ elif page == "Generate Newsletter":
 
                 # Detect trending topics if enabled
                 trending_data = None
+                topics = []
                 if include_trends and aggregated_content:
-                    trend_detector = TrendDetector(db if db.is_configured() else None)
+                    trend_detector = TrendDetector(
+                        db if db.is_configured() else None,
+                        user_id=st.session_state.get('user_id')
+                    )
+                    custom_keywords = []
+                    if db.is_configured() and st.session_state.get('user_id'):
+                        trend_settings = db.get_user_trend_settings(st.session_state.user_id)
+                        custom_keywords = (trend_settings or {}).get('custom_keywords') or []
                     trending_data = trend_detector.get_trending_topics(
                         aggregated_content,
                         include_spikes=True,
-                        top_n=5
+                        top_n=5,
+                        custom_keywords=custom_keywords
                     )
 
+                    # Cluster co-occurring keywords across sources into topics
+                    topic_detector = TopicDetector()
+                    topics = topic_detector.detect_topics(topic_detector.group_by_source(aggregated_content))
+
                 # Generate newsletter using AI
                 content = generator.generate_newsletter(
                     content_items=aggregated_content,
@@ -1186,6 +1199,10 @@ elif page == "Generate Newsletter":
                     include_trends=include_trends
                 )
 
+                # Prepend emerging topics section if available
+                if topics:
+                    content = topic_detector.format_topics_for_newsletter(topics) + content
+
                 # Prepend trending topics section if available
                 if trending_data and trending_data.get('trending_keywords'):
                     trends_section = trend_detector.format_trends_for_newsletter(trending_data, max_trends=5)
@@ -1332,21 +1349,36 @@ elif page == "Generate Newsletter":
                                                 from_email=from_email
                                             )
 
-                                        if result['success']:
+                                        # Recipients who got it, even if others failed
+                                        if 'results' in result:
+                                            sent_emails = [r['email'] for r in result['results'] if r['success']]
+                                        else:
+                                            sent_emails = emails_list if result['success'] else []
+
+                                        if sent_emails and db.is_configured():
                                             # Log email send to database
-                                            if db.is_configured():
-                                                db.log_email_send(
-                                                    st.session_state.user_id,
-                                                    draft_id,
-                                                    emails_list,
-                                                    email_subject,
-                                                    result.get('email_id')
-                                                )
+                                            db.log_email_send(
+                                                st.session_state.user_id,
+                                                draft_id,
+                                                sent_emails,
+                                                email_subject,
+                                                result.get('id')
+                                            )
+
+                                        if result['success']:
                                             st.success(f"✅ {result['message']}")
                                             st.balloons()
                                             st.session_state[f'show_email_form_{draft_id}'] = False
                                             time.sleep(2)
                                             st.rerun()
+                                        elif sent_emails:
+                                            failed = [r for r in result['results'] if not r['success']]
+                                            st.warning(
+                                                f"⚠️ Sent to {result['sent']} of {result['recipients']} recipient(s); "
+                                                f"{result['failed']} failed. Resend only to the failed addresses."
+                                            )
+                                            for recipient in failed:
+                                                st.caption(f"❌ {recipient['email']}: {recipient['error']}")
                                         else:
                                             st.error(f"❌ {result['message']}")
                                 else:
@@ -0,0 +1,267 @@
+-- Pre-generate scheduled newsletters for CreatorPulse
+-- Delivery rows are enqueued a lead window ahead of their delivery time;
+-- workers generate them while sending capacity is idle and store the result
+-- in scheduled_newsletters, so at the delivery minute they are only sent.
+--   pending -> generating -> ready -> sending -> sent / failed
+-- (cancelled if the user's schedule changes while the row is queued)
+-- Rows never pre-generated are still generated at send time.
+-- Run this in Supabase SQL Editor AFTER create_delivery_claims.sql
+
+ALTER TABLE public.scheduled_newsletters
+ADD COLUMN IF NOT EXISTS generated_at TIMESTAMP WITH TIME ZONE;
+
+ALTER TABLE public.scheduled_newsletters
+DROP CONSTRAINT IF EXISTS scheduled_newsletters_status_check;
+
+ALTER TABLE public.scheduled_newsletters
+ADD CONSTRAINT scheduled_newsletters_status_check
+CHECK (status IN ('pending', 'generating', 'ready', 'sending', 'sent', 'failed', 'cancelled'));
+
+DROP INDEX IF EXISTS idx_scheduled_newsletters_status;
+CREATE INDEX IF NOT EXISTS idx_scheduled_newsletters_status
+ON public.scheduled_newsletters(status, scheduled_for)
+WHERE status IN ('pending', 'generating', 'ready', 'sending');
+
+-- Claim deliveries to send: generated or not, due within p_send_ahead_seconds
+-- and past any retry backoff (or abandoned by a worker whose lease expired).
+-- Rows whose schedule changed after they were enqueued are cancelled.
+DROP FUNCTION IF EXISTS claim_deliveries(TEXT, INTEGER, INTEGER);
+CREATE OR REPLACE FUNCTION claim_deliveries(
+    p_worker TEXT,
+    p_limit INTEGER DEFAULT 10,
+    p_lease_seconds INTEGER DEFAULT 300,
+    p_send_ahead_seconds INTEGER DEFAULT 0
+)
+RETURNS TABLE (
+    id UUID,
+    user_id UUID,
+    scheduled_for TIMESTAMP WITH TIME ZONE,
+    attempts INTEGER,
+    title TEXT,
+    content TEXT,
+    delivery_time TIME,
+    delivery_timezone TEXT,
+    delivery_frequency TEXT,
+    delivery_recipients JSONB,
+    last_delivery_at TIMESTAMP WITH TIME ZONE
+) AS $$
+BEGIN
+    -- Drop queued deliveries whose schedule changed or was disabled after they were enqueued
+    UPDATE public.scheduled_newsletters s
+    SET status = 'cancelled',
+        claimed_by = NULL,
+        lease_expires_at = NULL,
+        error_message = 'Schedule changed after the delivery was queued',
+        updated_at = NOW()
+    FROM public.profiles p
+    WHERE p.id = s.user_id
+    AND (
+        s.status IN ('pending', 'ready')
+        OR (s.status IN ('generating', 'sending') AND s.lease_expires_at < NOW())
+    )
+    AND (NOT p.auto_delivery_enabled OR p.next_delivery_at IS DISTINCT FROM s.scheduled_for);
+
+    RETURN QUERY
+    WITH claimable AS (
+        SELECT s.id
+        FROM public.scheduled_newsletters s
+        JOIN public.profiles p ON p.id = s.user_id
+        WHERE p.auto_delivery_enabled = true
+        AND p.next_delivery_at = s.scheduled_for
+        AND (
+            (s.status = 'sending' AND s.lease_expires_at < NOW())
+            OR (
+                s.scheduled_for <= NOW() + make_interval(secs => p_send_ahead_seconds)
+                AND (s.next_attempt_at IS NULL OR s.next_attempt_at <= NOW())
+                AND (
+                    s.status IN ('pending', 'ready')
+                    OR (s.status = 'generating' AND s.lease_expires_at < NOW())
+                )
+            )
+        )
+        ORDER BY s.scheduled_for
+        LIMIT p_limit
+        FOR UPDATE OF s SKIP LOCKED
+    ),
+    claimed AS (
+        UPDATE public.scheduled_newsletters s
+        SET status = 'sending',
+            claimed_by = p_worker,
+            lease_expires_at = NOW() + make_interval(secs => p_lease_seconds),
+            attempts = COALESCE(s.attempts, 0) + 1,
+            updated_at = NOW()
+        FROM claimable
+        WHERE s.id = claimable.id
+        RETURNING s.*
+    )
+    SELECT
+        c.id,
+        c.user_id,
+        c.scheduled_for,
+        c.attempts,
+        c.title,
+        c.content,
+        p.delivery_time,
+        p.delivery_timezone,
+        p.delivery_frequency,
+        p.delivery_recipients,
+        p.last_delivery_at
+    FROM claimed c
+    JOIN public.profiles p ON p.id = c.user_id;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Claim deliveries to generate ahead of time, earliest first
+CREATE OR REPLACE FUNCTION claim_generation(
+    p_worker TEXT,
+    p_limit INTEGER DEFAULT 10,
+    p_lease_seconds INTEGER DEFAULT 300
+)
+RETURNS TABLE (
+    id UUID,
+    user_id UUID,
+    scheduled_for TIMESTAMP WITH TIME ZONE,
+    delivery_timezone TEXT
+) AS $$
+BEGIN
+    RETURN QUERY
+    WITH claimable AS (
+        SELECT s.id
+        FROM public.scheduled_newsletters s
+        JOIN public.profiles p ON p.id = s.user_id
+        WHERE p.auto_delivery_enabled = true
+        AND p.next_delivery_at = s.scheduled_for
+        AND s.scheduled_for > NOW()
+        AND (
+            (s.status = 'pending' AND s.error_message IS NULL)
+            OR (s.status = 'generating' AND s.lease_expires_at < NOW())
+        )
+        ORDER BY s.scheduled_for
+        LIMIT p_limit
+        FOR UPDATE OF s SKIP LOCKED
+    ),
+    claimed AS (
+        UPDATE public.scheduled_newsletters s
+        SET status = 'generating',
+            claimed_by = p_worker,
+            lease_expires_at = NOW() + make_interval(secs => p_lease_seconds),
+            updated_at = NOW()
+        FROM claimable
+        WHERE s.id = claimable.id
+        RETURNING s.*
+    )
+    SELECT c.id, c.user_id, c.scheduled_for, p.delivery_timezone
+    FROM claimed c
+    JOIN public.profiles p ON p.id = c.user_id;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Extend a send or generation claim; returns FALSE if the worker no longer holds it
+CREATE OR REPLACE FUNCTION heartbeat_delivery(
+    p_id UUID,
+    p_worker TEXT,
+    p_lease_seconds INTEGER DEFAULT 300
+)
+RETURNS BOOLEAN AS $$
+BEGIN
+    UPDATE public.scheduled_newsletters
+    SET lease_expires_at = NOW() + make_interval(secs => p_lease_seconds),
+        updated_at = NOW()
+    WHERE id = p_id
+    AND claimed_by = p_worker
+    AND status IN ('sending', 'generating');
+
+    RETURN FOUND;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Store a generated newsletter; returns FALSE if the worker no longer holds the claim
+CREATE OR REPLACE FUNCTION save_generated_newsletter(
+    p_id UUID,
+    p_worker TEXT,
+    p_title TEXT,
+    p_content TEXT
+)
+RETURNS BOOLEAN AS $$
+BEGIN
+    UPDATE public.scheduled_newsletters
+    SET status = 'ready',
+        title = p_title,
+        content = p_content,
+        generated_at = NOW(),
+        claimed_by = NULL,
+        lease_expires_at = NULL,
+        updated_at = NOW()
+    WHERE id = p_id
+    AND claimed_by = p_worker
+    AND status = 'generating';
+
+    RETURN FOUND;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Give up pre-generating a delivery; it is generated at send time instead
+CREATE OR REPLACE FUNCTION release_generation(
+    p_id UUID,
+    p_worker TEXT,
+    p_error TEXT
+)
+RETURNS BOOLEAN AS $$
+BEGIN
+    UPDATE public.scheduled_newsletters
+    SET status = 'pending',
+        error_message = p_error,
+        claimed_by = NULL,
+        lease_expires_at = NULL,
+        updated_at = NOW()
+    WHERE id = p_id
+    AND claimed_by = p_worker
+    AND status = 'generating';
+
+    RETURN FOUND;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Failed sends of a pre-generated newsletter go back to 'ready', not 'pending'
+CREATE OR REPLACE FUNCTION fail_delivery(
+    p_id UUID,
+    p_worker TEXT,
+    p_error TEXT,
+    p_max_attempts INTEGER DEFAULT 3,
+    p_next_delivery_at TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_retry_seconds INTEGER DEFAULT 60
+)
+RETURNS TEXT AS $$
+DECLARE
+    v_user_id UUID;
+    v_status TEXT;
+BEGIN
+    UPDATE public.scheduled_newsletters
+    SET status = CASE
+            WHEN COALESCE(attempts, 0) >= p_max_attempts THEN 'failed'
+            WHEN generated_at IS NOT NULL THEN 'ready'
+            ELSE 'pending'
+        END,
+        next_attempt_at = NOW() + make_interval(
+            secs => LEAST(p_retry_seconds * POWER(2, GREATEST(COALESCE(attempts, 1) - 1, 0)), 3600)
+        ),
+        claimed_by = NULL,
+        lease_expires_at = NULL,
+        error_message = p_error,
+        updated_at = NOW()
+    WHERE id = p_id
+    AND claimed_by = p_worker
+    AND status = 'sending'
+    RETURNING user_id, status INTO v_user_id, v_status;
+
+    IF v_status = 'failed' AND p_next_delivery_at IS NOT NULL THEN
+        UPDATE public.profiles
+        SET next_delivery_at = p_next_delivery_at
+        WHERE id = v_user_id;
+    END IF;
+
+    RETURN v_status;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+COMMENT ON COLUMN public.scheduled_newsletters.generated_at IS 'When the newsletter was pre-generated (NULL if generated at send time)';
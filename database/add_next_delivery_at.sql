@@ -0,0 +1,63 @@
+-- Add precomputed next delivery time to CreatorPulse profiles
+-- The hourly delivery script reads only the users whose next_delivery_at falls
+-- inside its window, instead of loading every auto-delivery user and working
+-- out their schedule in Python.
+-- Run this in Supabase SQL Editor AFTER add_delivery_schedule.sql
+
+ALTER TABLE public.profiles
+ADD COLUMN IF NOT EXISTS next_delivery_at TIMESTAMP WITH TIME ZONE;
+
+-- Only enabled schedules are ever queried by due time
+CREATE INDEX IF NOT EXISTS idx_profiles_next_delivery
+ON public.profiles(next_delivery_at)
+WHERE auto_delivery_enabled = true;
+
+-- Users whose next delivery is due within p_window_minutes (or overdue).
+-- Rows without next_delivery_at (schedules saved before this migration) are
+-- returned too so the script can fill them in.
+CREATE OR REPLACE FUNCTION get_due_deliveries(p_window_minutes INTEGER DEFAULT 60)
+RETURNS TABLE (
+    user_id UUID,
+    delivery_time TIME,
+    delivery_timezone TEXT,
+    delivery_frequency TEXT,
+    delivery_recipients JSONB,
+    last_delivery_at TIMESTAMP WITH TIME ZONE,
+    next_delivery_at TIMESTAMP WITH TIME ZONE
+) AS $$
+BEGIN
+    RETURN QUERY
+    SELECT
+        p.id as user_id,
+        p.delivery_time,
+        p.delivery_timezone,
+        p.delivery_frequency,
+        p.delivery_recipients,
+        p.last_delivery_at,
+        p.next_delivery_at
+    FROM public.profiles p
+    WHERE p.auto_delivery_enabled = true
+    AND p.delivery_time IS NOT NULL
+    AND (
+        p.next_delivery_at <= NOW() + make_interval(mins => p_window_minutes)
+        OR p.next_delivery_at IS NULL
+    )
+    ORDER BY p.next_delivery_at NULLS FIRST;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Record a successful delivery and store the following delivery time
+CREATE OR REPLACE FUNCTION record_delivery(p_user_id UUID, p_next_delivery_at TIMESTAMP WITH TIME ZONE)
+RETURNS void AS $$
+BEGIN
+    UPDATE public.profiles
+    SET last_delivery_at = NOW(),
+        next_delivery_at = p_next_delivery_at
+    WHERE id = p_user_id;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+COMMENT ON COLUMN public.profiles.next_delivery_at IS 'Next scheduled delivery (UTC); maintained when the schedule is saved and after each delivery';
+
+GRANT EXECUTE ON FUNCTION get_due_deliveries(INTEGER) TO authenticated;
+GRANT EXECUTE ON FUNCTION record_delivery(UUID, TIMESTAMP WITH TIME ZONE) TO authenticated;
@@ -0,0 +1,41 @@
+-- Make trending_content writes idempotent per day for CreatorPulse
+-- One row per (user, title, category, UTC day), so re-running the daily job
+-- (or triggering it manually) updates rows instead of duplicating them.
+-- Run this in Supabase SQL Editor AFTER create_trending_content.sql
+-- Requires PostgreSQL 15+ (UNIQUE NULLS NOT DISTINCT), which Supabase provides.
+
+-- Day the trend was discovered (UTC), part of the natural key
+ALTER TABLE public.trending_content
+ADD COLUMN IF NOT EXISTS discovered_on DATE DEFAULT ((NOW() AT TIME ZONE 'UTC')::date);
+
+UPDATE public.trending_content
+SET discovered_on = (discovered_at AT TIME ZONE 'UTC')::date
+WHERE discovered_on IS NULL OR discovered_on <> (discovered_at AT TIME ZONE 'UTC')::date;
+
+ALTER TABLE public.trending_content
+ALTER COLUMN discovered_on SET NOT NULL;
+
+-- Remove existing duplicates, keeping the most recent row of each day
+DELETE FROM public.trending_content
+WHERE id IN (
+    SELECT id FROM (
+        SELECT
+            id,
+            ROW_NUMBER() OVER (
+                PARTITION BY user_id, title, category, discovered_on
+                ORDER BY discovered_at DESC, created_at DESC
+            ) AS row_number
+        FROM public.trending_content
+    ) ranked
+    WHERE ranked.row_number > 1
+);
+
+-- Natural key used by bulk upserts (category may be NULL on old rows)
+ALTER TABLE public.trending_content
+DROP CONSTRAINT IF EXISTS unique_trending_content_per_day;
+
+ALTER TABLE public.trending_content
+ADD CONSTRAINT unique_trending_content_per_day
+    UNIQUE NULLS NOT DISTINCT (user_id, title, category, discovered_on);
+
+COMMENT ON COLUMN public.trending_content.discovered_on IS 'UTC day of discovery; with user_id, title and category forms the upsert key';
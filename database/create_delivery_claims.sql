@@ -0,0 +1,228 @@
+-- Claim-based delivery queue for CreatorPulse
+-- Due deliveries become rows in scheduled_newsletters; delivery workers claim
+-- them with a lease (FOR UPDATE SKIP LOCKED), renew the lease while working
+-- and complete or fail them, so any number of workers can run at once without
+-- claiming the same delivery twice. Delivery is at least once: a worker that
+-- dies between sending and complete_delivery leaves a claim that is sent
+-- again once its lease expires.
+-- Run this in Supabase SQL Editor AFTER add_next_delivery_at.sql
+
+ALTER TABLE public.scheduled_newsletters
+ADD COLUMN IF NOT EXISTS claimed_by TEXT,
+ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMP WITH TIME ZONE,
+ADD COLUMN IF NOT EXISTS attempts INTEGER DEFAULT 0,
+ADD COLUMN IF NOT EXISTS next_attempt_at TIMESTAMP WITH TIME ZONE;
+
+ALTER TABLE public.scheduled_newsletters
+DROP CONSTRAINT IF EXISTS scheduled_newsletters_status_check;
+
+ALTER TABLE public.scheduled_newsletters
+ADD CONSTRAINT scheduled_newsletters_status_check
+CHECK (status IN ('pending', 'sending', 'sent', 'failed', 'cancelled'));
+
+-- One delivery per user and slot, so enqueueing twice is harmless
+CREATE UNIQUE INDEX IF NOT EXISTS idx_scheduled_newsletters_user_slot
+ON public.scheduled_newsletters(user_id, scheduled_for);
+
+-- Create a delivery row for every user whose next delivery is due within the window
+CREATE OR REPLACE FUNCTION enqueue_due_deliveries(p_window_minutes INTEGER DEFAULT 60)
+RETURNS INTEGER AS $$
+DECLARE
+    v_count INTEGER;
+BEGIN
+    INSERT INTO public.scheduled_newsletters (user_id, title, content, scheduled_for, recipient_emails, status)
+    SELECT p.id, '', '', p.next_delivery_at, p.delivery_recipients, 'pending'
+    FROM public.profiles p
+    WHERE p.auto_delivery_enabled = true
+    AND p.next_delivery_at <= NOW() + make_interval(mins => p_window_minutes)
+    ON CONFLICT (user_id, scheduled_for) DO NOTHING;
+
+    GET DIAGNOSTICS v_count = ROW_COUNT;
+    RETURN v_count;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Claim up to p_limit pending deliveries (or ones whose worker's lease expired).
+-- Failed deliveries wait for next_attempt_at before they are retried. Rows
+-- whose user disabled delivery or moved their next delivery since they were
+-- enqueued are cancelled instead.
+-- Rows locked by another worker's claim are skipped, never waited on.
+CREATE OR REPLACE FUNCTION claim_deliveries(
+    p_worker TEXT,
+    p_limit INTEGER DEFAULT 10,
+    p_lease_seconds INTEGER DEFAULT 300
+)
+RETURNS TABLE (
+    id UUID,
+    user_id UUID,
+    scheduled_for TIMESTAMP WITH TIME ZONE,
+    attempts INTEGER,
+    title TEXT,
+    content TEXT,
+    delivery_time TIME,
+    delivery_timezone TEXT,
+    delivery_frequency TEXT,
+    delivery_recipients JSONB,
+    last_delivery_at TIMESTAMP WITH TIME ZONE
+) AS $$
+BEGIN
+    -- Drop queued deliveries whose schedule changed or was disabled after they were enqueued
+    UPDATE public.scheduled_newsletters s
+    SET status = 'cancelled',
+        claimed_by = NULL,
+        lease_expires_at = NULL,
+        error_message = 'Schedule changed after the delivery was queued',
+        updated_at = NOW()
+    FROM public.profiles p
+    WHERE p.id = s.user_id
+    AND (
+        s.status IN ('pending', 'ready')
+        OR (s.status IN ('generating', 'sending') AND s.lease_expires_at < NOW())
+    )
+    AND (NOT p.auto_delivery_enabled OR p.next_delivery_at IS DISTINCT FROM s.scheduled_for);
+
+    RETURN QUERY
+    WITH claimable AS (
+        SELECT s.id
+        FROM public.scheduled_newsletters s
+        JOIN public.profiles p ON p.id = s.user_id
+        WHERE p.auto_delivery_enabled = true
+        AND p.next_delivery_at = s.scheduled_for
+        AND (
+            (s.status = 'pending' AND (s.next_attempt_at IS NULL OR s.next_attempt_at <= NOW()))
+            OR (s.status = 'sending' AND s.lease_expires_at < NOW())
+        )
+        ORDER BY s.scheduled_for
+        LIMIT p_limit
+        FOR UPDATE OF s SKIP LOCKED
+    ),
+    claimed AS (
+        UPDATE public.scheduled_newsletters s
+        SET status = 'sending',
+            claimed_by = p_worker,
+            lease_expires_at = NOW() + make_interval(secs => p_lease_seconds),
+            attempts = COALESCE(s.attempts, 0) + 1,
+            updated_at = NOW()
+        FROM claimable
+        WHERE s.id = claimable.id
+        RETURNING s.*
+    )
+    SELECT
+        c.id,
+        c.user_id,
+        c.scheduled_for,
+        c.attempts,
+        c.title,
+        c.content,
+        p.delivery_time,
+        p.delivery_timezone,
+        p.delivery_frequency,
+        p.delivery_recipients,
+        p.last_delivery_at
+    FROM claimed c
+    JOIN public.profiles p ON p.id = c.user_id;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Extend a claim; returns FALSE if the worker no longer holds it
+CREATE OR REPLACE FUNCTION heartbeat_delivery(
+    p_id UUID,
+    p_worker TEXT,
+    p_lease_seconds INTEGER DEFAULT 300
+)
+RETURNS BOOLEAN AS $$
+BEGIN
+    UPDATE public.scheduled_newsletters
+    SET lease_expires_at = NOW() + make_interval(secs => p_lease_seconds),
+        updated_at = NOW()
+    WHERE id = p_id
+    AND claimed_by = p_worker
+    AND status = 'sending';
+
+    RETURN FOUND;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Mark a claimed delivery sent and advance the user's next delivery.
+-- Returns FALSE if the worker no longer holds the claim.
+CREATE OR REPLACE FUNCTION complete_delivery(
+    p_id UUID,
+    p_worker TEXT,
+    p_next_delivery_at TIMESTAMP WITH TIME ZONE
+)
+RETURNS BOOLEAN AS $$
+DECLARE
+    v_user_id UUID;
+BEGIN
+    UPDATE public.scheduled_newsletters
+    SET status = 'sent',
+        sent_at = NOW(),
+        lease_expires_at = NULL,
+        error_message = NULL,
+        updated_at = NOW()
+    WHERE id = p_id
+    AND claimed_by = p_worker
+    AND status = 'sending'
+    RETURNING user_id INTO v_user_id;
+
+    IF v_user_id IS NULL THEN
+        RETURN FALSE;
+    END IF;
+
+    UPDATE public.profiles
+    SET last_delivery_at = NOW(),
+        next_delivery_at = p_next_delivery_at
+    WHERE id = v_user_id;
+
+    RETURN TRUE;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Release a failed claim: back to pending for a retry after an exponential
+-- backoff (p_retry_seconds, doubled per attempt, at most an hour), or failed
+-- after p_max_attempts (then p_next_delivery_at, if given, moves the user on
+-- to their next slot). Returns the resulting status, or NULL if the worker no
+-- longer holds the claim.
+DROP FUNCTION IF EXISTS fail_delivery(UUID, TEXT, TEXT, INTEGER, TIMESTAMP WITH TIME ZONE);
+CREATE OR REPLACE FUNCTION fail_delivery(
+    p_id UUID,
+    p_worker TEXT,
+    p_error TEXT,
+    p_max_attempts INTEGER DEFAULT 3,
+    p_next_delivery_at TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_retry_seconds INTEGER DEFAULT 60
+)
+RETURNS TEXT AS $$
+DECLARE
+    v_user_id UUID;
+    v_status TEXT;
+BEGIN
+    UPDATE public.scheduled_newsletters
+    SET status = CASE WHEN COALESCE(attempts, 0) >= p_max_attempts THEN 'failed' ELSE 'pending' END,
+        next_attempt_at = NOW() + make_interval(
+            secs => LEAST(p_retry_seconds * POWER(2, GREATEST(COALESCE(attempts, 1) - 1, 0)), 3600)
+        ),
+        claimed_by = NULL,
+        lease_expires_at = NULL,
+        error_message = p_error,
+        updated_at = NOW()
+    WHERE id = p_id
+    AND claimed_by = p_worker
+    AND status = 'sending'
+    RETURNING user_id, status INTO v_user_id, v_status;
+
+    IF v_status = 'failed' AND p_next_delivery_at IS NOT NULL THEN
+        UPDATE public.profiles
+        SET next_delivery_at = p_next_delivery_at
+        WHERE id = v_user_id;
+    END IF;
+
+    RETURN v_status;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+COMMENT ON COLUMN public.scheduled_newsletters.claimed_by IS 'Delivery worker holding the claim';
+COMMENT ON COLUMN public.scheduled_newsletters.lease_expires_at IS 'When the claim lapses and another worker may take the delivery';
+COMMENT ON COLUMN public.scheduled_newsletters.attempts IS 'Number of times the delivery was claimed';
+COMMENT ON COLUMN public.scheduled_newsletters.next_attempt_at IS 'Earliest retry of a failed delivery';
+
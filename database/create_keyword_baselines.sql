@@ -0,0 +1,37 @@
+-- Create keyword_baselines table for streaming spike detection
+-- Stores one compact EWMA state row per user and keyword
+-- Run this in Supabase SQL Editor
+
+CREATE TABLE IF NOT EXISTS public.keyword_baselines (
+    user_id UUID REFERENCES public.profiles(id) ON DELETE CASCADE NOT NULL,
+    keyword TEXT NOT NULL,
+    mean DOUBLE PRECISION DEFAULT 0,          -- EWMA of per-day mention count
+    variance DOUBLE PRECISION DEFAULT 0,      -- EWMA variance of per-day mention count
+    periods INTEGER DEFAULT 0,                -- Completed days folded into the baseline
+    pending DOUBLE PRECISION DEFAULT 0,       -- Mention count for the current (open) day
+    period_index BIGINT DEFAULT 0,            -- Current day index (unix epoch // 86400)
+    last_seen DOUBLE PRECISION DEFAULT 0,     -- Unix timestamp of the last observation
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (user_id, keyword)
+);
+
+-- Enable Row Level Security
+ALTER TABLE public.keyword_baselines ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can view own keyword baselines"
+    ON public.keyword_baselines FOR SELECT
+    USING (auth.uid() = user_id);
+
+CREATE POLICY "Users can insert own keyword baselines"
+    ON public.keyword_baselines FOR INSERT
+    WITH CHECK (auth.uid() = user_id);
+
+CREATE POLICY "Users can update own keyword baselines"
+    ON public.keyword_baselines FOR UPDATE
+    USING (auth.uid() = user_id);
+
+CREATE POLICY "Users can delete own keyword baselines"
+    ON public.keyword_baselines FOR DELETE
+    USING (auth.uid() = user_id);
+
+COMMENT ON TABLE public.keyword_baselines IS 'Streaming EWMA baselines used for O(1) keyword spike detection';
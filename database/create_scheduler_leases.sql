@@ -0,0 +1,53 @@
+-- Create scheduler leader leases for CreatorPulse
+-- One row per lease; the process holding an unexpired lease is the only one
+-- that runs scheduled jobs. Leases are only touched through the functions below.
+-- Run this in Supabase SQL Editor
+
+CREATE TABLE IF NOT EXISTS public.scheduler_leases (
+    name TEXT PRIMARY KEY,
+    holder TEXT NOT NULL,
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Enable Row Level Security (no policies: access goes through SECURITY DEFINER functions)
+ALTER TABLE public.scheduler_leases ENABLE ROW LEVEL SECURITY;
+
+-- Acquire or renew a lease; returns TRUE if p_holder holds it afterwards
+CREATE OR REPLACE FUNCTION acquire_scheduler_lease(
+    p_name TEXT,
+    p_holder TEXT,
+    p_ttl_seconds INTEGER
+)
+RETURNS BOOLEAN AS $$
+DECLARE
+    v_holder TEXT;
+BEGIN
+    INSERT INTO public.scheduler_leases (name, holder, expires_at)
+    VALUES (p_name, p_holder, NOW() + make_interval(secs => p_ttl_seconds))
+    ON CONFLICT (name) DO UPDATE SET
+        holder = EXCLUDED.holder,
+        expires_at = EXCLUDED.expires_at,
+        updated_at = NOW()
+    WHERE scheduler_leases.holder = EXCLUDED.holder
+    OR scheduler_leases.expires_at < NOW()
+    RETURNING holder INTO v_holder;
+
+    RETURN COALESCE(v_holder = p_holder, FALSE);
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Release a lease held by p_holder so another process can take over immediately
+CREATE OR REPLACE FUNCTION release_scheduler_lease(
+    p_name TEXT,
+    p_holder TEXT
+)
+RETURNS void AS $$
+BEGIN
+    DELETE FROM public.scheduler_leases
+    WHERE name = p_name
+    AND holder = p_holder;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+COMMENT ON TABLE public.scheduler_leases IS 'Leader leases ensuring one process runs scheduled jobs';
@@ -0,0 +1,46 @@
+-- Create trend discovery run checkpoints for CreatorPulse
+-- One run per time slot and day, plus a day-wide run ('...:all') that every
+-- run records finished users in. Each user's outcome is recorded as the job
+-- progresses so a restarted or re-triggered run skips users that are already
+-- done.
+-- Run this in Supabase SQL Editor AFTER create_trend_settings.sql
+
+CREATE TABLE IF NOT EXISTS public.trend_discovery_runs (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    run_key TEXT NOT NULL UNIQUE,       -- e.g. 'trend_discovery:2026-10-19:09:00'
+    status TEXT NOT NULL DEFAULT 'running' CHECK (status IN ('running', 'completed')),
+    started_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    finished_at TIMESTAMP WITH TIME ZONE,
+    users_done INTEGER DEFAULT 0,
+    users_failed INTEGER DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS public.trend_discovery_run_users (
+    run_id UUID NOT NULL REFERENCES public.trend_discovery_runs(id) ON DELETE CASCADE,
+    user_id UUID NOT NULL,
+    status TEXT NOT NULL CHECK (status IN ('done', 'failed')),
+    error TEXT,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+
+    PRIMARY KEY (run_id, user_id)
+);
+
+-- Index for looking up recent runs
+CREATE INDEX IF NOT EXISTS idx_trend_discovery_runs_started_at
+ON public.trend_discovery_runs(started_at DESC);
+
+-- Enable Row Level Security (written by the scheduler with the service key)
+ALTER TABLE public.trend_discovery_runs ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.trend_discovery_run_users ENABLE ROW LEVEL SECURITY;
+
+-- Old checkpoints are only useful for a few days
+CREATE OR REPLACE FUNCTION cleanup_old_trend_discovery_runs()
+RETURNS void AS $$
+BEGIN
+    DELETE FROM public.trend_discovery_runs
+    WHERE started_at < NOW() - INTERVAL '14 days';
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+COMMENT ON TABLE public.trend_discovery_runs IS 'Daily trend discovery runs, used to resume interrupted runs';
+COMMENT ON TABLE public.trend_discovery_run_users IS 'Per-user outcome within a trend discovery run';
@@ -0,0 +1,146 @@
+-- Create time-bucketed trend rollups for CreatorPulse
+-- Keeps hourly and daily aggregates per user and keyword (plus a global rollup
+-- across all users) so history and spike queries never scan raw rows.
+-- Run this in Supabase SQL Editor AFTER add_trends_table.sql and create_trending_content.sql
+-- Requires PostgreSQL 15+ (UNIQUE NULLS NOT DISTINCT), which Supabase provides.
+
+CREATE TABLE IF NOT EXISTS public.trend_rollups (
+    user_id UUID,                       -- NULL = global rollup across all users
+    source TEXT NOT NULL CHECK (source IN ('content', 'google_trends')),
+    keyword TEXT NOT NULL,
+    granularity TEXT NOT NULL CHECK (granularity IN ('hour', 'day')),
+    bucket_start TIMESTAMP WITH TIME ZONE NOT NULL,
+    mention_count BIGINT DEFAULT 0,     -- Sum of mention counts in the bucket
+    observations INTEGER DEFAULT 0,     -- Number of raw rows folded into the bucket
+    max_spike_factor DECIMAL(10, 2),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+
+    CONSTRAINT unique_trend_rollup_bucket
+        UNIQUE NULLS NOT DISTINCT (user_id, source, keyword, granularity, bucket_start)
+);
+
+-- Index for history queries (user + source + granularity + recent buckets)
+CREATE INDEX IF NOT EXISTS idx_trend_rollups_scope_recent
+ON public.trend_rollups(user_id, source, granularity, bucket_start DESC);
+
+-- Enable Row Level Security
+ALTER TABLE public.trend_rollups ENABLE ROW LEVEL SECURITY;
+
+-- Users can read their own rollups and the global ones; writes happen via triggers
+CREATE POLICY "Users can view own and global trend rollups"
+    ON public.trend_rollups FOR SELECT
+    USING (user_id IS NULL OR auth.uid() = user_id);
+
+-- Fold one raw observation into the hourly and daily buckets (user + global)
+CREATE OR REPLACE FUNCTION rollup_trend_observation(
+    p_user_id UUID,
+    p_source TEXT,
+    p_keyword TEXT,
+    p_count BIGINT,
+    p_spike_factor DECIMAL,
+    p_observed_at TIMESTAMP WITH TIME ZONE
+)
+RETURNS void AS $$
+DECLARE
+    v_granularity TEXT;
+    v_scope UUID;
+    v_scopes UUID[];
+BEGIN
+    -- Rows without a user only feed the global rollup
+    IF p_user_id IS NULL THEN
+        v_scopes := ARRAY[NULL::UUID];
+    ELSE
+        v_scopes := ARRAY[p_user_id, NULL::UUID];
+    END IF;
+
+    FOREACH v_granularity IN ARRAY ARRAY['hour', 'day'] LOOP
+        FOREACH v_scope IN ARRAY v_scopes LOOP
+            INSERT INTO public.trend_rollups (
+                user_id, source, keyword, granularity, bucket_start,
+                mention_count, observations, max_spike_factor
+            )
+            VALUES (
+                v_scope, p_source, p_keyword, v_granularity,
+                date_trunc(v_granularity, COALESCE(p_observed_at, NOW()), 'UTC'),
+                COALESCE(p_count, 0), 1, p_spike_factor
+            )
+            ON CONFLICT ON CONSTRAINT unique_trend_rollup_bucket DO UPDATE SET
+                mention_count = trend_rollups.mention_count + EXCLUDED.mention_count,
+                observations = trend_rollups.observations + 1,
+                max_spike_factor = GREATEST(trend_rollups.max_spike_factor, EXCLUDED.max_spike_factor),
+                updated_at = NOW();
+        END LOOP;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Keep rollups current as raw rows arrive
+CREATE OR REPLACE FUNCTION rollup_trends_row()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM rollup_trend_observation(
+        NEW.user_id, 'content', NEW.keyword, NEW.mention_count, NEW.spike_factor, NEW.detected_at
+    );
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+CREATE OR REPLACE FUNCTION rollup_trending_content_row()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM rollup_trend_observation(
+        NEW.user_id, 'google_trends', lower(NEW.title), 1, NULL, NEW.discovered_at
+    );
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+DROP TRIGGER IF EXISTS trigger_rollup_trends ON public.trends;
+CREATE TRIGGER trigger_rollup_trends
+    AFTER INSERT ON public.trends
+    FOR EACH ROW
+    EXECUTE FUNCTION rollup_trends_row();
+
+DROP TRIGGER IF EXISTS trigger_rollup_trending_content ON public.trending_content;
+CREATE TRIGGER trigger_rollup_trending_content
+    AFTER INSERT ON public.trending_content
+    FOR EACH ROW
+    EXECUTE FUNCTION rollup_trending_content_row();
+
+-- Backfill rollups from the raw rows that already exist (run once - re-running
+-- this migration would count existing rows twice)
+SELECT rollup_trend_observation(user_id, 'content', keyword, mention_count, spike_factor, detected_at)
+FROM public.trends;
+
+SELECT rollup_trend_observation(user_id, 'google_trends', lower(title), 1, NULL, discovered_at)
+FROM public.trending_content;
+
+-- Retention: raw keyword rows expire after 7 days, raw Google Trends rows after
+-- 30 days (the Discovered Trends tab shows up to 30 days), hourly rollups after
+-- 14 days and daily rollups after 2 years
+CREATE OR REPLACE FUNCTION cleanup_old_trends()
+RETURNS void AS $$
+BEGIN
+    DELETE FROM public.trends
+    WHERE detected_at < NOW() - INTERVAL '7 days';
+
+    DELETE FROM public.trending_content
+    WHERE discovered_at < NOW() - INTERVAL '30 days';
+
+    DELETE FROM public.trend_rollups
+    WHERE granularity = 'hour'
+    AND bucket_start < NOW() - INTERVAL '14 days';
+
+    DELETE FROM public.trend_rollups
+    WHERE granularity = 'day'
+    AND bucket_start < NOW() - INTERVAL '730 days';
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Optionally schedule cleanup (requires pg_cron extension)
+-- SELECT cron.schedule('cleanup-trends', '0 0 * * *', 'SELECT cleanup_old_trends()');
+
+COMMENT ON TABLE public.trend_rollups IS 'Hourly and daily keyword aggregates (per user and global) for cheap trend history queries';
+COMMENT ON COLUMN public.trend_rollups.user_id IS 'Owning user, or NULL for the global rollup across all users';
+COMMENT ON COLUMN public.trend_rollups.source IS 'content = keywords from newsletter sources, google_trends = discovered trending searches';
+COMMENT ON COLUMN public.trend_rollups.observations IS 'Raw rows folded into the bucket (mention_count / observations = average per run)';
@@ -6,7 +6,9 @@ Configure automated daily trend discovery from Google Trends
 import streamlit as st
 from utils.auth import AuthManager
 from utils.supabase_client import get_db
-from utils.scheduler import trigger_job_manually, get_scheduled_jobs, is_scheduler_running
+from utils.scheduler import trigger_job_manually, queue_trend_discovery, sync_trend_discovery_jobs, get_scheduled_jobs, is_scheduler_running, is_scheduler_leader
+from utils.trends_discovery import get_related_queries_cache, related_queries_key, resolution_for_days
+from utils.series_store import get_series_store
 from datetime import datetime, timedelta
 import pandas as pd
 
@@ -160,6 +162,9 @@ with tab1:
                 )
 
                 if result.get('success'):
+                    # Reschedule so the new time slot takes effect without a restart
+                    if is_scheduler_running():
+                        sync_trend_discovery_jobs()
                     st.success("Settings saved successfully!")
                     st.rerun()
                 else:
@@ -169,10 +174,23 @@ with tab1:
         if st.button("🎯 Trigger Discovery Now", use_container_width=True):
             if not enabled:
                 st.warning("Please enable trend discovery first")
+            elif is_scheduler_running():
+                # Run on the scheduler so this page does not wait out the rate limit
+                result = queue_trend_discovery()
+                if result.get('success'):
+                    wait_seconds = result.get('wait_seconds', 0)
+                    if wait_seconds > 1:
+                        st.success(f"Discovery queued! It starts in about {wait_seconds:.0f}s (Google Trends rate limit). Check the 'Discovered Trends' tab in a few minutes")
+                    else:
+                        st.success("Discovery started! Check the 'Discovered Trends' tab in a few minutes")
+                else:
+                    st.error(f"Error: {result.get('error')}")
             else:
                 with st.spinner("Discovering trends... This may take 1-2 minutes"):
                     result = trigger_job_manually()
-                    if result.get('success'):
+                    if result.get('success') and result.get('processed') == 0:
+                        st.info("All users were already processed today. Check the 'Discovered Trends' tab")
+                    elif result.get('success'):
                         st.success("Trends discovered successfully! Check the 'Discovered Trends' tab")
                         st.rerun()
                     else:
@@ -212,6 +230,75 @@ with tab2:
     # Update metric
     col3.metric("Total Trends", len(trends))
 
+    # Long-range history comes from the daily rollups and the local search
+    # interest store, never from the raw rows or the Google API
+    with st.expander("📈 Trend History", expanded=False):
+        hist_col1, hist_col2 = st.columns(2)
+
+        with hist_col1:
+            history_source = st.selectbox(
+                "History source",
+                options=['google_trends', 'content', 'search_interest'],
+                format_func=lambda x: {
+                    'google_trends': 'Google Trends',
+                    'content': 'Keywords in your sources',
+                    'search_interest': 'Search interest (stored series)'
+                }[x]
+            )
+
+        with hist_col2:
+            history_days = st.selectbox(
+                "Range",
+                options=[30, 90, 180, 365],
+                format_func=lambda x: f"Last {x} days"
+            )
+
+        if history_source == 'search_interest':
+            series_store = get_series_store()
+            stored_keywords = series_store.keywords(resolution=resolution_for_days(history_days))
+
+            if stored_keywords:
+                chart_keywords = st.multiselect(
+                    "Keywords",
+                    options=stored_keywords,
+                    default=stored_keywords[:5]
+                )
+                start = datetime.now() - timedelta(days=history_days)
+                series = series_store.read_many(
+                    chart_keywords,
+                    resolution=resolution_for_days(history_days),
+                    start=start
+                )
+
+                if series:
+                    chart_df = pd.DataFrame({
+                        keyword: pd.Series(values, index=pd.to_datetime(dates))
+                        for keyword, (dates, values) in series.items()
+                    })
+                    st.line_chart(chart_df)
+                    st.caption("Loaded from local storage. Each keyword is on its own scale unless fetched together.")
+                else:
+                    st.caption("No stored data for these keywords in this range.")
+            else:
+                st.caption("No search interest stored yet. Series are saved whenever interest over time is fetched.")
+        else:
+            rollups = db.get_trend_rollups(user_id, source=history_source, granularity='day', days_back=history_days)
+
+            if rollups:
+                history_df = pd.DataFrame(rollups)
+                history_df['day'] = pd.to_datetime(history_df['bucket_start']).dt.date
+                history_df['value'] = history_df['mention_count'] / history_df['observations'].clip(lower=1)
+
+                # Chart the keywords with the most activity over the range
+                top_keywords = history_df.groupby('keyword')['value'].sum().nlargest(8).index
+                chart_df = history_df[history_df['keyword'].isin(top_keywords)].pivot_table(
+                    index='day', columns='keyword', values='value', aggfunc='sum'
+                ).fillna(0)
+
+                st.line_chart(chart_df)
+            else:
+                st.caption("No trend history yet. History builds up as trends are discovered.")
+
     st.divider()
 
     if not trends:
@@ -249,6 +336,14 @@ with tab2:
                             keywords_str = ", ".join(trend['keywords'][:3])
                             st.caption(f"🏷️ {keywords_str}")
 
+                    # Related queries come from the shared cache (filled in the background)
+                    related_rising = (trend.get('metadata') or {}).get('related_rising')
+                    if not related_rising:
+                        cached_related = get_related_queries_cache().get(related_queries_key(trend['title']))
+                        related_rising = (cached_related or {}).get('rising')
+                    if related_rising:
+                        st.caption(f"🔗 Related: {', '.join(related_rising[:5])}")
+
                 with col2:
                     if st.button("🗑️ Remove", key=f"del_{trend['id']}", use_container_width=True):
                         if db.delete_trending_content(user_id, trend['id']):
@@ -273,6 +368,10 @@ with tab3:
     with col1:
         if scheduler_running:
             st.success("✅ Scheduler is running")
+            if is_scheduler_leader():
+                st.caption("👑 This instance runs the scheduled jobs")
+            else:
+                st.caption("Another instance runs the scheduled jobs; this one takes over if it stops")
         else:
             st.warning("⚠️ Scheduler is not running")
 
@@ -307,8 +406,8 @@ with tab3:
     st.info("""
     **Rate Limiting:**
     - Google Trends uses rate limiting to prevent abuse
-    - We automatically wait 61 seconds between requests
-    - This is why manual discovery takes 1-2 minutes
+    - Requests are limited to one every 61 seconds, shared by the app, the scheduler and scripts
+    - Manual discovery is queued on the scheduler and starts when the limit allows
 
     **Data Sources:**
     - Daily trending searches from Google Trends
@@ -328,7 +427,7 @@ with tab3:
         st.markdown("""
         ### Automated Workflow
 
-        1. **Daily Scheduler** runs at your configured time (default: 9 AM EST)
+        1. **Daily Scheduler** runs at your configured time (default: 9 AM EST), in a job shared with users who picked the same time
         2. **Fetches Trends** from Google Trends for your selected categories
         3. **Saves to Database** with metadata (keywords, URLs, timestamps)
         4. **Available for Newsletters** in the Generate Newsletter page
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Delivery Schedule Benchmark
+Compares batch next-delivery computation with computing one schedule at a time
+"""
+
+import os
+import sys
+import random
+import time
+from datetime import datetime, time as datetime_time, timedelta
+
+import numpy as np
+import pytz
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.delivery_scheduler import (
+    DeliveryScheduler,
+    FREQUENCY_DAY_MASKS,
+    day_mask,
+    zone_offsets
+)
+
+
+FREQUENCIES = ['daily', 'weekdays', 'weekly', 'custom']
+
+
+def make_schedules(count: int, seed: int = 42):
+    """Generate random schedules across the app's timezones"""
+    rng = random.Random(seed)
+    timezones = DeliveryScheduler.get_available_timezones()
+
+    times, zones, frequencies, masks = [], [], [], []
+    for _ in range(count):
+        frequency = rng.choice(FREQUENCIES)
+        times.append(datetime_time(rng.randrange(24), rng.choice([0, 15, 30, 45])))
+        zones.append(rng.choice(timezones))
+        frequencies.append(frequency)
+        if frequency == 'custom':
+            masks.append(day_mask(rng.sample(range(7), rng.randint(1, 6))))
+        else:
+            masks.append(FREQUENCY_DAY_MASKS[frequency])
+    return times, zones, frequencies, masks
+
+
+def next_delivery_one(delivery_time, timezone_str, mask, after):
+    """Reference: one schedule at a time with pytz localize"""
+    tz = pytz.timezone(timezone_str)
+    local_date = after.astimezone(tz).date()
+    for day_offset in range(8):
+        day = local_date + timedelta(days=day_offset)
+        if not (mask >> day.weekday()) & 1:
+            continue
+        naive = datetime.combine(day, delivery_time)
+        try:
+            local = tz.localize(naive, is_dst=None)
+        except pytz.exceptions.AmbiguousTimeError:
+            local = tz.localize(naive, is_dst=True)
+        except pytz.exceptions.NonExistentTimeError:
+            local = tz.localize(naive, is_dst=False)
+        candidate = local.astimezone(pytz.UTC)
+        if candidate > after:
+            return candidate
+    return None
+
+
+def main():
+    """Run the benchmark"""
+    count = 100_000
+    sample = 10_000
+    times, zones, frequencies, masks = make_schedules(count)
+    scheduler = DeliveryScheduler()
+
+    # The night US clocks go back, so DST handling is exercised
+    after = datetime(2026, 11, 1, 4, 0, tzinfo=pytz.UTC)
+
+    start = time.perf_counter()
+    for zone in set(zones):
+        zone_offsets(zone)
+    warmup_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = scheduler.get_next_delivery_times(times, zones, frequencies, after=after, day_masks=masks)
+    batch_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    reference = [
+        next_delivery_one(times[index], zones[index], masks[index], after)
+        for index in range(sample)
+    ]
+    loop_seconds = (time.perf_counter() - start) * count / sample
+
+    expected = np.array([int(value.timestamp()) for value in reference], dtype=np.int64)
+    mismatches = int(np.count_nonzero(batch[:sample].astype(np.int64) != expected))
+
+    print(f"Schedules: {count}  Timezones: {len(set(zones))}")
+    print(f"Zone tables (once):      {warmup_seconds * 1000:8.1f} ms")
+    print(f"Batch:                   {batch_seconds * 1000:8.1f} ms")
+    print(f"One at a time (est.):    {loop_seconds * 1000:8.1f} ms "
+          f"({loop_seconds / batch_seconds:.0f}x slower)")
+    print(f"Mismatches in first {sample}: {mismatches}")
+
+    return 0 if mismatches == 0 else 1
+
+
+if __name__ == "__main__":
+    exit_code = main()
+    sys.exit(exit_code)
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Keyword Normalization Benchmark
+Compares the cost of tokenization with the cost of memoized keyword normalization
+"""
+
+import os
+import sys
+import random
+import re
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.keyword_normalizer import normalize_keyword, normalizer_stats
+
+
+VOCABULARY = [
+    'model', 'models', 'modeling', 'modeled', 'agent', 'agents', 'training',
+    'trained', 'startup', 'startups', 'launches', 'launched', 'companies',
+    'company', 'release', 'released', 'releasing', 'creator', 'creators',
+    'creating', 'newsletter', 'newsletters', 'update', 'updates', 'updated',
+    'funding', 'investors', 'benchmark', 'benchmarks', 'reasoning', 'chips',
+    'datasets', 'pricing', 'platforms', 'developers', 'building', 'scaling'
+]
+
+
+def make_documents(count: int, words_per_document: int = 200, seed: int = 42):
+    """Generate synthetic documents drawn from a Zipf-like vocabulary"""
+    rng = random.Random(seed)
+    # Rare tail words make the memo table see a realistic number of distinct forms
+    tail = [
+        ''.join(rng.choices('abcdefghijklmnopqrstuvwxyz', k=rng.randint(4, 9))) + suffix
+        for suffix in ('', 's', 'ing', 'ed')
+        for _ in range(5000)
+    ]
+    weights = [1 / (rank + 1) for rank in range(len(VOCABULARY))]
+
+    documents = []
+    for _ in range(count):
+        words = rng.choices(VOCABULARY, weights=weights, k=words_per_document - 10)
+        words += rng.choices(tail, k=10)
+        documents.append(' '.join(words))
+    return documents
+
+
+def main():
+    """Run the benchmark"""
+    documents = make_documents(5000)
+
+    start = time.perf_counter()
+    tokenized = [re.findall(r'\b[a-z]+\b', document.lower()) for document in documents]
+    tokenize_seconds = time.perf_counter() - start
+
+    token_count = sum(len(tokens) for tokens in tokenized)
+
+    # First pass fills the memo table, the second measures the steady state
+    timings = []
+    for _ in range(2):
+        start = time.perf_counter()
+        for tokens in tokenized:
+            for token in tokens:
+                normalize_keyword(token)
+        timings.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for tokens in tokenized:
+        for token in tokens:
+            normalize_keyword.__wrapped__(token)
+    uncached_seconds = time.perf_counter() - start
+
+    stats = normalizer_stats()
+
+    print(f"Documents: {len(documents)}  Tokens: {token_count}  Distinct forms: {stats['size']}")
+    print(f"Tokenization:            {tokenize_seconds * 1000:8.1f} ms")
+    print(f"Normalization (cold):    {timings[0] * 1000:8.1f} ms")
+    print(f"Normalization (warm):    {timings[1] * 1000:8.1f} ms "
+          f"({timings[1] / tokenize_seconds:.0%} of tokenization)")
+    print(f"Normalization (no memo): {uncached_seconds * 1000:8.1f} ms")
+    print(f"Memo hits: {stats['hits']}  misses: {stats['misses']}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit_code = main()
+    sys.exit(exit_code)
@@ -2,11 +2,23 @@
 """
 Scheduled Newsletter Delivery Script
 Run this hourly via cron service to send scheduled newsletters
+
+With --worker, deliveries are claimed from the scheduled_newsletters queue
+(requires database/create_delivery_claims.sql), so any number of workers can
+run at once without claiming the same delivery twice (a worker that dies between
+sending and completing a delivery can still cause a resend). Workers also pre-generate
+newsletters ahead of their delivery time (database/add_newsletter_pregeneration.sql);
+run them with --poll so pre-generated newsletters go out on the minute.
+
+main() also accepts stand-in backends and a clock; scripts/simulate_delivery.py
+uses them to replay deliveries against virtual time.
 """
 
+import argparse
 import os
 import sys
-from datetime import datetime, time as datetime_time
+import threading
+from datetime import datetime, timedelta, time as datetime_time
 import pytz
 
 # Add parent directory to path
@@ -17,43 +29,74 @@ from utils.llm_generator import NewsletterGenerator
 from utils.email_sender import NewsletterEmailSender
 from utils.delivery_scheduler import DeliveryScheduler
 from utils.trend_detector import TrendDetector
+from utils.content_aggregator import ContentAggregator
+from utils.global_trends import get_global_index, fetch_source_items, source_key
+from utils.clock import SYSTEM_CLOCK
+from utils.delivery_pipeline import DeliveryPipeline, PipelineStage, summarize_results
+from utils.delivery_queue import (
+    DEFAULT_LEASE_SECONDS,
+    DEFAULT_MAX_ATTEMPTS,
+    DEFAULT_RETRY_SECONDS,
+    LeaseHeartbeat,
+    create_delivery_queue,
+    make_worker_id,
+    retry_delay
+)
 
 
-def main():
-    """Check for users due for delivery and send newsletters"""
+# Deliveries due within this many minutes are sent by the current (hourly) run
+DEFAULT_WINDOW_MINUTES = 60
 
-    print(f"[{datetime.now()}] Starting scheduled delivery check...")
+# Overdue deliveries (e.g. after an outage) older than this are skipped, not sent late
+MAX_LATENESS = timedelta(hours=12)
 
-    # Initialize clients
-    db = get_db()
-    if not db.is_configured():
-        print("ERROR: Database not configured. Check SUPABASE_URL and SUPABASE_KEY")
-        return 1
+# Immediate retries (1s, 2s, 4s, ...) of recording a sent delivery before it is
+# retried from the worker loop; its claim is kept meanwhile so it is not resent
+COMPLETE_RETRIES = 4
 
-    scheduler = DeliveryScheduler(db)
-    email_sender = NewsletterEmailSender()
 
-    # Check if email is configured
-    if not os.getenv('RESEND_API_KEY'):
-        print("WARNING: RESEND_API_KEY not configured. Emails cannot be sent.")
+def parse_delivery_time(value: str) -> datetime_time:
+    """Parse a 'HH:MM:SS' delivery time"""
+    hour, minute, second = map(int, value.split(':'))
+    return datetime_time(hour, minute, second)
 
-    # Get users who have automatic delivery enabled
-    try:
-        result = db.client.rpc('get_users_due_for_delivery').execute()
-        users = result.data if result.data else []
-    except Exception as e:
-        print(f"ERROR fetching users: {e}")
-        return 1
 
-    print(f"Found {len(users)} users with automatic delivery enabled")
+def parse_timestamp(value):
+    """Parse an ISO timestamp from the database (None stays None)"""
+    if not value or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
 
-    if len(users) == 0:
-        print("No users to process. Exiting.")
-        return 0
 
-    # Check each user
-    now_utc = datetime.now(pytz.UTC)
-    newsletters_sent = 0
+def delivery_date(job):
+    """Local time of the job's delivery (now for jobs without a slot)"""
+    scheduled_for = job.get('scheduled_for')
+    if not scheduled_for:
+        return datetime.now()
+    return scheduled_for.astimezone(pytz.timezone(job.get('delivery_timezone') or 'UTC'))
+
+
+def select_due_users(scheduler, window_minutes):
+    """
+    Get the users whose next delivery falls inside this run's window
+
+    Fills in next_delivery_at for schedules saved before it existed, and moves
+    deliveries missed by more than MAX_LATENESS on to their next slot.
+
+    Returns:
+        List of due user rows (with 'parsed_delivery_time' and 'scheduled_for'),
+        or None if the query failed
+    """
+    users = scheduler.get_due_users(window_minutes)
+    if users is None:
+        print("ERROR fetching users (run database/add_next_delivery_at.sql)")
+        return None
+
+    print(f"Found {len(users)} users due within {window_minutes} minutes")
+
+    now_utc = scheduler.clock.now()
+    window_end = now_utc + timedelta(minutes=window_minutes)
+    due_users = []
 
     for user in users:
         try:
@@ -63,6 +106,7 @@ def main():
             frequency = user['delivery_frequency']
             recipients = user.get('delivery_recipients', [])
             last_delivery = user.get('last_delivery_at')
+            next_delivery = user.get('next_delivery_at')
 
             print(f"\n--- Processing user {user_id} ---")
             print(f"  Time: {delivery_time_str} {timezone_str}")
@@ -71,127 +115,48 @@ def main():
 
             # Parse delivery time
             try:
-                hour, minute, second = map(int, delivery_time_str.split(':'))
-                delivery_time = datetime_time(hour, minute, second)
+                delivery_time = parse_delivery_time(delivery_time_str)
             except:
                 print(f"  ERROR: Invalid delivery time format: {delivery_time_str}")
                 continue
 
-            # Convert last delivery to datetime if exists
-            if last_delivery:
+            user['parsed_delivery_time'] = delivery_time
+
+            if next_delivery:
+                next_delivery = parse_timestamp(next_delivery)
+            else:
+                # Schedule saved before next_delivery_at existed; fill it in once
                 try:
-                    last_delivery = datetime.fromisoformat(last_delivery.replace('Z', '+00:00'))
+                    last_delivery = parse_timestamp(last_delivery)
                 except:
                     last_delivery = None
 
-            # Check if should send today based on frequency
-            if not scheduler.should_send_today(frequency, last_delivery):
-                print(f"  SKIP: Not scheduled for today ({frequency})")
-                continue
-
-            # Calculate next delivery time
-            next_delivery = scheduler.get_next_delivery_time(
-                delivery_time, timezone_str, frequency
-            )
-
-            # Check if it's time to send (within 1 hour window)
-            time_diff = abs((next_delivery - now_utc).total_seconds())
-            hours_until = time_diff / 3600
+                next_delivery = scheduler.compute_next_delivery_at(
+                    delivery_time, timezone_str, frequency, last_delivery=last_delivery
+                )
+                scheduler.set_next_delivery_at(user_id, next_delivery)
 
             print(f"  Next delivery: {next_delivery}")
-            print(f"  Time until delivery: {hours_until:.2f} hours")
 
-            if time_diff < 3600:  # Within 1 hour
-                print(f"  ✓ TIME TO SEND!")
+            if next_delivery > window_end:
+                print(f"  ⏳ Not yet time (next delivery in {(next_delivery - now_utc).total_seconds() / 3600:.1f} hours)")
+                continue
 
-                if not recipients:
-                    print(f"  ERROR: No recipients configured")
-                    continue
+            if next_delivery < now_utc - MAX_LATENESS:
+                # Too late to be a morning newsletter; skip to the following slot
+                skipped_to = scheduler.compute_next_delivery_at(delivery_time, timezone_str, frequency)
+                scheduler.set_next_delivery_at(user_id, skipped_to)
+                print(f"  SKIP: Missed delivery at {next_delivery}; next delivery {skipped_to}")
+                continue
 
-                # Generate newsletter
-                print(f"  Generating newsletter...")
+            print(f"  ✓ TIME TO SEND!")
 
-                try:
-                    # Get sources
-                    sources = db.get_sources(user_id)
-
-                    # Create aggregated content
-                    aggregated_content = []
-                    for source in sources:
-                        aggregated_content.append({
-                            'title': f"Latest from {source['identifier']}",
-                            'content': f"Content from {source['source_type']} source: {source['identifier']}",
-                            'source_type': source['source_type'],
-                            'identifier': source['identifier']
-                        })
-
-                    if not aggregated_content:
-                        print(f"  WARNING: No content sources found")
-                        aggregated_content = [{
-                            'title': 'Your Daily Newsletter',
-                            'content': 'Stay tuned for curated content from your sources!'
-                        }]
-
-                    # Get style profile
-                    style_data = db.get_style_training(user_id)
-                    style_profile = None
-                    if style_data:
-                        style_profile = {'training_text': style_data[0].get('training_text', '')}
-
-                    # Detect trends
-                    trend_detector = TrendDetector(db)
-                    trending_data = trend_detector.get_trending_topics(
-                        aggregated_content,
-                        include_spikes=True,
-                        top_n=5
-                    )
-
-                    # Generate newsletter using Groq
-                    generator = NewsletterGenerator(provider='groq', model='llama-3.3-70b-versatile')
-                    content = generator.generate_newsletter(
-                        content_items=aggregated_content,
-                        title=f"Your Morning Digest - {datetime.now().strftime('%B %d, %Y')}",
-                        style_profile=style_profile,
-                        num_articles=5,
-                        include_trends=True
-                    )
-
-                    # Prepend trending topics
-                    if trending_data and trending_data.get('trending_keywords'):
-                        trends_section = trend_detector.format_trends_for_newsletter(trending_data, max_trends=5)
-                        content = trends_section + "\n\n" + content
-
-                    print(f"  Newsletter generated ({len(content)} chars)")
-
-                    # Send email
-                    print(f"  Sending to {len(recipients)} recipients...")
-                    result = email_sender.send_newsletter(
-                        to_emails=recipients,
-                        subject=f"Your Morning Newsletter - {datetime.now().strftime('%B %d')}",
-                        content=content,
-                        from_email="CreatorPulse <newsletter@resend.dev>"
-                    )
-
-                    if result['success']:
-                        print(f"  ✅ Newsletter sent successfully!")
-                        newsletters_sent += 1
-
-                        # Update last delivery time
-                        try:
-                            db.client.rpc('update_last_delivery', {'p_user_id': user_id}).execute()
-                            print(f"  Updated last_delivery_at timestamp")
-                        except Exception as e:
-                            print(f"  WARNING: Could not update timestamp: {e}")
-                    else:
-                        print(f"  ❌ Failed to send: {result.get('error')}")
-
-                except Exception as e:
-                    print(f"  ❌ Error generating/sending newsletter: {e}")
-                    import traceback
-                    traceback.print_exc()
+            if not recipients:
+                print(f"  ERROR: No recipients configured")
+                continue
 
-            else:
-                print(f"  ⏳ Not yet time (next delivery in {hours_until:.1f} hours)")
+            user['scheduled_for'] = next_delivery
+            due_users.append(user)
 
         except Exception as e:
             print(f"  ERROR processing user {user.get('user_id', 'unknown')}: {e}")
@@ -199,6 +164,528 @@ def main():
             traceback.print_exc()
             continue
 
+    return due_users
+
+
+def build_pipeline(
+    db,
+    email_sender,
+    before_send=None,
+    after_send=None,
+    store=None,
+    clock=None,
+    generator_factory=None,
+    fetch_items=None
+):
+    """
+    Build the fetch/generate/send pipeline for a set of due users
+
+    Jobs that already have 'content' (pre-generated newsletters) pass through
+    the fetch and generate stages untouched.
+
+    Args:
+        db: CreatorPulseDB instance
+        email_sender: NewsletterEmailSender
+        before_send: Optional callable(job) run right before sending; raising skips the send
+        after_send: Callable(job) run after a successful send
+        store: If given, callable(job) replacing the send stage (for pre-generation)
+        clock: Time source for rate limits and timings (defaults to the system clock)
+        generator_factory: Callable returning a newsletter generator (defaults to Groq)
+        fetch_items: Callable (source_type, identifier) -> content items
+            (defaults to fetching through ContentAggregator)
+
+    Returns:
+        DeliveryPipeline
+    """
+    clock = clock or SYSTEM_CLOCK
+    if generator_factory is None:
+        generator_factory = lambda: NewsletterGenerator(provider='groq', model='llama-3.3-70b-versatile')
+    if fetch_items is None:
+        aggregator = ContentAggregator()
+        fetch_items = lambda source_type, identifier: fetch_source_items(aggregator, source_type, identifier)
+
+    # Sources shared by several users are fetched and counted once per window
+    global_index = get_global_index(TrendDetector(), now=clock.time())
+
+    def fetch_stage(job):
+        """Fetch the user's sources (once per window across users) and load their profile"""
+        if job.get('content'):
+            return job
+
+        user_id = job['user_id']
+        user_source_keys = [source_key(source) for source in db.get_sources(user_id)]
+        trend_settings = db.get_user_trend_settings(user_id) or {}
+        custom_keywords = trend_settings.get('custom_keywords') or []
+
+        global_index.ensure_sources(user_source_keys, fetch_items)
+        if custom_keywords:
+            global_index.index_custom_keywords(custom_keywords, user_source_keys)
+        aggregated_content = global_index.items_for(user_source_keys)
+
+        if not aggregated_content:
+            print(f"  [{user_id}] WARNING: No content sources found")
+            aggregated_content = [{
+                'title': 'Your Daily Newsletter',
+                'content': 'Stay tuned for curated content from your sources!'
+            }]
+
+        # Get style profile
+        style_data = db.get_style_training(user_id)
+        style_profile = None
+        if style_data:
+            style_profile = {'training_text': style_data[0].get('training_text', '')}
+
+        # Detect trends from the shared per-source keyword counts
+        trend_detector = TrendDetector(db, user_id=user_id)
+        trending_data = global_index.user_trends(
+            user_source_keys,
+            detector=trend_detector,
+            custom_keywords=custom_keywords,
+            include_spikes=True,
+            top_n=5
+        )
+
+        job.update({
+            'content_items': aggregated_content,
+            'style_profile': style_profile,
+            'trend_detector': trend_detector,
+            'trending_data': trending_data
+        })
+        return job
+
+    def generate_stage(job):
+        """Generate the newsletter using Groq"""
+        if job.get('content'):
+            return job
+
+        user_id = job['user_id']
+        title = f"Your Morning Digest - {delivery_date(job).strftime('%B %d, %Y')}"
+        generator = generator_factory()
+        content = generator.generate_newsletter(
+            content_items=job['content_items'],
+            title=title,
+            style_profile=job['style_profile'],
+            num_articles=5,
+            include_trends=True
+        )
+
+        # Prepend trending topics
+        trending_data = job['trending_data']
+        if trending_data and trending_data.get('trending_keywords'):
+            trends_section = job['trend_detector'].format_trends_for_newsletter(trending_data, max_trends=5)
+            content = trends_section + "\n\n" + content
+
+        print(f"  [{user_id}] Newsletter generated ({len(content)} chars)")
+        job['title'] = title
+        job['content'] = content
+        return job
+
+    def send_stage(job):
+        """Send the newsletter and record the delivery"""
+        user_id = job['user_id']
+        recipients = job.get('delivery_recipients', [])
+
+        if before_send is not None:
+            before_send(job)
+
+        print(f"  [{user_id}] Sending to {len(recipients)} recipients...")
+        result = email_sender.send_newsletter(
+            to_emails=recipients,
+            subject=f"Your Morning Newsletter - {delivery_date(job).strftime('%B %d')}",
+            content=job['content'],
+            from_email="CreatorPulse <newsletter@resend.dev>"
+        )
+        if not result['success']:
+            if not result.get('sent'):
+                raise RuntimeError(f"Failed to send: {result.get('error')}")
+            # Some recipients already have it; retrying would send it to them twice
+            for recipient in result['results']:
+                if not recipient['success']:
+                    print(f"  [{user_id}] ⚠️ Not delivered to {recipient['email']}: {recipient['error']}")
+
+        print(f"  [{user_id}] ✅ Newsletter sent to {result.get('sent', len(recipients))} recipient(s)")
+
+        if after_send is not None:
+            after_send(job)
+        return job
+
+    generate_workers = int(os.getenv('DELIVERY_GENERATE_WORKERS', '4'))
+    if store is not None:
+        last_stage = PipelineStage('store', store, workers=generate_workers)
+    else:
+        last_stage = PipelineStage(
+            'send',
+            send_stage,
+            workers=int(os.getenv('DELIVERY_SEND_WORKERS', '2')),
+            rate_per_second=float(os.getenv('DELIVERY_SEND_PER_SECOND', '2')),
+            clock=clock
+        )
+
+    # Each stage has its own pool and rate limit; throughput follows the slowest stage.
+    # The generate limit is shared by every process, so pre-generation and
+    # send-time generation draw from one LLM budget.
+    return DeliveryPipeline([
+        PipelineStage('fetch', fetch_stage, workers=int(os.getenv('DELIVERY_FETCH_WORKERS', '8'))),
+        PipelineStage(
+            'generate',
+            generate_stage,
+            workers=generate_workers,
+            rate_per_second=float(os.getenv('DELIVERY_GENERATE_PER_MINUTE', '30')) / 60,
+            clock=clock,
+            # Pre-generated newsletters pass through without using the LLM budget
+            rate_limited=lambda job: not job.get('content')
+        ),
+        last_stage
+    ], clock=clock)
+
+
+def report_results(results, pipeline=None):
+    """Print failures, timing and rate-limit stalls of a pipeline run; returns the number sent"""
+    for result in results:
+        if not result['success']:
+            print(f"  [{result['id']}] ❌ Failed at {result['stage']}: {result['error']}")
+
+    summary = summarize_results(results)
+    print(f"\nSlowest delivery finished {summary['max_seconds']:.1f}s after the batch started")
+    if summary['failed']:
+        print(f"Failures by stage: {summary['failed_by_stage']}")
+    if pipeline is not None:
+        for name, stats in pipeline.stage_stats.items():
+            if stats['stalls']:
+                print(f"Rate limit stalled {name} {stats['stalls']} times ({stats['stall_seconds']:.1f}s)")
+    return summary['succeeded']
+
+
+def run_once(db, scheduler, email_sender, window_minutes, generator_factory=None, on_results=None, fetch_items=None):
+    """
+    Send every delivery due in this window (only one such run may be active at a time)
+
+    Args:
+        db: CreatorPulseDB instance
+        scheduler: DeliveryScheduler (its clock is used throughout)
+        email_sender: NewsletterEmailSender
+        window_minutes: Deliveries due within this many minutes are sent
+        generator_factory: Callable returning a newsletter generator (defaults to Groq)
+        on_results: Optional callable(pipeline, results) called after the run
+        fetch_items: Callable (source_type, identifier) -> content items (defaults to ContentAggregator)
+
+    Returns:
+        Number of newsletters sent, or None if due users could not be loaded
+    """
+    due_users = select_due_users(scheduler, window_minutes)
+    if due_users is None:
+        return None
+
+    if not due_users:
+        print("\nNo newsletters due in this window.")
+        return 0
+
+    def record_sent(job):
+        # Update last delivery time and advance the next one
+        next_delivery = scheduler.record_delivery(
+            job['user_id'],
+            job['parsed_delivery_time'],
+            job['delivery_timezone'],
+            job['delivery_frequency'],
+            scheduled_for=job['scheduled_for']
+        )
+        if next_delivery:
+            print(f"  [{job['user_id']}] Next delivery scheduled for {next_delivery}")
+        else:
+            print(f"  [{job['user_id']}] WARNING: Could not update delivery timestamps")
+
+    print(f"\n--- Delivering to {len(due_users)} users ---")
+    pipeline = build_pipeline(
+        db, email_sender, after_send=record_sent,
+        clock=scheduler.clock, generator_factory=generator_factory, fetch_items=fetch_items
+    )
+    results = pipeline.run(due_users)
+    if on_results is not None:
+        on_results(pipeline, results)
+    return report_results(results, pipeline)
+
+
+def run_worker(
+    db,
+    scheduler,
+    email_sender,
+    window_minutes,
+    queue=None,
+    batch_size=25,
+    poll_seconds=0,
+    lease_seconds=DEFAULT_LEASE_SECONDS,
+    max_attempts=DEFAULT_MAX_ATTEMPTS,
+    retry_seconds=DEFAULT_RETRY_SECONDS,
+    pregenerate_minutes=0,
+    send_ahead_seconds=None,
+    generator_factory=None,
+    on_results=None,
+    fetch_items=None
+):
+    """
+    Claim due deliveries from the queue and send them until it is empty
+
+    Sending always comes first. When nothing is due, the worker generates
+    deliveries up to pregenerate_minutes ahead and stores them, so at the
+    delivery minute they only need to be sent.
+
+    Args:
+        db: CreatorPulseDB instance
+        scheduler: DeliveryScheduler (its clock is used throughout)
+        email_sender: NewsletterEmailSender
+        window_minutes: Deliveries due within this many minutes are enqueued
+        queue: Delivery queue (defaults to create_delivery_queue(db))
+        batch_size: Deliveries claimed at a time
+        poll_seconds: Keep polling at this interval once the queue is empty (0 to exit)
+        lease_seconds: Claim duration, renewed by a heartbeat while working
+        max_attempts: Claims after which a delivery is given up
+        retry_seconds: Backoff before a failed delivery is retried (doubled per attempt)
+        pregenerate_minutes: Lead window for pre-generation (0 to generate at send time)
+        send_ahead_seconds: Send deliveries due within this many seconds
+            (defaults to the whole window for a one-shot run and 60 when polling)
+        generator_factory: Callable returning a newsletter generator (defaults to Groq)
+        on_results: Optional callable(pipeline, results) called after each batch
+        fetch_items: Callable (source_type, identifier) -> content items (defaults to ContentAggregator)
+
+    Returns:
+        Number of newsletters sent
+    """
+    clock = scheduler.clock
+    queue = queue or create_delivery_queue(db, clock=clock)
+    worker = make_worker_id()
+    newsletters_sent = 0
+    if send_ahead_seconds is None:
+        send_ahead_seconds = 60 if poll_seconds > 0 else window_minutes * 60
+    enqueue_minutes = max(window_minutes, pregenerate_minutes)
+    print(f"Delivery worker {worker} started")
+
+    # Sent deliveries whose completion could not be recorded yet, by delivery id
+    unrecorded = {}
+    unrecorded_lock = threading.Lock()
+
+    with LeaseHeartbeat(queue, worker, lease_seconds, clock=clock) as heartbeat:
+
+        def fail(job, error, permanent=False):
+            next_delivery = scheduler.next_delivery_after_send(
+                job['parsed_delivery_time'], job['delivery_timezone'], job['delivery_frequency'],
+                job['scheduled_for']
+            ) if job.get('parsed_delivery_time') else None
+            # Permanent failures are given up at once instead of being retried
+            status = queue.fail(
+                job['id'], worker, error, 0 if permanent else max_attempts,
+                next_delivery_at=next_delivery, retry_seconds=retry_seconds
+            )
+            heartbeat.release(job['id'])
+            print(f"  [{job['user_id']}] Delivery {job['id']} released as {status or 'lost claim'}")
+
+        def check_claim(job):
+            # Fence: never send once another worker may have taken the delivery over
+            if not heartbeat.holds(job['id']):
+                raise RuntimeError('Claim lost before sending')
+
+        def record_completion(job, next_delivery):
+            completed = queue.complete(job['id'], worker, next_delivery)
+            if completed is None:
+                # The newsletter is out: keep the claim so it is not sent again
+                return False
+
+            if completed:
+                print(f"  [{job['user_id']}] Next delivery scheduled for {next_delivery}")
+            else:
+                print(f"  [{job['user_id']}] WARNING: Claim lapsed while sending delivery {job['id']}")
+            heartbeat.release(job['id'])
+            with unrecorded_lock:
+                unrecorded.pop(job['id'], None)
+            return True
+
+        def complete(job):
+            next_delivery = scheduler.next_delivery_after_send(
+                job['parsed_delivery_time'], job['delivery_timezone'], job['delivery_frequency'],
+                job['scheduled_for']
+            )
+            for attempt in range(1, COMPLETE_RETRIES + 1):
+                if record_completion(job, next_delivery):
+                    return
+                clock.sleep(retry_delay(attempt, 1))
+
+            if not record_completion(job, next_delivery):
+                print(f"  [{job['user_id']}] WARNING: Could not record sent delivery {job['id']}; retrying later")
+                with unrecorded_lock:
+                    unrecorded[job['id']] = (job, next_delivery)
+
+        def retry_unrecorded():
+            with unrecorded_lock:
+                pending = list(unrecorded.values())
+            for job, next_delivery in pending:
+                record_completion(job, next_delivery)
+
+        def store(job):
+            if not queue.save_generated(job['id'], worker, job['title'], job['content']):
+                raise RuntimeError('Claim lost before storing')
+            heartbeat.release(job['id'])
+            print(f"  [{job['user_id']}] Pre-generated for {job['scheduled_for']}")
+            return job
+
+        def send_batch(claimed):
+            now_utc = clock.now()
+            jobs = []
+            for job in claimed:
+                heartbeat.track(job['id'])
+                try:
+                    job['parsed_delivery_time'] = parse_delivery_time(job['delivery_time'])
+                    job['scheduled_for'] = parse_timestamp(job['scheduled_for'])
+                except Exception:
+                    fail(job, f"Invalid delivery time: {job.get('delivery_time')}", permanent=True)
+                    continue
+
+                if job.get('attempts', 1) > max_attempts:
+                    # Workers died while holding this delivery too many times
+                    fail(job, 'Too many attempts')
+                elif job['scheduled_for'] < now_utc - MAX_LATENESS:
+                    fail(job, f"Missed delivery at {job['scheduled_for']}", permanent=True)
+                elif not job.get('delivery_recipients'):
+                    fail(job, 'No recipients configured', permanent=True)
+                else:
+                    jobs.append(job)
+
+            if not jobs:
+                return 0
+
+            ready = sum(1 for job in jobs if job.get('content'))
+            print(f"  {ready} of {len(jobs)} deliveries were pre-generated")
+
+            pipeline = build_pipeline(
+                db, email_sender, before_send=check_claim, after_send=complete,
+                clock=clock, generator_factory=generator_factory, fetch_items=fetch_items
+            )
+            results = pipeline.run(jobs)
+            for result in results:
+                if not result['success']:
+                    fail(result['job'], f"{result['stage']}: {result['error']}")
+            if on_results is not None:
+                on_results(pipeline, results)
+            return report_results(results, pipeline)
+
+        def generate_batch(claimed):
+            for job in claimed:
+                heartbeat.track(job['id'])
+                job['scheduled_for'] = parse_timestamp(job['scheduled_for'])
+
+            pipeline = build_pipeline(
+                db, email_sender, store=store,
+                clock=clock, generator_factory=generator_factory, fetch_items=fetch_items
+            )
+            results = pipeline.run(claimed)
+            if on_results is not None:
+                on_results(pipeline, results)
+            for result in results:
+                if not result['success']:
+                    queue.release_generation(result['job']['id'], worker, f"{result['stage']}: {result['error']}")
+                    heartbeat.release(result['job']['id'])
+                    print(f"  [{result['id']}] Pre-generation failed at {result['stage']}; will generate at send time")
+
+        while True:
+            retry_unrecorded()
+            queue.enqueue_due(enqueue_minutes)
+
+            claimed = queue.claim(worker, batch_size, lease_seconds, send_ahead_seconds)
+            if claimed:
+                print(f"\n--- Claimed {len(claimed)} deliveries ---")
+                newsletters_sent += send_batch(claimed)
+                continue
+
+            # Nothing to send right now: use the idle capacity to generate ahead
+            if pregenerate_minutes > 0:
+                claimed = queue.claim_generation(worker, batch_size, lease_seconds)
+                if claimed:
+                    print(f"\n--- Pre-generating {len(claimed)} deliveries ---")
+                    generate_batch(claimed)
+                    continue
+
+            if poll_seconds <= 0:
+                if not unrecorded:
+                    break
+                # Hold on to the claims of sent deliveries until they are recorded
+                clock.idle(retry_seconds)
+                continue
+            clock.idle(poll_seconds)
+
+    return newsletters_sent
+
+
+def main(
+    argv=None,
+    db=None,
+    email_sender=None,
+    queue=None,
+    clock=None,
+    generator_factory=None,
+    on_results=None,
+    fetch_items=None
+):
+    """
+    Check for users due for delivery and send newsletters
+
+    Args:
+        argv: Command line arguments (defaults to sys.argv)
+        db: Database client (defaults to get_db())
+        email_sender: Email sender (defaults to NewsletterEmailSender())
+        queue: Delivery queue for worker mode (defaults to create_delivery_queue)
+        clock: Time source (defaults to the system clock)
+        generator_factory: Callable returning a newsletter generator (defaults to Groq)
+        on_results: Optional callable(pipeline, results) called after each batch
+        fetch_items: Callable (source_type, identifier) -> content items (defaults to ContentAggregator)
+
+    Returns:
+        Process exit code
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--worker', action='store_true',
+                        help='Claim deliveries from the queue (safe to run several at once)')
+    parser.add_argument('--batch-size', type=int, default=int(os.getenv('DELIVERY_CLAIM_BATCH_SIZE', '25')),
+                        help='Deliveries claimed at a time in worker mode')
+    parser.add_argument('--poll', type=float, default=0,
+                        help='In worker mode, keep polling every POLL seconds instead of exiting when idle')
+    args = parser.parse_args(argv)
+
+    print(f"[{datetime.now()}] Starting scheduled delivery check...")
+
+    # Initialize clients
+    db = db or get_db()
+    if not db.is_configured():
+        print("ERROR: Database not configured. Check SUPABASE_URL and SUPABASE_KEY")
+        return 1
+
+    scheduler = DeliveryScheduler(db, clock=clock)
+    email_sender = email_sender or NewsletterEmailSender()
+
+    # Check if email is configured
+    if not os.getenv('RESEND_API_KEY'):
+        print("WARNING: RESEND_API_KEY not configured. Emails cannot be sent.")
+
+    window_minutes = int(os.getenv('DELIVERY_WINDOW_MINUTES', str(DEFAULT_WINDOW_MINUTES)))
+
+    if args.worker:
+        newsletters_sent = run_worker(
+            db, scheduler, email_sender, window_minutes,
+            queue=queue,
+            batch_size=args.batch_size,
+            poll_seconds=args.poll,
+            lease_seconds=int(os.getenv('DELIVERY_LEASE_SECONDS', str(DEFAULT_LEASE_SECONDS))),
+            retry_seconds=int(os.getenv('DELIVERY_RETRY_SECONDS', str(DEFAULT_RETRY_SECONDS))),
+            pregenerate_minutes=int(os.getenv('DELIVERY_PREGENERATE_MINUTES', '90')),
+            generator_factory=generator_factory,
+            on_results=on_results,
+            fetch_items=fetch_items
+        )
+    else:
+        newsletters_sent = run_once(
+            db, scheduler, email_sender, window_minutes,
+            generator_factory=generator_factory, on_results=on_results, fetch_items=fetch_items
+        )
+        if newsletters_sent is None:
+            return 1
+
     print(f"\n{'='*60}")
     print(f"Delivery check complete")
     print(f"Newsletters sent: {newsletters_sent}")
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Scheduled Delivery Simulation
+Replays send_scheduled_newsletters.main in worker mode against a virtual clock
+over a simulated day or week, with synthetic users and stand-in database,
+source, LLM and email backends, and reports delivery lateness, peak
+concurrency and rate-limit stalls
+
+Capacity settings are read from the environment exactly as in production
+(DELIVERY_GENERATE_PER_MINUTE, DELIVERY_SEND_PER_SECOND, DELIVERY_*_WORKERS,
+DELIVERY_PREGENERATE_MINUTES, ...), e.g.
+
+    DELIVERY_GENERATE_PER_MINUTE=60 python scripts/simulate_delivery.py --users 2000 --days 7
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytz
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import send_scheduled_newsletters
+from utils.clock import SimulationFinished, VirtualClock
+from utils.delivery_queue import SQLiteDeliveryQueue
+from utils.delivery_scheduler import DeliveryScheduler
+
+
+# Share of synthetic users per delivery frequency
+FREQUENCY_WEIGHTS = {'daily': 0.6, 'weekdays': 0.3, 'weekly': 0.1}
+
+# Morning hours people pick, and their popularity
+DELIVERY_HOUR_WEIGHTS = {5: 1, 6: 3, 7: 6, 8: 5, 9: 2, 10: 1}
+
+# Round times are far more popular than odd ones
+DELIVERY_MINUTE_WEIGHTS = {0: 6, 15: 1, 30: 3, 45: 1}
+
+# Source types synthetic users follow
+SOURCE_TYPES = ['newsletter', 'youtube', 'twitter']
+
+
+class InFlight:
+    """Counts calls in progress and remembers the peak"""
+
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def track(self):
+        with self._lock:
+            self.active += 1
+            self.calls += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+class SimulatedDB:
+    """Stand-in for CreatorPulseDB: users with sources from a shared pool, fixed round-trip latency"""
+
+    def __init__(self, clock, round_trip_seconds: float):
+        self.clock = clock
+        self.round_trip_seconds = round_trip_seconds
+        self.requests = InFlight()
+        self.sources = {}
+
+    def _round_trip(self):
+        with self.requests.track():
+            self.clock.sleep(self.round_trip_seconds)
+
+    def is_configured(self):
+        return True
+
+    def get_sources(self, user_id):
+        self._round_trip()
+        return self.sources.get(user_id, [])
+
+    def get_user_trend_settings(self, user_id):
+        self._round_trip()
+        return {}
+
+    def get_style_training(self, user_id):
+        self._round_trip()
+        return []
+
+    def get_keyword_baselines(self, user_id, keywords):
+        self._round_trip()
+        return []
+
+    def save_keyword_baselines(self, rows):
+        self._round_trip()
+        return True
+
+
+class SimulatedGenerator:
+    """Stand-in for NewsletterGenerator with log-normal LLM latency"""
+
+    def __init__(self, clock, rng, mean_seconds: float, in_flight: InFlight):
+        self.clock = clock
+        self.rng = rng
+        self.mean_seconds = mean_seconds
+        self.in_flight = in_flight
+
+    def generate_newsletter(self, content_items, title, **kwargs):
+        with self.in_flight.track():
+            self.clock.sleep(self.mean_seconds * self.rng.lognormvariate(0, 0.5) / np.exp(0.125))
+        return f"# {title}\n\n" + "\n\n".join(item.get('title', '') for item in content_items)
+
+
+class SimulatedSourceFetcher:
+    """Stand-in for fetching one source (RSS, YouTube, Twitter) with fixed latency"""
+
+    def __init__(self, clock, seconds: float, items_per_source: int = 5):
+        self.clock = clock
+        self.seconds = seconds
+        self.items_per_source = items_per_source
+        self.in_flight = InFlight()
+
+    def __call__(self, source_type, identifier):
+        with self.in_flight.track():
+            self.clock.sleep(self.seconds)
+        published_at = self.clock.now().isoformat()
+        return [
+            {
+                'title': f"{identifier} post {number}",
+                'description': f"News from {identifier}",
+                'source_type': source_type,
+                'url': f"https://example.com/{identifier}/{number}",
+                'published_at': published_at
+            }
+            for number in range(self.items_per_source)
+        ]
+
+
+class SimulatedEmailSender:
+    """Stand-in for NewsletterEmailSender with fixed latency and random failures"""
+
+    def __init__(self, clock, rng, seconds: float, failure_rate: float):
+        self.clock = clock
+        self.rng = rng
+        self.seconds = seconds
+        self.failure_rate = failure_rate
+        self.in_flight = InFlight()
+        self._rng_lock = threading.Lock()
+
+    def send_newsletter(self, to_emails, subject, content, from_email=None, **kwargs):
+        with self.in_flight.track():
+            self.clock.sleep(self.seconds)
+        with self._rng_lock:
+            failed = self.rng.random() < self.failure_rate
+        if failed:
+            return {'success': False, 'error': 'Simulated provider error'}
+        return {'success': True, 'id': f"sim-{self.in_flight.calls}"}
+
+
+def make_users(queue, scheduler, db, count: int, start: datetime, rng: random.Random, source_pool: int, sources_per_user: int) -> None:
+    """Store synthetic delivery schedules spread across timezones and frequencies, each following a few shared sources"""
+    timezones = DeliveryScheduler.get_available_timezones()
+    frequencies = rng.choices(list(FREQUENCY_WEIGHTS), weights=list(FREQUENCY_WEIGHTS.values()), k=count)
+    hours = rng.choices(list(DELIVERY_HOUR_WEIGHTS), weights=list(DELIVERY_HOUR_WEIGHTS.values()), k=count)
+    minutes = rng.choices(list(DELIVERY_MINUTE_WEIGHTS), weights=list(DELIVERY_MINUTE_WEIGHTS.values()), k=count)
+    zones = [rng.choice(timezones) for _ in range(count)]
+    times = [f"{hour:02d}:{minute:02d}:00" for hour, minute in zip(hours, minutes)]
+
+    next_deliveries = scheduler.get_next_delivery_times(times, zones, frequencies, after=start)
+
+    pool = [
+        {'source_type': SOURCE_TYPES[number % len(SOURCE_TYPES)], 'identifier': f"source-{number:04d}"}
+        for number in range(source_pool)
+    ]
+
+    for index in range(count):
+        user_id = f"sim-user-{index:05d}"
+        db.sources[user_id] = rng.sample(pool, min(sources_per_user, len(pool)))
+        queue.upsert_schedule(
+            user_id,
+            times[index],
+            zones[index],
+            frequencies[index],
+            recipients=[f"{user_id}-{number}@example.com" for number in range(rng.randint(1, 3))],
+            next_delivery_at=datetime.fromtimestamp(int(next_deliveries[index].astype(np.int64)), pytz.UTC)
+        )
+
+
+def parse_timestamp(value):
+    return datetime.fromisoformat(value) if value else None
+
+
+def percentiles(values):
+    """p50/p90/p99/max of a list of seconds (zeros if empty)"""
+    if not values:
+        return {'p50': 0.0, 'p90': 0.0, 'p99': 0.0, 'max': 0.0}
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return {'p50': p50, 'p90': p90, 'p99': p99, 'max': max(values)}
+
+
+def main():
+    """Run the simulation and print the report"""
+    midnight = datetime.now(pytz.UTC).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=1000, help='Synthetic users')
+    parser.add_argument('--days', type=float, default=1, help='Simulated days')
+    parser.add_argument('--start', default=midnight.isoformat(), help='Simulated start time (ISO, UTC)')
+    parser.add_argument('--workers', type=int, default=2, help='Delivery workers running at once')
+    parser.add_argument('--batch-size', type=int, default=25, help='Deliveries claimed at a time')
+    parser.add_argument('--poll', type=float, default=30, help='Worker poll interval (virtual seconds)')
+    parser.add_argument('--speed', type=float, default=600, help='Virtual seconds per real second while busy')
+    parser.add_argument('--llm-seconds', type=float, default=8, help='Mean newsletter generation time')
+    parser.add_argument('--send-seconds', type=float, default=0.5, help='Email API call time')
+    parser.add_argument('--db-seconds', type=float, default=0.05, help='Database round-trip time')
+    parser.add_argument('--fetch-seconds', type=float, default=2, help='Time to fetch one source')
+    parser.add_argument('--sources', type=int, default=200, help='Distinct sources shared by the users')
+    parser.add_argument('--sources-per-user', type=int, default=4, help='Sources each user follows')
+    parser.add_argument('--send-failure-rate', type=float, default=0.01, help='Share of failed email calls')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--verbose', action='store_true', help='Show the delivery script output')
+    args = parser.parse_args()
+
+    start = datetime.fromisoformat(args.start)
+    if start.tzinfo is None:
+        start = pytz.UTC.localize(start)
+    end = start + timedelta(days=args.days)
+
+    # Rate limits of the simulation must not share state with real processes
+    os.environ['RATE_LIMIT_STATE_DIR'] = tempfile.mkdtemp(prefix='creatorpulse_simulation_')
+
+    rng = random.Random(args.seed)
+    clock = VirtualClock(start, speed=args.speed, end=end, participants=args.workers)
+    queue = SQLiteDeliveryQueue(clock=clock)
+    db = SimulatedDB(clock, args.db_seconds)
+    fetcher = SimulatedSourceFetcher(clock, args.fetch_seconds)
+    email_sender = SimulatedEmailSender(clock, random.Random(args.seed + 1), args.send_seconds, args.send_failure_rate)
+    llm_calls = InFlight()
+    llm_rng = random.Random(args.seed + 2)
+    llm_lock = threading.Lock()
+
+    def generator_factory():
+        with llm_lock:
+            worker_rng = random.Random(llm_rng.random())
+        return SimulatedGenerator(clock, worker_rng, args.llm_seconds, llm_calls)
+
+    print(f"🧪 Simulating {args.users} users from {start} to {end} with {args.workers} worker(s)")
+    make_users(queue, DeliveryScheduler(clock=clock), db, args.users, start, rng, args.sources, args.sources_per_user)
+
+    stage_totals = {}
+    stage_lock = threading.Lock()
+
+    def collect(pipeline, results):
+        with stage_lock:
+            for name, stats in pipeline.stage_stats.items():
+                totals = stage_totals.setdefault(name, {'stalls': 0, 'stall_seconds': 0.0, 'peak_active': 0})
+                totals['stalls'] += stats['stalls']
+                totals['stall_seconds'] += stats['stall_seconds']
+                totals['peak_active'] = max(totals['peak_active'], stats['peak_active'])
+        if clock.time() >= clock.end:
+            # Whatever is still queued now counts as backlog
+            raise SimulationFinished()
+
+    errors = []
+
+    def run_worker():
+        try:
+            send_scheduled_newsletters.main(
+                ['--worker', '--poll', str(args.poll), '--batch-size', str(args.batch_size)],
+                db=db,
+                email_sender=email_sender,
+                queue=queue,
+                clock=clock,
+                generator_factory=generator_factory,
+                on_results=collect,
+                fetch_items=fetcher
+            )
+        except SimulationFinished:
+            pass
+        except Exception as e:
+            errors.append(e)
+        finally:
+            clock.leave()
+
+    output = sys.stdout if args.verbose else io.StringIO()
+    real_start = datetime.now()
+    with contextlib.redirect_stdout(output):
+        threads = [threading.Thread(target=run_worker, name=f"simulated-worker-{number}") for number in range(args.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    real_seconds = (datetime.now() - real_start).total_seconds()
+
+    for error in errors:
+        print(f"❌ Worker stopped: {error}")
+
+    # Lateness of every delivery that was due inside the simulated period
+    due = [row for row in queue.get_deliveries() if parse_timestamp(row['scheduled_for']) < end]
+    by_status = {}
+    for row in due:
+        by_status[row['status']] = by_status.get(row['status'], 0) + 1
+    lateness = [
+        (parse_timestamp(row['sent_at']) - parse_timestamp(row['scheduled_for'])).total_seconds()
+        for row in due if row['status'] == 'sent'
+    ]
+    pregenerated = sum(1 for row in due if row['status'] == 'sent' and row['generated_at'])
+
+    print(f"\n{'='*60}")
+    print(f"Simulated {args.days:g} day(s) in {real_seconds:.1f}s")
+    print(f"Deliveries due: {len(due)}  " + "  ".join(f"{status}: {count}" for status, count in sorted(by_status.items())))
+    print(f"Pre-generated before sending: {pregenerated} of {len(lateness)}")
+
+    stats = percentiles(lateness)
+    print("\nLateness (seconds after the scheduled time; negative is early)")
+    print("  " + "  ".join(f"{name}: {value:8.1f}" for name, value in stats.items()))
+
+    print("\nPeak concurrency")
+    print(f"  Source fetches:   {fetcher.in_flight.peak:4d}  ({fetcher.in_flight.calls} calls)")
+    print(f"  LLM calls:        {llm_calls.peak:4d}  ({llm_calls.calls} calls)")
+    print(f"  Email calls:      {email_sender.in_flight.peak:4d}  ({email_sender.in_flight.calls} calls)")
+    print(f"  Database calls:   {db.requests.peak:4d}  ({db.requests.calls} calls)")
+    for name, totals in sorted(stage_totals.items()):
+        print(f"  Stage {name + ':':<11} {totals['peak_active']:4d}  (per worker batch)")
+
+    print("\nRate-limit stalls")
+    for name, totals in sorted(stage_totals.items()):
+        if totals['stalls']:
+            print(f"  {name}: {totals['stalls']} stalls, {totals['stall_seconds']:.0f}s waiting")
+    if not any(totals['stalls'] for totals in stage_totals.values()):
+        print("  none")
+    print(f"{'='*60}")
+
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    exit_code = main()
+    sys.exit(exit_code)
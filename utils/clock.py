@@ -0,0 +1,140 @@
+"""
+Clocks for CreatorPulse
+The delivery path reads time through a clock object, so the same code runs
+against wall-clock time in production and against virtual time in the
+delivery simulation (scripts/simulate_delivery.py)
+"""
+
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional
+
+import pytz
+
+
+class SimulationFinished(Exception):
+    """Raised by VirtualClock.idle once the simulated period is over"""
+
+
+class SystemClock:
+    """Wall-clock time"""
+
+    def time(self) -> float:
+        """Current time as a Unix timestamp"""
+        return time.time()
+
+    def now(self, tz=pytz.UTC) -> datetime:
+        """Current time as an aware datetime"""
+        return datetime.now(tz)
+
+    def sleep(self, seconds: float) -> None:
+        """Sleep while work is in progress (e.g. waiting for a rate limit)"""
+        time.sleep(seconds)
+
+    def wait(self, event: threading.Event, seconds: float) -> bool:
+        """Wait for an event or a timeout; returns True if the event was set"""
+        return event.wait(seconds)
+
+    def idle(self, seconds: float) -> None:
+        """Sleep while the caller has nothing to do"""
+        time.sleep(seconds)
+
+
+SYSTEM_CLOCK = SystemClock()
+
+
+class VirtualClock(SystemClock):
+    """
+    Simulated time for replaying the delivery path faster than real time
+
+    While any participant is working, virtual time runs `speed` times faster
+    than real time, so threads, queues and rate limits behave as they do in
+    production. Once every participant is idle (see idle), the clock jumps
+    straight to the earliest wake-up, so quiet hours cost nothing.
+    """
+
+    def __init__(
+        self,
+        start: datetime,
+        speed: float = 600.0,
+        end: Optional[datetime] = None,
+        participants: int = 1
+    ):
+        """
+        Initialize virtual clock
+
+        Args:
+            start: Virtual time at creation (aware datetime)
+            speed: Virtual seconds per real second while work is in progress
+            end: Virtual time at which idle raises SimulationFinished
+            participants: Number of threads that call idle (e.g. delivery
+                workers); the clock only skips ahead when all of them are idle
+        """
+        self.speed = speed
+        self.end = end.timestamp() if end else None
+        self.participants = participants
+        self._origin = start.timestamp()
+        self._real_origin = time.perf_counter()
+        self._skipped = 0.0
+        self._wakeups: List[float] = []
+        self._condition = threading.Condition()
+
+    def _time(self) -> float:
+        return self._origin + self._skipped + (time.perf_counter() - self._real_origin) * self.speed
+
+    def time(self) -> float:
+        """Current virtual time as a Unix timestamp"""
+        with self._condition:
+            return self._time()
+
+    def now(self, tz=pytz.UTC) -> datetime:
+        """Current virtual time as an aware datetime"""
+        return datetime.fromtimestamp(self.time(), tz)
+
+    def sleep(self, seconds: float) -> None:
+        """Sleep for virtual seconds (scaled down to real time)"""
+        if seconds > 0:
+            time.sleep(seconds / self.speed)
+
+    def wait(self, event: threading.Event, seconds: float) -> bool:
+        """Wait for an event or a virtual timeout"""
+        return event.wait(max(seconds, 0) / self.speed)
+
+    def idle(self, seconds: float) -> None:
+        """
+        Sleep for virtual seconds with nothing to do
+
+        Raises:
+            SimulationFinished: If the simulated period is over
+        """
+        with self._condition:
+            now = self._time()
+            if self.end is not None and now >= self.end:
+                raise SimulationFinished()
+
+            wake_at = now + seconds
+            self._wakeups.append(wake_at)
+            if len(self._wakeups) >= self.participants:
+                # Nobody is working: skip to the first wake-up
+                target = min(self._wakeups)
+                if self.end is not None:
+                    target = min(target, self.end)
+                self._skipped += max(target - now, 0.0)
+                self._condition.notify_all()
+
+            while self._time() < wake_at:
+                self._condition.wait((wake_at - self._time()) / self.speed)
+            self._wakeups.remove(wake_at)
+
+    def leave(self) -> None:
+        """Stop counting a participant that will not call idle again"""
+        with self._condition:
+            self.participants = max(self.participants - 1, 0)
+            if self._wakeups and len(self._wakeups) >= self.participants:
+                now = self._time()
+                target = min(self._wakeups)
+                if self.end is not None:
+                    target = min(target, self.end)
+                self._skipped += max(target - now, 0.0)
+                self._condition.notify_all()
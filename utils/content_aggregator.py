@@ -5,13 +5,25 @@ Handles fetching content from various sources: Twitter, YouTube, and Newsletter
 
 import os
 import requests
+from dataclasses import asdict
 from typing import List, Dict, Any, Optional
 import feedparser
 from datetime import datetime, timedelta
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+import numpy as np
 import re
 
+from utils.data_models import Trend
+from utils.trend_detector import TrendDetector as KeywordAnalyzer
+
+# Sparse matrices for keyword co-occurrence (falls back to dense NumPy arrays)
+try:
+    from scipy import sparse
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
 # Free Twitter scraping (no API key needed)
 try:
     from ntscraper import Nitter
@@ -336,10 +348,41 @@ class ContentAggregator:
 
 
 class TrendDetector:
-    """Detects emerging trends from aggregated content"""
+    """Detects emerging topics by clustering co-occurring keywords across aggregated content"""
+
+    SOURCE_LABELS = {
+        'twitter': 'Twitter',
+        'youtube': 'YouTube',
+        'newsletters': 'Newsletters'
+    }
+
+    def __init__(
+        self,
+        max_vocabulary: int = 300,
+        min_document_frequency: int = 2,
+        max_document_ratio: float = 0.5,
+        min_association: float = 0.2,
+        max_keywords_per_topic: int = 5,
+        max_topics: int = 5
+    ):
+        """
+        Initialize topic-based trend detector
 
-    def __init__(self):
-        pass
+        Args:
+            max_vocabulary: Keywords (by document frequency) considered for clustering
+            min_document_frequency: Minimum number of items a keyword must appear in
+            max_document_ratio: Keywords found in a larger share of items are too generic to cluster
+            min_association: Minimum NPMI association for a keyword to join a topic
+            max_keywords_per_topic: Maximum keywords describing one topic
+            max_topics: Maximum number of topics returned
+        """
+        self.max_vocabulary = max_vocabulary
+        self.min_document_frequency = min_document_frequency
+        self.max_document_ratio = max_document_ratio
+        self.min_association = min_association
+        self.max_keywords_per_topic = max_keywords_per_topic
+        self.max_topics = max_topics
+        self.keyword_analyzer = KeywordAnalyzer()
 
     def detect_trends(self, aggregated_content: Dict[str, List[Dict]]) -> List[Dict[str, Any]]:
         """
@@ -351,31 +394,254 @@ class TrendDetector:
         Returns:
             List of trend dictionaries with topic, relevance, and supporting content
         """
-        # Placeholder for trend detection logic
-        # In production, use NLP techniques, keyword extraction, and spike detection
-
-        trends = [
-            {
-                'topic': 'AI-Powered Content Creation',
-                'relevance_score': 0.95,
-                'description': 'Growing interest in AI tools for content generation and curation',
-                'sources': ['Twitter', 'YouTube', 'Newsletters'],
-                'momentum': 'rising'
-            },
-            {
-                'topic': 'Newsletter Platform Evolution',
-                'relevance_score': 0.88,
-                'description': 'New features and integrations in newsletter platforms like Substack and Beehiiv',
-                'sources': ['Newsletters', 'Twitter'],
-                'momentum': 'stable'
-            },
-            {
-                'topic': 'Creator Economy Expansion',
-                'relevance_score': 0.82,
-                'description': 'Increasing opportunities for independent creators across platforms',
-                'sources': ['YouTube', 'Twitter'],
-                'momentum': 'rising'
-            }
-        ]
-
-        return trends
+        return [asdict(trend) for trend in self.detect_topics(aggregated_content)]
+
+    def detect_topics(self, aggregated_content: Dict[str, List[Dict]]) -> List[Trend]:
+        """
+        Cluster co-occurring keywords into topics and score them
+
+        Builds a sparse item x keyword matrix, derives the keyword
+        co-occurrence matrix from it, greedily groups keywords that co-occur
+        more often than chance (normalized PMI) around frequent seed
+        keywords, and scores each topic by coverage, source spread and
+        momentum (share of recent items).
+
+        Args:
+            aggregated_content: Content from ContentAggregator
+
+        Returns:
+            List of Trend objects sorted by relevance
+        """
+        items, sources, timestamps = self._flatten(aggregated_content)
+        if len(items) < self.min_document_frequency:
+            return []
+
+        # Item x keyword incidence as COO coordinates
+        vocabulary: Dict[str, int] = {}
+        rows, cols = [], []
+        for row, item in enumerate(items):
+            for keyword in self.keyword_analyzer.item_keyword_counts(item):
+                col = vocabulary.setdefault(keyword, len(vocabulary))
+                rows.append(row)
+                cols.append(col)
+
+        if not vocabulary:
+            return []
+
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        keywords = np.empty(len(vocabulary), dtype=object)
+        for keyword, col in vocabulary.items():
+            keywords[col] = keyword
+
+        # Keep the most widespread keywords that are not near-universal
+        document_frequency = np.bincount(cols, minlength=len(vocabulary))
+        eligible = np.flatnonzero(
+            (document_frequency >= self.min_document_frequency)
+            & (document_frequency <= self.max_document_ratio * len(items))
+        )
+        if eligible.size == 0:
+            return []
+        order = eligible[np.argsort(-document_frequency[eligible], kind='stable')][:self.max_vocabulary]
+
+        remap = np.full(len(vocabulary), -1, dtype=np.int64)
+        remap[order] = np.arange(order.size)
+        mask = remap[cols] >= 0
+        rows, cols = rows[mask], remap[cols[mask]]
+        keywords = keywords[order]
+        document_frequency = document_frequency[order]
+
+        incidence = self._incidence_matrix(rows, cols, len(items), order.size)
+        cooccurrence = self._cooccurrence(incidence)
+
+        association = self._npmi(cooccurrence, document_frequency, len(items))
+
+        topics = self._cluster(association, document_frequency)
+
+        # Score topics
+        recent = self._recent_mask(timestamps)
+        recent_share = recent.mean() if recent.any() else 0.0
+        available_sources = max(len(set(sources)), 1)
+        sources = np.asarray(sources, dtype=object)
+
+        scored = []
+        for cluster in topics:
+            topic_items = self._items_with_any(incidence, cluster)
+            item_count = int(topic_items.sum())
+            if item_count < self.min_document_frequency:
+                continue
+
+            topic_sources = sorted(set(sources[topic_items]))
+            coverage = item_count / len(items)
+            spread = len(topic_sources) / available_sources
+
+            if recent_share > 0:
+                momentum_ratio = recent[topic_items].mean() / recent_share
+            else:
+                momentum_ratio = 1.0
+
+            if momentum_ratio >= 1.2:
+                momentum = 'rising'
+            elif momentum_ratio <= 0.8:
+                momentum = 'declining'
+            else:
+                momentum = 'stable'
+
+            scored.append((coverage, spread, momentum_ratio, momentum, cluster, topic_sources, item_count))
+
+        if not scored:
+            return []
+
+        max_coverage = max(entry[0] for entry in scored)
+        trends = []
+        for coverage, spread, momentum_ratio, momentum, cluster, topic_sources, item_count in scored:
+            momentum_score = min(momentum_ratio / 2, 1.0)
+            relevance = 0.5 * (coverage / max_coverage) + 0.3 * spread + 0.2 * momentum_score
+            topic_keywords = [str(keywords[index]) for index in cluster]
+
+            trends.append(Trend(
+                topic=' / '.join(keyword.title() for keyword in topic_keywords[:3]),
+                relevance_score=round(float(relevance), 2),
+                description=(
+                    f"{item_count} item(s) across {len(topic_sources)} source type(s) "
+                    f"discuss {', '.join(topic_keywords)}"
+                ),
+                sources=[self.SOURCE_LABELS.get(source, source) for source in topic_sources],
+                momentum=momentum
+            ))
+
+        trends.sort(key=lambda trend: trend.relevance_score, reverse=True)
+        return trends[:self.max_topics]
+
+    @staticmethod
+    def group_by_source(content_items: List[Dict]) -> Dict[str, List[Dict]]:
+        """
+        Group a flat list of content items (as built for generation) by source
+
+        Google Trends items are trends already, not source content, so they
+        are left out.
+
+        Args:
+            content_items: Items with a 'source_type' of 'twitter', 'youtube' or 'newsletter'
+
+        Returns:
+            Dictionary in the shape returned by ContentAggregator.aggregate_all_content
+        """
+        grouped: Dict[str, List[Dict]] = {}
+        for item in content_items:
+            source = item.get('source_type')
+            if not source or source == 'google_trends':
+                continue
+            source = 'newsletters' if source == 'newsletter' else source
+            grouped.setdefault(source, []).append(item)
+        return grouped
+
+    def format_topics_for_newsletter(self, topics: List[Trend]) -> str:
+        """
+        Format detected topics for inclusion in a newsletter
+
+        Args:
+            topics: Trend objects from detect_topics
+
+        Returns:
+            Formatted markdown string (empty if there are no topics)
+        """
+        if not topics:
+            return ""
+
+        momentum_emojis = {'rising': '📈', 'stable': '➡️', 'declining': '📉'}
+
+        output = "## 🧭 Emerging Topics\n\n"
+        for topic in topics:
+            emoji = momentum_emojis.get(topic.momentum, '•')
+            output += f"{emoji} **{topic.topic}** - {topic.description} ({', '.join(topic.sources)})\n"
+
+        return output + "\n"
+
+    def _flatten(self, aggregated_content: Dict[str, List[Dict]]):
+        """Flatten aggregated content into items, source names and timestamps"""
+        items, sources, timestamps = [], [], []
+        for source, source_items in aggregated_content.items():
+            for item in source_items or []:
+                items.append(item)
+                sources.append(source)
+                timestamps.append(self._parse_timestamp(item.get('published_at') or item.get('timestamp')))
+        return items, sources, np.asarray(timestamps, dtype=np.float64)
+
+    @staticmethod
+    def _parse_timestamp(value: Optional[str]) -> float:
+        """Parse an ISO timestamp into epoch seconds (NaN if missing or invalid)"""
+        if not value:
+            return np.nan
+        try:
+            return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+        except ValueError:
+            return np.nan
+
+    @staticmethod
+    def _incidence_matrix(rows: np.ndarray, cols: np.ndarray, n_items: int, n_keywords: int):
+        """Build the binary item x keyword matrix (sparse when SciPy is available)"""
+        data = np.ones(rows.size, dtype=np.float64)
+        if SCIPY_AVAILABLE:
+            return sparse.csr_matrix((data, (rows, cols)), shape=(n_items, n_keywords))
+        matrix = np.zeros((n_items, n_keywords), dtype=np.float64)
+        matrix[rows, cols] = 1.0
+        return matrix
+
+    @staticmethod
+    def _cooccurrence(incidence) -> np.ndarray:
+        """Keyword x keyword co-occurrence counts (X^T X)"""
+        product = incidence.T @ incidence
+        return product.toarray() if SCIPY_AVAILABLE else np.asarray(product)
+
+    def _npmi(self, cooccurrence: np.ndarray, document_frequency: np.ndarray, n_items: int) -> np.ndarray:
+        """Normalized pointwise mutual information between keywords (0 = independent)"""
+        p_joint = cooccurrence / n_items
+        p_keyword = document_frequency.astype(np.float64) / n_items
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pmi = np.log(p_joint / np.outer(p_keyword, p_keyword))
+            npmi = pmi / -np.log(p_joint)
+
+        # Ignore pairs seen together too rarely to be meaningful
+        npmi[(cooccurrence < self.min_document_frequency) | ~np.isfinite(npmi)] = 0.0
+        np.fill_diagonal(npmi, 0.0)
+        return npmi
+
+    @staticmethod
+    def _items_with_any(incidence, cluster: List[int]) -> np.ndarray:
+        """Boolean mask of items containing any of the cluster's keywords"""
+        hits = incidence[:, cluster].sum(axis=1)
+        return np.asarray(hits).ravel() > 0
+
+    def _cluster(self, association: np.ndarray, document_frequency: np.ndarray) -> List[List[int]]:
+        """Greedily group keywords around the most frequent unassigned seeds (singletons are dropped)"""
+        assigned = np.zeros(association.shape[0], dtype=bool)
+        clusters = []
+
+        for seed in np.argsort(-document_frequency, kind='stable'):
+            if assigned[seed]:
+                continue
+
+            candidates = np.flatnonzero((association[seed] >= self.min_association) & ~assigned)
+            candidates = candidates[np.argsort(-association[seed, candidates], kind='stable')]
+            cluster = [int(seed)] + [int(index) for index in candidates[:self.max_keywords_per_topic - 1]]
+
+            assigned[cluster] = True
+            if len(cluster) > 1:
+                clusters.append(cluster)
+
+            if len(clusters) >= self.max_topics * 3:
+                break
+
+        return clusters
+
+    @staticmethod
+    def _recent_mask(timestamps: np.ndarray) -> np.ndarray:
+        """Mark items newer than the median timestamp as recent"""
+        recent = np.zeros(timestamps.shape, dtype=bool)
+        known = ~np.isnan(timestamps)
+        if known.sum() < 2:
+            return recent
+        recent[known] = timestamps[known] > np.median(timestamps[known])
+        return recent
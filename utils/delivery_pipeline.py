@@ -0,0 +1,209 @@
+"""
+Delivery Pipeline for CreatorPulse
+Runs scheduled deliveries as a pipeline of stages (fetch content, generate
+with the LLM, send email), each with its own worker pool and rate limit, so
+users move through the stages concurrently instead of one after another
+"""
+
+import queue
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from utils.clock import SYSTEM_CLOCK
+from utils.rate_limiter import TokenBucket
+
+
+# Queue marker telling a stage worker that no more jobs will arrive
+_DONE = object()
+
+
+class PipelineStage:
+    """One step of the pipeline: a handler run by a bounded pool of workers"""
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[Dict[str, Any]], Dict[str, Any]],
+        workers: int = 1,
+        rate_per_second: Optional[float] = None,
+        burst: float = 1.0,
+        clock=None,
+        rate_limited: Optional[Callable[[Dict[str, Any]], bool]] = None
+    ):
+        """
+        Initialize pipeline stage
+
+        Args:
+            name: Stage name (used in results and as the rate limit bucket name)
+            handler: Called with a job dictionary; returns the job for the next
+                stage. Raising fails the job at this stage.
+            workers: Number of jobs handled at once
+            rate_per_second: Maximum jobs started per second (None for no limit)
+            burst: Jobs that may start at once after an idle period
+            clock: Time source for the rate limit (defaults to the system clock)
+            rate_limited: Optional predicate; jobs for which it returns False
+                (e.g. ones the handler passes through untouched) skip the rate limit
+        """
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.rate_limited = rate_limited
+        self.limiter = None
+        if rate_per_second:
+            self.limiter = TokenBucket(f"delivery_{name}", rate=rate_per_second, capacity=burst, clock=clock)
+
+
+class DeliveryPipeline:
+    """Stages connected by bounded queues; one job per user, failures isolated per job"""
+
+    def __init__(self, stages: List[PipelineStage], queue_size: Optional[int] = None, clock=None):
+        """
+        Initialize delivery pipeline
+
+        Args:
+            stages: Stages in order
+            queue_size: Jobs that may wait in front of each stage (defaults to
+                twice the stage's workers), which keeps a fast stage from
+                running far ahead of a slow one
+            clock: Time source for job timings (defaults to the system clock)
+        """
+        self.stages = stages
+        self.queue_size = queue_size
+        self.clock = clock or SYSTEM_CLOCK
+        self.stage_stats: Dict[str, Dict[str, Any]] = {}
+        self._results: List[Dict[str, Any]] = []
+        self._results_lock = threading.Lock()
+
+    def run(self, jobs: Iterable[Dict[str, Any]], id_key: str = 'user_id') -> List[Dict[str, Any]]:
+        """
+        Push jobs through every stage and wait for them to finish
+
+        Args:
+            jobs: Job dictionaries (each must contain id_key)
+            id_key: Key identifying a job in the results
+
+        Returns:
+            One result per job: {'id', 'success', 'stage', 'error', 'job', 'seconds'}
+            where stage is the failing stage (or the last stage on success).
+            Per-stage counters of the run are left in stage_stats.
+        """
+        self._results = []
+        self.stage_stats = {
+            stage.name: {'active': 0, 'peak_active': 0, 'stalls': 0, 'stall_seconds': 0.0}
+            for stage in self.stages
+        }
+        queues = [
+            queue.Queue(maxsize=self.queue_size or stage.workers * 2)
+            for stage in self.stages
+        ]
+        remaining_workers = [stage.workers for stage in self.stages]
+        remaining_lock = threading.Lock()
+
+        def worker(index: int) -> None:
+            stage = self.stages[index]
+            inbox = queues[index]
+            outbox = queues[index + 1] if index + 1 < len(queues) else None
+
+            while True:
+                job = inbox.get()
+                if job is _DONE:
+                    break
+                job = self._run_stage(stage, job, id_key)
+                if job is None:
+                    continue
+                if outbox is not None:
+                    outbox.put(job)
+                else:
+                    self._record(job, id_key, stage.name)
+
+            # The last worker of a stage to finish closes the next stage
+            with remaining_lock:
+                remaining_workers[index] -= 1
+                closing = remaining_workers[index] == 0
+            if closing and outbox is not None:
+                for _ in range(self.stages[index + 1].workers):
+                    outbox.put(_DONE)
+
+        threads = []
+        for index, stage in enumerate(self.stages):
+            for number in range(stage.workers):
+                thread = threading.Thread(
+                    target=worker,
+                    args=(index,),
+                    name=f"delivery-{stage.name}-{number}",
+                    daemon=True
+                )
+                thread.start()
+                threads.append(thread)
+
+        started_at = self.clock.time()
+        for job in jobs:
+            job.setdefault('_started_at', started_at)
+            queues[0].put(job)
+        for _ in range(self.stages[0].workers):
+            queues[0].put(_DONE)
+
+        for thread in threads:
+            thread.join()
+
+        return list(self._results)
+
+    def _run_stage(self, stage: PipelineStage, job: Dict[str, Any], id_key: str) -> Optional[Dict[str, Any]]:
+        stats = self.stage_stats[stage.name]
+
+        limited = stage.limiter is not None and (stage.rate_limited is None or stage.rate_limited(job))
+        if limited and not stage.limiter.try_acquire():
+            # Stalled on the rate limit
+            waiting_since = self.clock.time()
+            stage.limiter.acquire()
+            with self._results_lock:
+                stats['stalls'] += 1
+                stats['stall_seconds'] += self.clock.time() - waiting_since
+
+        with self._results_lock:
+            stats['active'] += 1
+            stats['peak_active'] = max(stats['peak_active'], stats['active'])
+
+        try:
+            result = stage.handler(job)
+        except Exception as e:
+            self._record(job, id_key, stage.name, error=str(e))
+            return None
+        finally:
+            with self._results_lock:
+                stats['active'] -= 1
+
+        return job if result is None else result
+
+    def _record(self, job: Dict[str, Any], id_key: str, stage: str, error: Optional[str] = None) -> None:
+        result = {
+            'id': job.get(id_key),
+            'success': error is None,
+            'stage': stage,
+            'error': error,
+            'job': job,
+            'seconds': self.clock.time() - job.get('_started_at', self.clock.time())
+        }
+        with self._results_lock:
+            self._results.append(result)
+
+
+def summarize_results(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Summarize pipeline results
+
+    Returns:
+        Dictionary with 'succeeded', 'failed', 'failed_by_stage' and
+        'max_seconds' (time from submission to completion of the slowest job)
+    """
+    failed_by_stage: Dict[str, int] = {}
+    for result in results:
+        if not result['success']:
+            failed_by_stage[result['stage']] = failed_by_stage.get(result['stage'], 0) + 1
+
+    return {
+        'succeeded': sum(1 for result in results if result['success']),
+        'failed': sum(failed_by_stage.values()),
+        'failed_by_stage': failed_by_stage,
+        'max_seconds': max((result['seconds'] for result in results), default=0.0)
+    }
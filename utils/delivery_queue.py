@@ -0,0 +1,665 @@
+"""
+Delivery Queue for CreatorPulse
+Claim-based queue of due newsletter deliveries, so any number of delivery
+workers can drain it in parallel without claiming the same delivery twice.
+Delivery is at least once: a worker that dies after sending but before
+completing a delivery leaves a claim that is sent again once its lease expires.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+import pytz
+
+from utils.clock import SYSTEM_CLOCK
+
+# How long a claim lasts without a heartbeat before another worker may take it
+DEFAULT_LEASE_SECONDS = 300
+
+# Claims after which a delivery is marked failed instead of retried
+DEFAULT_MAX_ATTEMPTS = 3
+
+# First retry delay of a failed delivery; doubled per attempt, at most MAX_RETRY_SECONDS
+DEFAULT_RETRY_SECONDS = 60
+MAX_RETRY_SECONDS = 3600
+
+
+def retry_delay(attempts: int, retry_seconds: int = DEFAULT_RETRY_SECONDS) -> float:
+    """Seconds before a delivery that failed on its attempts-th claim may be claimed again"""
+    return min(retry_seconds * 2 ** max(attempts - 1, 0), MAX_RETRY_SECONDS)
+
+
+class SupabaseDeliveryQueue:
+    """Queue stored in scheduled_newsletters (requires database/create_delivery_claims.sql)"""
+
+    def __init__(self, db):
+        """
+        Initialize Supabase delivery queue
+
+        Args:
+            db: CreatorPulseDB instance
+        """
+        self.db = db
+
+    def _rpc(self, name: str, params: Dict[str, Any]) -> Any:
+        return self.db.client.rpc(name, params).execute().data
+
+    def enqueue_due(self, window_minutes: int = 60) -> Optional[int]:
+        """
+        Create a pending delivery for every user due within the window
+
+        Returns:
+            Number of deliveries created (already queued ones are skipped), or None on error
+        """
+        try:
+            return int(self._rpc('enqueue_due_deliveries', {'p_window_minutes': window_minutes}) or 0)
+        except Exception as e:
+            print(f"Error enqueueing due deliveries: {e}")
+            return None
+
+    def claim(
+        self,
+        worker: str,
+        limit: int = 10,
+        lease_seconds: int = DEFAULT_LEASE_SECONDS,
+        send_ahead_seconds: int = 0
+    ) -> List[Dict[str, Any]]:
+        """
+        Claim deliveries to send (and ones whose previous worker's lease expired)
+
+        Args:
+            worker: Worker identifier
+            limit: Maximum deliveries to claim
+            lease_seconds: Claim duration unless renewed by heartbeat
+            send_ahead_seconds: Also claim deliveries due within this many seconds
+
+        Returns:
+            Claimed deliveries joined with the user's schedule; 'content' is
+            non-empty for pre-generated newsletters
+        """
+        try:
+            return self._rpc('claim_deliveries', {
+                'p_worker': worker,
+                'p_limit': limit,
+                'p_lease_seconds': lease_seconds,
+                'p_send_ahead_seconds': send_ahead_seconds
+            }) or []
+        except Exception as e:
+            print(f"Error claiming deliveries: {e}")
+            return []
+
+    def claim_generation(self, worker: str, limit: int = 10, lease_seconds: int = DEFAULT_LEASE_SECONDS) -> List[Dict[str, Any]]:
+        """
+        Claim queued deliveries to generate ahead of their delivery time
+
+        Requires database/add_newsletter_pregeneration.sql.
+
+        Returns:
+            Claimed deliveries ('id', 'user_id', 'scheduled_for', 'delivery_timezone')
+        """
+        try:
+            return self._rpc('claim_generation', {
+                'p_worker': worker,
+                'p_limit': limit,
+                'p_lease_seconds': lease_seconds
+            }) or []
+        except Exception as e:
+            print(f"Error claiming deliveries to generate: {e}")
+            return []
+
+    def save_generated(self, delivery_id: str, worker: str, title: str, content: str) -> bool:
+        """Store a pre-generated newsletter; returns False if the claim was lost"""
+        try:
+            return bool(self._rpc('save_generated_newsletter', {
+                'p_id': delivery_id,
+                'p_worker': worker,
+                'p_title': title,
+                'p_content': content
+            }))
+        except Exception as e:
+            print(f"Error saving generated newsletter: {e}")
+            return False
+
+    def release_generation(self, delivery_id: str, worker: str, error: str) -> bool:
+        """Give up pre-generating a delivery (it is generated at send time instead)"""
+        try:
+            return bool(self._rpc('release_generation', {
+                'p_id': delivery_id,
+                'p_worker': worker,
+                'p_error': error
+            }))
+        except Exception as e:
+            print(f"Error releasing delivery generation: {e}")
+            return False
+
+    def heartbeat(self, delivery_id: str, worker: str, lease_seconds: int = DEFAULT_LEASE_SECONDS) -> Optional[bool]:
+        """Extend a claim; returns False if the worker no longer holds it, None if the call failed"""
+        try:
+            return bool(self._rpc('heartbeat_delivery', {
+                'p_id': delivery_id,
+                'p_worker': worker,
+                'p_lease_seconds': lease_seconds
+            }))
+        except Exception as e:
+            print(f"Error renewing delivery claim: {e}")
+            return None
+
+    def complete(self, delivery_id: str, worker: str, next_delivery_at: datetime) -> Optional[bool]:
+        """
+        Mark a claimed delivery sent and store the user's next delivery
+
+        Returns:
+            True once recorded, False if the worker no longer holds the claim,
+            None if the call failed (the caller should keep the claim and retry)
+        """
+        try:
+            return bool(self._rpc('complete_delivery', {
+                'p_id': delivery_id,
+                'p_worker': worker,
+                'p_next_delivery_at': next_delivery_at.isoformat()
+            }))
+        except Exception as e:
+            print(f"Error completing delivery: {e}")
+            return None
+
+    def fail(
+        self,
+        delivery_id: str,
+        worker: str,
+        error: str,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        next_delivery_at: Optional[datetime] = None,
+        retry_seconds: int = DEFAULT_RETRY_SECONDS
+    ) -> Optional[str]:
+        """
+        Release a failed claim for a retry, or mark it failed after max_attempts
+
+        Args:
+            delivery_id: Delivery identifier
+            worker: Worker identifier
+            error: Error message to store
+            max_attempts: Claims after which the delivery is given up
+            next_delivery_at: User's next delivery, stored if the delivery is given up
+            retry_seconds: Backoff before the first retry (doubled per attempt)
+
+        Returns:
+            'pending', 'ready' or 'failed', or None if the worker no longer held the claim
+        """
+        try:
+            return self._rpc('fail_delivery', {
+                'p_id': delivery_id,
+                'p_worker': worker,
+                'p_error': error,
+                'p_max_attempts': max_attempts,
+                'p_next_delivery_at': next_delivery_at.isoformat() if next_delivery_at else None,
+                'p_retry_seconds': retry_seconds
+            })
+        except Exception as e:
+            print(f"Error releasing failed delivery: {e}")
+            return None
+
+
+def _timestamp(value: Optional[datetime] = None) -> str:
+    """Fixed-width UTC timestamp, so SQLite can compare them as text"""
+    value = value or datetime.now(pytz.UTC)
+    return value.astimezone(pytz.UTC).strftime('%Y-%m-%dT%H:%M:%S.%f+00:00')
+
+
+class SQLiteDeliveryQueue:
+    """
+    Local stand-in for SupabaseDeliveryQueue with the same claim semantics
+
+    Keeps its own copy of the delivery schedules (see upsert_schedule). Claims
+    run in an immediate transaction, so workers in several processes sharing
+    one database file never claim the same delivery.
+    """
+
+    def __init__(self, path: str = ':memory:', clock=None):
+        """
+        Initialize SQLite delivery queue
+
+        Args:
+            path: Database file (':memory:' for a queue private to this object)
+            clock: Time source for leases and timestamps (defaults to the system clock)
+        """
+        self.path = path
+        self.clock = clock or SYSTEM_CLOCK
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS delivery_schedules (
+                user_id TEXT PRIMARY KEY,
+                auto_delivery_enabled INTEGER NOT NULL DEFAULT 1,
+                delivery_time TEXT NOT NULL,
+                delivery_timezone TEXT NOT NULL DEFAULT 'UTC',
+                delivery_frequency TEXT NOT NULL DEFAULT 'daily',
+                delivery_recipients TEXT NOT NULL DEFAULT '[]',
+                last_delivery_at TEXT,
+                next_delivery_at TEXT
+            );
+            CREATE TABLE IF NOT EXISTS scheduled_newsletters (
+                id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                title TEXT NOT NULL DEFAULT '',
+                content TEXT NOT NULL DEFAULT '',
+                scheduled_for TEXT NOT NULL,
+                sent_at TEXT,
+                status TEXT NOT NULL DEFAULT 'pending',
+                recipient_emails TEXT NOT NULL DEFAULT '[]',
+                error_message TEXT,
+                claimed_by TEXT,
+                lease_expires_at TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at TEXT,
+                generated_at TEXT,
+                UNIQUE (user_id, scheduled_for)
+            );
+            CREATE INDEX IF NOT EXISTS idx_scheduled_newsletters_status
+            ON scheduled_newsletters(status, scheduled_for);
+        """)
+
+        # Queue files created before retry backoff existed
+        columns = {row['name'] for row in self._conn.execute('PRAGMA table_info(scheduled_newsletters)')}
+        if 'next_attempt_at' not in columns:
+            self._conn.execute('ALTER TABLE scheduled_newsletters ADD COLUMN next_attempt_at TEXT')
+
+    @contextmanager
+    def _transaction(self):
+        # The thread lock serializes this object's users; BEGIN IMMEDIATE serializes processes
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield self._conn
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
+
+    def upsert_schedule(
+        self,
+        user_id: str,
+        delivery_time: str,
+        timezone: str = 'UTC',
+        frequency: str = 'daily',
+        recipients: Optional[List[str]] = None,
+        next_delivery_at: Optional[datetime] = None,
+        enabled: bool = True
+    ) -> None:
+        """Create or replace a user's delivery schedule"""
+        with self._transaction() as conn:
+            conn.execute("""
+                INSERT INTO delivery_schedules (user_id, auto_delivery_enabled, delivery_time, delivery_timezone,
+                                                delivery_frequency, delivery_recipients, next_delivery_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (user_id) DO UPDATE SET
+                    auto_delivery_enabled = excluded.auto_delivery_enabled,
+                    delivery_time = excluded.delivery_time,
+                    delivery_timezone = excluded.delivery_timezone,
+                    delivery_frequency = excluded.delivery_frequency,
+                    delivery_recipients = excluded.delivery_recipients,
+                    next_delivery_at = excluded.next_delivery_at
+            """, (
+                user_id, int(enabled), delivery_time, timezone, frequency,
+                json.dumps(recipients or []),
+                _timestamp(next_delivery_at) if next_delivery_at else None
+            ))
+
+    def get_schedule(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Get a user's delivery schedule"""
+        with self._lock:
+            row = self._conn.execute('SELECT * FROM delivery_schedules WHERE user_id = ?', (user_id,)).fetchone()
+        return dict(row) if row else None
+
+    def get_deliveries(self, user_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get queued deliveries (optionally for one user), oldest first"""
+        query = 'SELECT * FROM scheduled_newsletters'
+        params = ()
+        if user_id is not None:
+            query += ' WHERE user_id = ?'
+            params = (user_id,)
+        with self._lock:
+            rows = self._conn.execute(query + ' ORDER BY scheduled_for', params).fetchall()
+        return [dict(row) for row in rows]
+
+    def enqueue_due(self, window_minutes: int = 60) -> Optional[int]:
+        """Create a pending delivery for every user due within the window"""
+        window_end = self.clock.time() + window_minutes * 60
+        cutoff = _timestamp(datetime.fromtimestamp(window_end, pytz.UTC))
+
+        with self._transaction() as conn:
+            cursor = conn.execute("""
+                INSERT OR IGNORE INTO scheduled_newsletters (id, user_id, scheduled_for, recipient_emails, status)
+                SELECT lower(hex(randomblob(16))), user_id, next_delivery_at, delivery_recipients, 'pending'
+                FROM delivery_schedules
+                WHERE auto_delivery_enabled = 1
+                AND next_delivery_at IS NOT NULL
+                AND next_delivery_at <= ?
+            """, (cutoff,))
+            return cursor.rowcount
+
+    def _cancel_stale(self, conn, now: datetime) -> None:
+        """Cancel queued deliveries whose schedule was disabled or moved after they were enqueued"""
+        conn.execute("""
+            UPDATE scheduled_newsletters
+            SET status = 'cancelled', claimed_by = NULL, lease_expires_at = NULL,
+                error_message = 'Schedule changed after the delivery was queued'
+            WHERE (
+                status IN ('pending', 'ready')
+                OR (status IN ('generating', 'sending') AND lease_expires_at < :now)
+            )
+            AND NOT EXISTS (
+                SELECT 1 FROM delivery_schedules p
+                WHERE p.user_id = scheduled_newsletters.user_id
+                AND p.auto_delivery_enabled = 1
+                AND p.next_delivery_at = scheduled_newsletters.scheduled_for
+            )
+        """, {'now': _timestamp(now)})
+
+    def claim(
+        self,
+        worker: str,
+        limit: int = 10,
+        lease_seconds: int = DEFAULT_LEASE_SECONDS,
+        send_ahead_seconds: int = 0
+    ) -> List[Dict[str, Any]]:
+        """
+        Claim deliveries to send (and ones whose previous worker's lease expired)
+
+        Failed deliveries are not claimed again before their next_attempt_at.
+        Deliveries whose schedule was disabled or moved since they were
+        enqueued are cancelled instead.
+        """
+        now = self.clock.now()
+        lease_until = _timestamp(datetime.fromtimestamp(now.timestamp() + lease_seconds, pytz.UTC))
+        send_before = _timestamp(datetime.fromtimestamp(now.timestamp() + send_ahead_seconds, pytz.UTC))
+
+        with self._transaction() as conn:
+            self._cancel_stale(conn, now)
+            ids = [row['id'] for row in conn.execute("""
+                SELECT s.id FROM scheduled_newsletters s
+                JOIN delivery_schedules p ON p.user_id = s.user_id
+                WHERE p.auto_delivery_enabled = 1
+                AND p.next_delivery_at = s.scheduled_for
+                AND (
+                    (s.status = 'sending' AND s.lease_expires_at < :now)
+                    OR (
+                        s.scheduled_for <= :send_before
+                        AND (s.next_attempt_at IS NULL OR s.next_attempt_at <= :now)
+                        AND (
+                            s.status IN ('pending', 'ready')
+                            OR (s.status = 'generating' AND s.lease_expires_at < :now)
+                        )
+                    )
+                )
+                ORDER BY s.scheduled_for
+                LIMIT :limit
+            """, {'now': _timestamp(now), 'send_before': send_before, 'limit': limit}).fetchall()]
+
+            for delivery_id in ids:
+                conn.execute("""
+                    UPDATE scheduled_newsletters
+                    SET status = 'sending', claimed_by = ?, lease_expires_at = ?, attempts = attempts + 1
+                    WHERE id = ?
+                """, (worker, lease_until, delivery_id))
+
+            rows = [conn.execute("""
+                SELECT s.id, s.user_id, s.scheduled_for, s.attempts, s.title, s.content,
+                       p.delivery_time, p.delivery_timezone, p.delivery_frequency,
+                       p.delivery_recipients, p.last_delivery_at
+                FROM scheduled_newsletters s
+                JOIN delivery_schedules p ON p.user_id = s.user_id
+                WHERE s.id = ?
+            """, (delivery_id,)).fetchone() for delivery_id in ids]
+
+        claimed = []
+        for row in rows:
+            if row is None:
+                continue
+            delivery = dict(row)
+            delivery['delivery_recipients'] = json.loads(delivery['delivery_recipients'])
+            claimed.append(delivery)
+        return claimed
+
+    def claim_generation(self, worker: str, limit: int = 10, lease_seconds: int = DEFAULT_LEASE_SECONDS) -> List[Dict[str, Any]]:
+        """Claim queued deliveries to generate ahead of their delivery time"""
+        now = self.clock.now()
+        lease_until = _timestamp(datetime.fromtimestamp(now.timestamp() + lease_seconds, pytz.UTC))
+
+        with self._transaction() as conn:
+            rows = conn.execute("""
+                SELECT s.id, s.user_id, s.scheduled_for, p.delivery_timezone
+                FROM scheduled_newsletters s
+                JOIN delivery_schedules p ON p.user_id = s.user_id
+                WHERE p.auto_delivery_enabled = 1
+                AND p.next_delivery_at = s.scheduled_for
+                AND s.scheduled_for > :now
+                AND (
+                    (s.status = 'pending' AND s.error_message IS NULL)
+                    OR (s.status = 'generating' AND s.lease_expires_at < :now)
+                )
+                ORDER BY s.scheduled_for
+                LIMIT :limit
+            """, {'now': _timestamp(now), 'limit': limit}).fetchall()
+
+            for row in rows:
+                conn.execute("""
+                    UPDATE scheduled_newsletters
+                    SET status = 'generating', claimed_by = ?, lease_expires_at = ?
+                    WHERE id = ?
+                """, (worker, lease_until, row['id']))
+
+        return [dict(row) for row in rows]
+
+    def save_generated(self, delivery_id: str, worker: str, title: str, content: str) -> bool:
+        """Store a pre-generated newsletter; returns False if the claim was lost"""
+        with self._transaction() as conn:
+            cursor = conn.execute("""
+                UPDATE scheduled_newsletters
+                SET status = 'ready', title = ?, content = ?, generated_at = ?,
+                    claimed_by = NULL, lease_expires_at = NULL
+                WHERE id = ? AND claimed_by = ? AND status = 'generating'
+            """, (title, content, _timestamp(self.clock.now()), delivery_id, worker))
+            return cursor.rowcount > 0
+
+    def release_generation(self, delivery_id: str, worker: str, error: str) -> bool:
+        """Give up pre-generating a delivery (it is generated at send time instead)"""
+        with self._transaction() as conn:
+            cursor = conn.execute("""
+                UPDATE scheduled_newsletters
+                SET status = 'pending', error_message = ?, claimed_by = NULL, lease_expires_at = NULL
+                WHERE id = ? AND claimed_by = ? AND status = 'generating'
+            """, (error, delivery_id, worker))
+            return cursor.rowcount > 0
+
+    def heartbeat(self, delivery_id: str, worker: str, lease_seconds: int = DEFAULT_LEASE_SECONDS) -> Optional[bool]:
+        """Extend a claim; returns False if the worker no longer holds it, None if the call failed"""
+        lease_until = _timestamp(datetime.fromtimestamp(self.clock.time() + lease_seconds, pytz.UTC))
+        try:
+            with self._transaction() as conn:
+                cursor = conn.execute("""
+                    UPDATE scheduled_newsletters SET lease_expires_at = ?
+                    WHERE id = ? AND claimed_by = ? AND status IN ('sending', 'generating')
+                """, (lease_until, delivery_id, worker))
+                return cursor.rowcount > 0
+        except sqlite3.Error as e:
+            print(f"Error renewing delivery claim: {e}")
+            return None
+
+    def complete(self, delivery_id: str, worker: str, next_delivery_at: datetime) -> Optional[bool]:
+        """Mark a claimed delivery sent and store the user's next delivery (see SupabaseDeliveryQueue.complete)"""
+        now = _timestamp(self.clock.now())
+        try:
+            with self._transaction() as conn:
+                row = conn.execute("""
+                    SELECT user_id FROM scheduled_newsletters
+                    WHERE id = ? AND claimed_by = ? AND status = 'sending'
+                """, (delivery_id, worker)).fetchone()
+                if row is None:
+                    return False
+
+                conn.execute("""
+                    UPDATE scheduled_newsletters
+                    SET status = 'sent', sent_at = ?, lease_expires_at = NULL, error_message = NULL
+                    WHERE id = ?
+                """, (now, delivery_id))
+                conn.execute("""
+                    UPDATE delivery_schedules SET last_delivery_at = ?, next_delivery_at = ?
+                    WHERE user_id = ?
+                """, (now, _timestamp(next_delivery_at), row['user_id']))
+                return True
+        except sqlite3.Error as e:
+            print(f"Error completing delivery: {e}")
+            return None
+
+    def fail(
+        self,
+        delivery_id: str,
+        worker: str,
+        error: str,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        next_delivery_at: Optional[datetime] = None,
+        retry_seconds: int = DEFAULT_RETRY_SECONDS
+    ) -> Optional[str]:
+        """Release a failed claim for a retry after a backoff, or mark it failed after max_attempts"""
+        with self._transaction() as conn:
+            row = conn.execute("""
+                SELECT user_id, attempts, generated_at FROM scheduled_newsletters
+                WHERE id = ? AND claimed_by = ? AND status = 'sending'
+            """, (delivery_id, worker)).fetchone()
+            if row is None:
+                return None
+
+            if row['attempts'] >= max_attempts:
+                status = 'failed'
+            else:
+                # A pre-generated newsletter is retried without generating it again
+                status = 'ready' if row['generated_at'] else 'pending'
+            next_attempt_at = datetime.fromtimestamp(
+                self.clock.time() + retry_delay(row['attempts'], retry_seconds), pytz.UTC
+            )
+            conn.execute("""
+                UPDATE scheduled_newsletters
+                SET status = ?, claimed_by = NULL, lease_expires_at = NULL, error_message = ?,
+                    next_attempt_at = ?
+                WHERE id = ?
+            """, (status, error, _timestamp(next_attempt_at), delivery_id))
+            if status == 'failed' and next_delivery_at is not None:
+                conn.execute(
+                    'UPDATE delivery_schedules SET next_delivery_at = ? WHERE user_id = ?',
+                    (_timestamp(next_delivery_at), row['user_id'])
+                )
+            return status
+
+
+class LeaseHeartbeat:
+    """Renews a worker's claims in the background while it works on them"""
+
+    def __init__(self, queue, worker: str, lease_seconds: int = DEFAULT_LEASE_SECONDS, clock=None):
+        """
+        Initialize lease heartbeat
+
+        Args:
+            queue: SupabaseDeliveryQueue or SQLiteDeliveryQueue
+            worker: Worker identifier holding the claims
+            lease_seconds: Claim duration; claims are renewed every lease_seconds / 3
+            clock: Time source for the renewal interval (defaults to the system clock)
+        """
+        self.queue = queue
+        self.worker = worker
+        self.lease_seconds = lease_seconds
+        self.interval = max(lease_seconds / 3, 1)
+        self.clock = clock or SYSTEM_CLOCK
+        self._held: Set[str] = set()
+        self._lost: Set[str] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> 'LeaseHeartbeat':
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='delivery-heartbeat', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return False
+
+    def track(self, delivery_id: str) -> None:
+        """Start renewing a claim (a fresh claim of a delivery lost earlier is held again)"""
+        with self._lock:
+            self._lost.discard(delivery_id)
+            self._held.add(delivery_id)
+
+    def release(self, delivery_id: str) -> None:
+        """Stop renewing a claim (after completing or failing it)"""
+        with self._lock:
+            self._held.discard(delivery_id)
+
+    def holds(self, delivery_id: str) -> bool:
+        """
+        Whether the worker still holds a claim, checked with the queue
+
+        Called right before sending, so a worker whose claim lapsed (and may
+        have been taken over) does not send.
+        """
+        with self._lock:
+            if delivery_id in self._lost:
+                return False
+
+        renewed = self.queue.heartbeat(delivery_id, self.worker, self.lease_seconds)
+        if renewed:
+            return True
+
+        if renewed is False:
+            with self._lock:
+                self._lost.add(delivery_id)
+                self._held.discard(delivery_id)
+        # A failed check is not proof the claim is lost, but not proof it is held either
+        return False
+
+    def _run(self) -> None:
+        while not self.clock.wait(self._stop, self.interval):
+            with self._lock:
+                held = list(self._held)
+            for delivery_id in held:
+                # None means the call failed; keep the claim and renew it next time
+                if self.queue.heartbeat(delivery_id, self.worker, self.lease_seconds) is False:
+                    print(f"⚠️ Lost claim on delivery {delivery_id}")
+                    with self._lock:
+                        self._lost.add(delivery_id)
+                        self._held.discard(delivery_id)
+
+
+def make_worker_id() -> str:
+    """Identifier of this process as a delivery worker"""
+    import socket
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def create_delivery_queue(db=None, clock=None):
+    """
+    Create the delivery queue selected by DELIVERY_QUEUE_BACKEND
+
+    'sqlite' uses DELIVERY_QUEUE_SQLITE_PATH (a local stand-in for tests and
+    single-host runs); anything else uses the Supabase tables.
+
+    Args:
+        db: CreatorPulseDB instance (required for the Supabase backend)
+        clock: Time source for the SQLite backend (defaults to the system clock)
+
+    Returns:
+        SupabaseDeliveryQueue or SQLiteDeliveryQueue
+    """
+    if os.getenv('DELIVERY_QUEUE_BACKEND', '').lower() == 'sqlite':
+        return SQLiteDeliveryQueue(os.getenv('DELIVERY_QUEUE_SQLITE_PATH') or 'delivery_queue.sqlite', clock=clock)
+    return SupabaseDeliveryQueue(db)
@@ -4,10 +4,14 @@ Handles scheduled newsletter delivery with timezone support
 """
 
 from datetime import datetime, time, timedelta
-from typing import Dict, List, Optional, Any
+from functools import lru_cache
+from typing import Dict, List, Optional, Any, Sequence, Tuple, Union
+import numpy as np
 import pytz
 from enum import Enum
 
+from utils.clock import SYSTEM_CLOCK
+
 
 class DeliveryFrequency(Enum):
     """Newsletter delivery frequency options"""
@@ -17,17 +21,158 @@ class DeliveryFrequency(Enum):
     CUSTOM = "custom"  # Custom days
 
 
+# Day masks: bit 0 is Monday, bit 6 is Sunday
+ALL_DAYS_MASK = 0b1111111
+WEEKDAYS_MASK = 0b0011111
+
+# Weekly schedules may deliver on any day; compute_next_delivery_at spaces them a week apart
+FREQUENCY_DAY_MASKS = {
+    "daily": ALL_DAYS_MASK,
+    "weekdays": WEEKDAYS_MASK,
+    "weekly": ALL_DAYS_MASK,
+    "custom": ALL_DAYS_MASK
+}
+
+SECONDS_PER_DAY = 86400
+
+
+def day_mask(days: Sequence[int]) -> int:
+    """Build a day mask from weekday numbers (0=Monday ... 6=Sunday)"""
+    mask = 0
+    for day in days:
+        mask |= 1 << int(day)
+    return mask
+
+
+@lru_cache(maxsize=None)
+def zone_offsets(timezone_str: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    UTC offset transitions of a timezone, computed once per zone
+
+    Returns:
+        Tuple of (transition instants as UTC seconds, UTC offset in seconds
+        from each transition on), both int64 and sorted by instant
+    """
+    tz = pytz.timezone(timezone_str)
+    transition_times = getattr(tz, '_utc_transition_times', None)
+    transition_info = getattr(tz, '_transition_info', None)
+
+    if not transition_times or not transition_info:
+        # Fixed-offset zone
+        offset = tz.utcoffset(datetime(2000, 1, 1)) or timedelta(0)
+        return np.array([np.iinfo(np.int64).min], dtype=np.int64), np.array([int(offset.total_seconds())], dtype=np.int64)
+
+    instants = np.array(transition_times, dtype='datetime64[s]').astype(np.int64)
+    offsets = np.array([int(info[0].total_seconds()) for info in transition_info], dtype=np.int64)
+    return instants, offsets
+
+
+@lru_cache(maxsize=4096)
+def _time_of_day_seconds(delivery_time: Union[time, str]) -> int:
+    """Seconds after midnight of a delivery time (seconds within the minute are ignored)"""
+    if isinstance(delivery_time, str):
+        parts = [int(part) for part in delivery_time.split(':')]
+        return parts[0] * 3600 + parts[1] * 60
+    return delivery_time.hour * 3600 + delivery_time.minute * 60
+
+
+def _offset_at(instants: np.ndarray, offsets: np.ndarray, utc_seconds: np.ndarray) -> np.ndarray:
+    """UTC offset in effect at each UTC instant"""
+    index = np.searchsorted(instants, utc_seconds, side='right') - 1
+    return offsets[np.maximum(index, 0)]
+
+
+def _local_to_utc(instants: np.ndarray, offsets: np.ndarray, local_seconds: np.ndarray) -> np.ndarray:
+    """
+    Convert local wall-clock times (seconds since the local epoch) to UTC seconds
+
+    A wall time repeated when clocks go back resolves to its first occurrence;
+    one skipped when clocks go forward resolves to the same distance past the
+    gap (02:30 on a spring-forward night becomes 03:30).
+    """
+    offset_before = _offset_at(instants, offsets, local_seconds - SECONDS_PER_DAY)
+    offset_after = _offset_at(instants, offsets, local_seconds + SECONDS_PER_DAY)
+
+    utc_before = local_seconds - offset_before
+    utc_after = local_seconds - offset_after
+    before_valid = _offset_at(instants, offsets, utc_before) == offset_before
+    after_valid = _offset_at(instants, offsets, utc_after) == offset_after
+
+    return np.where(
+        before_valid & after_valid,
+        np.minimum(utc_before, utc_after),
+        np.where(after_valid & ~before_valid, utc_after, utc_before)
+    )
+
+
+def next_delivery_times(
+    delivery_seconds: np.ndarray,
+    timezones: Sequence[str],
+    day_masks: np.ndarray,
+    after: Union[int, np.ndarray]
+) -> np.ndarray:
+    """
+    Next delivery instant of many schedules at once
+
+    Schedules are grouped by timezone; each group is computed with array
+    operations against the zone's cached offset transitions.
+
+    Args:
+        delivery_seconds: Local delivery time of day in seconds, per schedule
+        timezones: Timezone name per schedule
+        day_masks: Allowed weekdays per schedule (bit 0 = Monday)
+        after: UTC seconds (scalar or per schedule); results are strictly later
+
+    Returns:
+        UTC instants as datetime64[s]; NaT for schedules with an empty day mask
+    """
+    delivery_seconds = np.asarray(delivery_seconds, dtype=np.int64)
+    day_masks = np.asarray(day_masks, dtype=np.int64)
+    after = np.broadcast_to(np.asarray(after, dtype=np.int64), delivery_seconds.shape)
+    result = np.full(delivery_seconds.shape, np.iinfo(np.int64).min, dtype=np.int64)
+
+    zone_codes: Dict[str, int] = {}
+    zone_index = np.fromiter(
+        (zone_codes.setdefault(zone, len(zone_codes)) for zone in timezones),
+        dtype=np.int64,
+        count=len(delivery_seconds)
+    )
+
+    for zone_name, zone_number in zone_codes.items():
+        instants, offsets = zone_offsets(zone_name)
+        members = np.nonzero((zone_index == zone_number) & (day_masks != 0))[0]
+
+        local_after = after[members] + _offset_at(instants, offsets, after[members])
+        first_day = np.floor_divide(local_after, SECONDS_PER_DAY)
+
+        # Eight days always include the delivery weekday after the current one;
+        # each pass only looks at schedules not resolved by an earlier day
+        for day_offset in range(8):
+            if len(members) == 0:
+                break
+            days = first_day + day_offset
+            weekday = (days + 3) % 7  # 1970-01-01 was a Thursday
+            candidate = _local_to_utc(instants, offsets, days * SECONDS_PER_DAY + delivery_seconds[members])
+            hit = (candidate > after[members]) & (((day_masks[members] >> weekday) & 1) == 1)
+            result[members[hit]] = candidate[hit]
+            members, first_day = members[~hit], first_day[~hit]
+
+    return result.astype('datetime64[s]')
+
+
 class DeliveryScheduler:
     """Manages scheduled newsletter delivery"""
 
-    def __init__(self, db=None):
+    def __init__(self, db=None, clock=None):
         """
         Initialize delivery scheduler
 
         Args:
             db: Database client for storing schedules
+            clock: Time source for "now" (defaults to the system clock)
         """
         self.db = db
+        self.clock = clock or SYSTEM_CLOCK
 
     def create_schedule(
         self,
@@ -68,14 +213,21 @@ class DeliveryScheduler:
                     'error': f'Invalid timezone: {timezone}'
                 }
 
+            # Store the next delivery too so the delivery script can query by due time
+            next_delivery_at = None
+            if enabled:
+                next_delivery_at = self.get_next_delivery_time(delivery_time, timezone, frequency).isoformat()
+
             # Update user profile with delivery preferences
             result = self.db.client.table('profiles').update({
                 'auto_delivery_enabled': enabled,
                 'delivery_time': delivery_time.isoformat(),
                 'delivery_timezone': timezone,
                 'delivery_frequency': frequency,
-                'delivery_recipients': recipient_emails or []
+                'delivery_recipients': recipient_emails or [],
+                'next_delivery_at': next_delivery_at
             }).eq('id', user_id).execute()
+            self._discard_queued_deliveries(user_id)
 
             return {
                 'success': True,
@@ -89,6 +241,18 @@ class DeliveryScheduler:
                 'error': str(e)
             }
 
+    def _discard_queued_deliveries(self, user_id: str) -> None:
+        """Delete a user's queued (not yet claimed) deliveries after their schedule changed"""
+        try:
+            self.db.client.table('scheduled_newsletters')\
+                .delete()\
+                .eq('user_id', user_id)\
+                .in_('status', ['pending', 'ready'])\
+                .execute()
+        except Exception as e:
+            # Workers cancel stale rows when claiming, so this only tidies up early
+            print(f"Error discarding queued deliveries: {e}")
+
     def get_schedule(self, user_id: str) -> Optional[Dict[str, Any]]:
         """
         Get delivery schedule for a user
@@ -105,7 +269,7 @@ class DeliveryScheduler:
         try:
             result = self.db.client.table('profiles')\
                 .select('auto_delivery_enabled, delivery_time, delivery_timezone, '
-                       'delivery_frequency, delivery_recipients')\
+                       'delivery_frequency, delivery_recipients, next_delivery_at')\
                 .eq('id', user_id)\
                 .single()\
                 .execute()
@@ -116,7 +280,8 @@ class DeliveryScheduler:
                     'time': result.data.get('delivery_time'),
                     'timezone': result.data.get('delivery_timezone', 'UTC'),
                     'frequency': result.data.get('delivery_frequency', 'daily'),
-                    'recipients': result.data.get('delivery_recipients', [])
+                    'recipients': result.data.get('delivery_recipients', []),
+                    'next_delivery_at': result.data.get('next_delivery_at')
                 }
 
             return None
@@ -139,8 +304,10 @@ class DeliveryScheduler:
 
         try:
             self.db.client.table('profiles').update({
-                'auto_delivery_enabled': False
+                'auto_delivery_enabled': False,
+                'next_delivery_at': None
             }).eq('id', user_id).execute()
+            self._discard_queued_deliveries(user_id)
 
             return {
                 'success': True,
@@ -154,7 +321,9 @@ class DeliveryScheduler:
         self,
         delivery_time: time,
         timezone_str: str,
-        frequency: str = "daily"
+        frequency: str = "daily",
+        after: Optional[datetime] = None,
+        days: Optional[int] = None
     ) -> datetime:
         """
         Calculate next delivery time in user's timezone
@@ -163,45 +332,194 @@ class DeliveryScheduler:
             delivery_time: Scheduled delivery time (local)
             timezone_str: User's timezone
             frequency: Delivery frequency
+            after: Find the first delivery after this time (defaults to now)
+            days: Optional day mask (see day_mask) overriding the frequency's days
 
         Returns:
             Next delivery datetime (UTC)
         """
-        # Get user's timezone
-        user_tz = pytz.timezone(timezone_str)
-        utc_tz = pytz.UTC
-
-        # Get current time in user's timezone
-        now_utc = datetime.now(utc_tz)
-        now_local = now_utc.astimezone(user_tz)
-
-        # Create next delivery datetime in user's timezone
-        next_delivery_local = now_local.replace(
-            hour=delivery_time.hour,
-            minute=delivery_time.minute,
-            second=0,
-            microsecond=0
+        next_delivery = self.get_next_delivery_times(
+            [delivery_time], [timezone_str], [frequency], after=after,
+            day_masks=None if days is None else [days]
+        )[0]
+        if np.isnat(next_delivery):
+            raise ValueError('Schedule has no delivery days')
+
+        return datetime.fromtimestamp(int(next_delivery.astype(np.int64)), pytz.UTC)
+
+    def get_next_delivery_times(
+        self,
+        delivery_times: Sequence[Union[time, str]],
+        timezones: Sequence[str],
+        frequencies: Sequence[str],
+        after: Optional[datetime] = None,
+        day_masks: Optional[Sequence[int]] = None
+    ) -> np.ndarray:
+        """
+        Calculate next delivery times of many schedules at once
+
+        Args:
+            delivery_times: Local delivery times (time objects or 'HH:MM[:SS]' strings)
+            timezones: Timezone names
+            frequencies: Delivery frequencies ('daily', 'weekdays', 'weekly', 'custom')
+            after: Find the first deliveries after this time (defaults to now)
+            day_masks: Optional day masks (see day_mask) overriding the frequencies' days
+
+        Returns:
+            UTC instants as datetime64[s] (NaT for schedules without delivery days)
+        """
+        for timezone_str in set(timezones):
+            zone_offsets(timezone_str)  # Raises UnknownTimeZoneError for invalid zones
+
+        seconds = np.fromiter(map(_time_of_day_seconds, delivery_times), dtype=np.int64, count=len(delivery_times))
+
+        if day_masks is None:
+            day_masks = [FREQUENCY_DAY_MASKS.get(frequency, ALL_DAYS_MASK) for frequency in frequencies]
+
+        after = after or self.clock.now()
+        return next_delivery_times(seconds, timezones, np.asarray(day_masks), int(after.timestamp()))
+
+    def compute_next_delivery_at(
+        self,
+        delivery_time: time,
+        timezone_str: str,
+        frequency: str = "daily",
+        last_delivery: Optional[datetime] = None,
+        after: Optional[datetime] = None
+    ) -> datetime:
+        """
+        Calculate the delivery time to store in profiles.next_delivery_at
+
+        Unlike get_next_delivery_time, weekly schedules wait a week after the
+        last delivery.
+
+        Args:
+            delivery_time: Scheduled delivery time (local)
+            timezone_str: User's timezone
+            frequency: Delivery frequency
+            last_delivery: Last time newsletter was sent
+            after: Find the first delivery after this time (defaults to now)
+
+        Returns:
+            Next delivery datetime (UTC)
+        """
+        after = after or self.clock.now()
+        if frequency == "weekly" and last_delivery:
+            after = max(after, last_delivery + timedelta(days=6))
+
+        return self.get_next_delivery_time(delivery_time, timezone_str, frequency, after=after)
+
+    def get_due_users(self, window_minutes: int = 60) -> Optional[List[Dict[str, Any]]]:
+        """
+        Get users whose next delivery is due within a window (or overdue)
+
+        Requires database/add_next_delivery_at.sql. Users saved before that
+        migration are returned with next_delivery_at set to None.
+
+        Args:
+            window_minutes: How far ahead of now to include deliveries
+
+        Returns:
+            List of user schedule rows, or None if the query failed
+        """
+        if not self.db or not self.db.is_configured():
+            return None
+
+        try:
+            result = self.db.client.rpc('get_due_deliveries', {
+                'p_window_minutes': window_minutes
+            }).execute()
+            return result.data or []
+        except Exception as e:
+            print(f"Error fetching due deliveries: {e}")
+            return None
+
+    def set_next_delivery_at(self, user_id: str, next_delivery_at: datetime) -> bool:
+        """
+        Store a user's next delivery time
+
+        Args:
+            user_id: User identifier
+            next_delivery_at: Next delivery datetime (UTC)
+
+        Returns:
+            True if stored
+        """
+        if not self.db or not self.db.is_configured():
+            return False
+
+        try:
+            self.db.client.table('profiles').update({
+                'next_delivery_at': next_delivery_at.isoformat()
+            }).eq('id', user_id).execute()
+            return True
+        except Exception as e:
+            print(f"Error storing next delivery time: {e}")
+            return False
+
+    def next_delivery_after_send(
+        self,
+        delivery_time: time,
+        timezone_str: str,
+        frequency: str,
+        scheduled_for: Optional[datetime] = None
+    ) -> datetime:
+        """
+        Calculate the delivery following one that is being sent now
+
+        Args:
+            delivery_time: Scheduled delivery time (local)
+            timezone_str: User's timezone
+            frequency: Delivery frequency
+            scheduled_for: Delivery slot being sent (UTC); it may be slightly
+                ahead of now, and is never returned again
+
+        Returns:
+            Next delivery datetime (UTC)
+        """
+        now_utc = self.clock.now()
+        after = max(scheduled_for, now_utc) if scheduled_for else now_utc
+        # Weekly spacing counts from the slot, so sending ahead of it does not pull the next one in
+        return self.compute_next_delivery_at(
+            delivery_time, timezone_str, frequency, last_delivery=scheduled_for or now_utc, after=after
         )
 
-        # If scheduled time has passed today, move to tomorrow
-        if next_delivery_local <= now_local:
-            next_delivery_local += timedelta(days=1)
+    def record_delivery(
+        self,
+        user_id: str,
+        delivery_time: time,
+        timezone_str: str,
+        frequency: str,
+        scheduled_for: Optional[datetime] = None
+    ) -> Optional[datetime]:
+        """
+        Record a successful delivery and advance next_delivery_at
 
-        # Handle different frequencies
-        if frequency == "weekdays":
-            # If next day is weekend, move to Monday
-            while next_delivery_local.weekday() >= 5:  # 5=Saturday, 6=Sunday
-                next_delivery_local += timedelta(days=1)
+        Args:
+            user_id: User identifier
+            delivery_time: Scheduled delivery time (local)
+            timezone_str: User's timezone
+            frequency: Delivery frequency
+            scheduled_for: Delivery slot that was just sent (UTC); the next
+                delivery is the first one after it
 
-        elif frequency == "weekly":
-            # Always send on the same day of week
-            # If already past this week's day, move to next week
-            pass  # Handled by the +1 day logic above
+        Returns:
+            The stored next delivery time, or None if it could not be stored
+        """
+        if not self.db or not self.db.is_configured():
+            return None
 
-        # Convert to UTC
-        next_delivery_utc = next_delivery_local.astimezone(utc_tz)
+        next_delivery = self.next_delivery_after_send(delivery_time, timezone_str, frequency, scheduled_for)
 
-        return next_delivery_utc
+        try:
+            self.db.client.rpc('record_delivery', {
+                'p_user_id': user_id,
+                'p_next_delivery_at': next_delivery.isoformat()
+            }).execute()
+            return next_delivery
+        except Exception as e:
+            print(f"Error recording delivery: {e}")
+            return None
 
     def should_send_today(
         self,
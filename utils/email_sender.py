@@ -4,19 +4,85 @@ Handles sending newsletters via Resend API
 """
 
 import os
-from typing import List, Optional, Dict
+import random
+from typing import Any, Callable, List, Optional, Dict
+import requests
 import resend
 import markdown
+from urllib3.exceptions import NewConnectionError
+
+from utils.clock import SYSTEM_CLOCK
+from utils.rate_limiter import get_resend_limiter
+
+
+# Resend accepts at most 50 addresses per message and 100 messages per batch request
+RESEND_MAX_RECIPIENTS = 50
+RESEND_MAX_BATCH_SIZE = 100
+
+# 'batch': one message per recipient, sent in chunks through the batch endpoint
+# 'individual': one message and request per recipient
+# 'shared': one message with every recipient in To (in chunks of RESEND_MAX_RECIPIENTS)
+FANOUT_MODES = ('batch', 'individual', 'shared')
+
+# Rejected before processing, so sending again cannot deliver a message twice.
+# Timeouts and 5xx errors are not retried: the messages may already be on their way.
+RETRYABLE_STATUS_CODES = {429}
+RETRY_BASE_SECONDS = 1.0
+RETRY_MAX_SECONDS = 30.0
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Whether a failed Resend request is safe to send again (it was never processed)"""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(error, requests.exceptions.ConnectionError):
+        # Only when the connection could not be opened, i.e. nothing was sent
+        reason = getattr(error.args[0], 'reason', None) if error.args else None
+        return isinstance(reason, NewConnectionError)
+
+    code = getattr(error, 'code', None)
+    try:
+        return code is not None and int(code) in RETRYABLE_STATUS_CODES
+    except (TypeError, ValueError):
+        return False
 
 
 class NewsletterEmailSender:
     """Send newsletters via Resend API"""
 
-    def __init__(self):
+    def __init__(
+        self,
+        fanout: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        limiter=None,
+        clock=None
+    ):
+        """
+        Initialize email sender
+
+        Args:
+            fanout: 'batch', 'individual' or 'shared' (defaults to EMAIL_FANOUT_MODE or 'batch')
+            batch_size: Messages per batch request (defaults to EMAIL_BATCH_SIZE, at most 100)
+            max_retries: Retries of a failed request (defaults to EMAIL_MAX_RETRIES or 3)
+            limiter: Token bucket for API requests (defaults to the one shared by every Resend caller)
+            clock: Time source for retry backoff (defaults to the system clock)
+        """
         self.api_key = os.getenv('RESEND_API_KEY')
         if self.api_key:
             resend.api_key = self.api_key
 
+        self.fanout = (fanout or os.getenv('EMAIL_FANOUT_MODE') or 'batch').lower()
+        if self.fanout not in FANOUT_MODES:
+            print(f"⚠️ Unknown email fan-out mode '{self.fanout}', using 'batch'")
+            self.fanout = 'batch'
+
+        batch_size = batch_size or int(os.getenv('EMAIL_BATCH_SIZE', str(RESEND_MAX_BATCH_SIZE)))
+        self.batch_size = max(1, min(batch_size, RESEND_MAX_BATCH_SIZE))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv('EMAIL_MAX_RETRIES', '3'))
+        self.limiter = limiter or get_resend_limiter()
+        self.clock = clock or SYSTEM_CLOCK
+
     def send_newsletter(
         self,
         to_emails: List[str],
@@ -28,6 +94,11 @@ class NewsletterEmailSender:
         """
         Send a newsletter to a list of recipients
 
+        Unless the fan-out mode is 'shared', every recipient gets their own
+        message, so addresses are never exposed to other recipients. Requests
+        are rate limited; requests rejected before processing (rate limited or
+        not connected) are retried with backoff, others are reported as failed.
+
         Args:
             to_emails: List of recipient email addresses
             subject: Email subject line
@@ -36,7 +107,9 @@ class NewsletterEmailSender:
             reply_to: Optional reply-to email address
 
         Returns:
-            Dictionary with send results
+            Dictionary with send results: 'success' (every recipient sent),
+            'sent', 'failed' and 'results' with one
+            {'email', 'success', 'id', 'error', 'attempts'} per recipient
         """
         if not self.api_key:
             return {
@@ -45,37 +118,124 @@ class NewsletterEmailSender:
                 'message': 'Please add your Resend API key to .env file'
             }
 
+        # Each address once, in the order given
+        recipients = list(dict.fromkeys(email.strip() for email in to_emails if email and email.strip()))
+        if not recipients:
+            return {
+                'success': False,
+                'error': 'No recipients',
+                'message': 'Failed to send newsletter: no recipient email addresses'
+            }
+
         try:
             # Convert Markdown to HTML
             html_content = self._markdown_to_html(content)
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e),
+                'message': f'Failed to send newsletter: {str(e)}'
+            }
 
-            # Send email via Resend
+        def build_params(to: List[str]) -> Dict[str, Any]:
             params = {
                 "from": from_email,
-                "to": to_emails,
+                "to": to,
                 "subject": subject,
                 "html": html_content,
                 "text": content  # Fallback plain text
             }
-
             if reply_to:
                 params["reply_to"] = reply_to
+            return params
 
-            response = resend.Emails.send(params)
+        if self.fanout == 'individual':
+            results = []
+            for email in recipients:
+                outcome = self._request(lambda: resend.Emails.send(build_params([email])))
+                results.append(self._recipient_result(email, outcome, (outcome['response'] or {}).get('id')))
+        elif self.fanout == 'shared':
+            results = []
+            for chunk in self._chunks(recipients, RESEND_MAX_RECIPIENTS):
+                outcome = self._request(lambda: resend.Emails.send(build_params(chunk)))
+                message_id = (outcome['response'] or {}).get('id')
+                results.extend(self._recipient_result(email, outcome, message_id) for email in chunk)
+        else:
+            results = []
+            for chunk in self._chunks(recipients, self.batch_size):
+                outcome = self._request(lambda: resend.Batch.send([build_params([email]) for email in chunk]))
+                # The batch endpoint returns one id per message, in request order
+                ids = [item.get('id') for item in (outcome['response'] or {}).get('data') or []]
+                ids += [None] * (len(chunk) - len(ids))
+                results.extend(
+                    self._recipient_result(email, outcome, message_id)
+                    for email, message_id in zip(chunk, ids)
+                )
 
-            return {
-                'success': True,
-                'id': response.get('id'),
-                'recipients': len(to_emails),
-                'message': f'Newsletter sent to {len(to_emails)} recipient(s)'
-            }
+        return self._summarize(results)
 
-        except Exception as e:
-            return {
-                'success': False,
-                'error': str(e),
-                'message': f'Failed to send newsletter: {str(e)}'
-            }
+    def _request(self, send: Callable[[], Any]) -> Dict[str, Any]:
+        """
+        Make one rate-limited API request, retrying transient failures
+
+        Returns:
+            Dictionary with 'response' (None on failure), 'error' and 'attempts'
+        """
+        attempts = 0
+        while True:
+            attempts += 1
+            self.limiter.acquire()
+            try:
+                return {'response': send(), 'error': None, 'attempts': attempts}
+            except Exception as e:
+                if attempts > self.max_retries or not _is_retryable(e):
+                    return {'response': None, 'error': str(e), 'attempts': attempts}
+                # Full jitter keeps senders that failed together from retrying together
+                backoff = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+                self.clock.sleep(random.uniform(0, backoff))
+
+    @staticmethod
+    def _chunks(items: List[str], size: int) -> List[List[str]]:
+        return [items[index:index + size] for index in range(0, len(items), size)]
+
+    @staticmethod
+    def _recipient_result(email: str, outcome: Dict[str, Any], message_id: Optional[str]) -> Dict[str, Any]:
+        return {
+            'email': email,
+            'success': outcome['error'] is None,
+            'id': message_id,
+            'error': outcome['error'],
+            'attempts': outcome['attempts']
+        }
+
+    @staticmethod
+    def _summarize(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Overall result of a send from the per-recipient results"""
+        sent = [result for result in results if result['success']]
+        failed = [result for result in results if not result['success']]
+
+        summary = {
+            'success': not failed,
+            'id': sent[0]['id'] if sent else None,
+            'recipients': len(results),
+            'sent': len(sent),
+            'failed': len(failed),
+            'results': results
+        }
+
+        if not failed:
+            summary['message'] = f'Newsletter sent to {len(sent)} recipient(s)'
+        elif sent:
+            summary['error'] = failed[0]['error']
+            summary['message'] = (
+                f'Newsletter sent to {len(sent)} of {len(results)} recipient(s); '
+                f'failed for {", ".join(result["email"] for result in failed)}'
+            )
+        else:
+            summary['error'] = failed[0]['error']
+            summary['message'] = f'Failed to send newsletter: {failed[0]["error"]}'
+
+        return summary
 
     def send_test_email(
         self,
@@ -0,0 +1,137 @@
+"""
+Enrichment Queue for CreatorPulse
+Fetches related queries for trending keywords in the background, in priority
+order, so neither the daily job nor a page render waits on Google
+"""
+
+import heapq
+import itertools
+import threading
+from typing import Callable, Dict, List, Optional
+
+
+class EnrichmentQueue:
+    """Priority queue of keywords drained by a single background worker"""
+
+    def __init__(self, discovery_factory: Optional[Callable] = None):
+        """
+        Initialize enrichment queue
+
+        Args:
+            discovery_factory: Callable returning a TrendsDiscovery (defaults to
+                a blocking TrendsDiscovery, so the worker waits out the rate limit)
+        """
+        self.discovery_factory = discovery_factory
+        self._heap: List = []
+        self._pending: Dict[str, float] = {}
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._listeners: List[Callable[[str, Dict], None]] = []
+        self._worker: Optional[threading.Thread] = None
+        self._stopped = False
+
+    def submit(self, keyword: str, priority: float = 1000) -> bool:
+        """
+        Queue a keyword for enrichment
+
+        Args:
+            keyword: Keyword to fetch related queries for
+            priority: Lower runs first (e.g. the trend's rank)
+
+        Returns:
+            True if the keyword was queued or moved up, False if it was already
+            queued with an equal or better priority
+        """
+        from utils.trends_discovery import related_queries_key
+
+        key = related_queries_key(keyword)
+        if not key:
+            return False
+
+        with self._condition:
+            current = self._pending.get(key)
+            if current is not None and current <= priority:
+                return False
+
+            # Older, lower-priority heap entries are skipped when popped
+            self._pending[key] = priority
+            heapq.heappush(self._heap, (priority, next(self._counter), keyword))
+            self._condition.notify()
+
+        self._ensure_worker()
+        return True
+
+    def add_listener(self, listener: Callable[[str, Dict], None]) -> None:
+        """Register a callback called with (keyword, related) after each fetch"""
+        self._listeners.append(listener)
+
+    def pending_count(self) -> int:
+        """Number of keywords waiting to be enriched"""
+        with self._condition:
+            return len(self._pending)
+
+    def stop(self) -> None:
+        """Stop the worker after its current keyword"""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+
+    def _ensure_worker(self) -> None:
+        with self._condition:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._stopped = False
+            self._worker = threading.Thread(target=self._run, name='trend-enrichment', daemon=True)
+            self._worker.start()
+
+    def _next_keyword(self) -> Optional[str]:
+        from utils.trends_discovery import related_queries_key
+
+        with self._condition:
+            while not self._stopped:
+                while self._heap:
+                    priority, _, keyword = heapq.heappop(self._heap)
+                    key = related_queries_key(keyword)
+                    if self._pending.get(key) == priority:
+                        del self._pending[key]
+                        return keyword
+                self._condition.wait()
+        return None
+
+    def _run(self) -> None:
+        if self.discovery_factory is None:
+            from utils.trends_discovery import TrendsDiscovery
+            discovery = TrendsDiscovery()
+        else:
+            discovery = self.discovery_factory()
+
+        while True:
+            keyword = self._next_keyword()
+            if keyword is None:
+                return
+
+            try:
+                related = discovery.fetch_related_queries(keyword)
+            except Exception as e:
+                print(f"Error enriching '{keyword}': {e}")
+                continue
+
+            for listener in self._listeners:
+                try:
+                    listener(keyword, related)
+                except Exception as e:
+                    print(f"Error in enrichment listener: {e}")
+
+
+# Global enrichment queue
+_enrichment_queue = None
+_enrichment_queue_lock = threading.Lock()
+
+def get_enrichment_queue() -> EnrichmentQueue:
+    """Get the process-wide enrichment queue"""
+    global _enrichment_queue
+
+    with _enrichment_queue_lock:
+        if _enrichment_queue is None:
+            _enrichment_queue = EnrichmentQueue()
+        return _enrichment_queue
@@ -0,0 +1,267 @@
+"""
+Global Keyword Aggregation for CreatorPulse
+Fetches and counts keywords once per unique source and window, then derives
+each user's trend view by joining their source set against the shared counts
+"""
+
+import time
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple, Any, Callable
+
+from utils.keyword_matcher import KeywordMatcher, normalize_text
+
+
+SourceKey = Tuple[str, str]  # (source_type, identifier)
+
+
+def source_key(source: Dict) -> SourceKey:
+    """Build the key identifying a source shared between users"""
+    return (source['source_type'], source['identifier'].strip())
+
+
+def fetch_source_items(aggregator, source_type: str, identifier: str, days_back: int = 7) -> List[Dict[str, Any]]:
+    """
+    Fetch and normalize the content of a single source
+
+    Args:
+        aggregator: ContentAggregator instance
+        source_type: 'twitter', 'youtube' or 'newsletter'
+        identifier: Handle, channel or RSS URL
+        days_back: Number of days to look back
+
+    Returns:
+        List of content items in the shape used for newsletter generation
+    """
+    items = []
+
+    if source_type == 'youtube':
+        for video in aggregator.fetch_youtube_content([identifier], days_back=days_back, max_results=5):
+            items.append({
+                'title': video['title'],
+                'description': video['description'],
+                'source_type': 'youtube',
+                'url': video['url'],
+                'channel': video['channel'],
+                'published_at': video['published_at']
+            })
+    elif source_type == 'newsletter':
+        for article in aggregator.fetch_newsletter_content([identifier], days_back=days_back):
+            items.append({
+                'title': article['title'],
+                'description': article.get('content', ''),
+                'source_type': 'newsletter',
+                'url': article['url'],
+                'author': article['author'],
+                'published_at': article['published_at']
+            })
+    elif source_type == 'twitter':
+        for tweet in aggregator.fetch_twitter_content([identifier], days_back=days_back, max_tweets=10):
+            items.append({
+                'title': f"Tweet by @{tweet['author']}",
+                'description': tweet['content'],
+                'source_type': 'twitter',
+                'url': tweet['url'],
+                'author': tweet['author'],
+                'published_at': tweet['timestamp']
+            })
+
+    return items
+
+
+class GlobalKeywordIndex:
+    """
+    Keyword counts per unique source for one aggregation window
+
+    Sources are fetched on demand (see ensure_sources) and at most once per
+    window, even when several threads ask for the same source at once.
+    """
+
+    def __init__(self, detector, built_at: Optional[float] = None):
+        """
+        Initialize an empty index
+
+        Args:
+            detector: utils.trend_detector.TrendDetector used for keyword extraction
+            built_at: Unix timestamp of the window the index belongs to
+        """
+        self.detector = detector
+        self.built_at = built_at if built_at is not None else time.time()
+        self.source_items: Dict[SourceKey, List[Dict]] = {}
+        self.source_counts: Dict[SourceKey, Counter] = {}
+        self.custom_counts: Dict[SourceKey, Dict[str, Tuple[int, int]]] = {}
+        self.custom_counted: Dict[SourceKey, Set[str]] = {}
+        self.custom_keywords = set()
+        self.global_counts: Counter = Counter()
+        self._lock = threading.Lock()
+        self._fetching: Dict[SourceKey, threading.Event] = {}
+
+    def add_source(self, key: SourceKey, items: List[Dict]) -> None:
+        """Count the keywords of one source's items (once, regardless of how many users follow it)"""
+        counts = Counter()
+        for item in items:
+            counts.update(self.detector.item_keyword_counts(item))
+
+        with self._lock:
+            self.source_items[key] = items
+            self.source_counts[key] = counts
+            self.global_counts.update(counts)
+
+    def ensure_sources(self, keys: List[SourceKey], fetch_items: Callable[[str, str], List[Dict]]) -> None:
+        """
+        Fetch and count the sources that are not in the index yet
+
+        A source another thread is already fetching is waited for rather
+        than fetched again. A source that fails to fetch is counted as empty.
+
+        Args:
+            keys: Source keys a user needs
+            fetch_items: Callable (source_type, identifier) -> content items
+        """
+        added = False
+        for key in dict.fromkeys(keys):
+            with self._lock:
+                if key in self.source_counts:
+                    continue
+                fetching = self._fetching.get(key)
+                if fetching is None:
+                    fetching = self._fetching[key] = threading.Event()
+                    owner = True
+                else:
+                    owner = False
+
+            if not owner:
+                fetching.wait()
+                continue
+
+            try:
+                try:
+                    items = fetch_items(*key)
+                except Exception as e:
+                    print(f"Error aggregating source {key[0]}:{key[1]}: {e}")
+                    items = []
+                self.add_source(key, items)
+                added = True
+            finally:
+                with self._lock:
+                    self._fetching.pop(key, None)
+                fetching.set()
+
+        if added:
+            self.detector.keyword_cache.save()
+
+    def index_custom_keywords(self, keywords: List[str], keys: Optional[List[SourceKey]] = None) -> None:
+        """
+        Count custom keywords per source, skipping those already counted
+
+        Args:
+            keywords: Custom keywords (of one or several users)
+            keys: Sources to count them in (defaults to every indexed source)
+        """
+        wanted = {normalize_text(keyword): keyword for keyword in keywords if normalize_text(keyword)}
+        with self._lock:
+            self.custom_keywords.update(wanted)
+            if keys is None:
+                keys = list(self.source_items)
+            todo = []
+            for key in dict.fromkeys(keys):
+                if key not in self.source_items:
+                    continue
+                missing = [keyword for normalized, keyword in wanted.items()
+                           if normalized not in self.custom_counted.get(key, set())]
+                if missing:
+                    todo.append((key, self.source_items[key], missing))
+
+        for key, items, missing in todo:
+            hits = {
+                normalize_text(hit['keyword']): (hit['count'], len(hit['items']))
+                for hit in KeywordMatcher(missing).match(items)
+            }
+            with self._lock:
+                self.custom_counts.setdefault(key, {}).update(hits)
+                self.custom_counted.setdefault(key, set()).update(normalize_text(keyword) for keyword in missing)
+
+    def items_for(self, keys: List[SourceKey]) -> List[Dict]:
+        """Get the content items of a user's sources"""
+        items = []
+        for key in dict.fromkeys(keys):
+            items.extend(self.source_items.get(key, []))
+        return items
+
+    def user_trends(
+        self,
+        keys: List[SourceKey],
+        detector=None,
+        custom_keywords: Optional[List[str]] = None,
+        include_spikes: bool = True,
+        top_n: int = 10
+    ) -> Dict[str, Any]:
+        """
+        Build a user's trend view from the shared per-source counts
+
+        Cost is proportional to the user's sources and their distinct
+        keywords, not to the amount of content behind them.
+
+        Args:
+            keys: The user's source keys
+            detector: The user's TrendDetector (for spike baselines); defaults to the index's detector
+            custom_keywords: The user's custom keywords
+            include_spikes: Whether to include spike detection
+            top_n: Number of top trends to return
+
+        Returns:
+            Dictionary in the same shape as TrendDetector.get_trending_topics
+        """
+        detector = detector or self.detector
+        keys = list(dict.fromkeys(keys))
+        counts = Counter()
+        total_items = 0
+        for key in keys:
+            counts.update(self.source_counts.get(key, {}))
+            total_items += len(self.source_items.get(key, []))
+
+        current_keywords = detector.format_keyword_counts(counts.most_common(20), total_items)
+
+        custom_keyword_hits = []
+        for keyword in custom_keywords or []:
+            normalized = normalize_text(keyword)
+            hit_count = 0
+            hit_items = 0
+            for key in keys:
+                count, items = self.custom_counts.get(key, {}).get(normalized, (0, 0))
+                hit_count += count
+                hit_items += items
+            if hit_count:
+                custom_keyword_hits.append({'keyword': keyword.strip(), 'count': hit_count, 'items': hit_items})
+        custom_keyword_hits.sort(key=lambda hit: hit['count'], reverse=True)
+
+        return detector.build_trending_report(
+            current_keywords,
+            total_items=total_items,
+            include_spikes=include_spikes,
+            top_n=top_n,
+            custom_keyword_hits=custom_keyword_hits
+        )
+
+
+# Shared index for the current window
+_global_index = None
+_global_index_lock = threading.Lock()
+
+def get_global_index(detector, window_seconds: int = 3600, now: Optional[float] = None) -> GlobalKeywordIndex:
+    """
+    Get the index for the current window, starting an empty one when the window has passed
+
+    Sources are added by the callers through ensure_sources, so each unique
+    source is fetched at most once per window however many users follow it.
+    now overrides the current time (Unix timestamp).
+    """
+    global _global_index
+
+    if now is None:
+        now = time.time()
+
+    with _global_index_lock:
+        if _global_index is None or now - _global_index.built_at >= window_seconds:
+            _global_index = GlobalKeywordIndex(detector, built_at=now)
+        return _global_index
@@ -0,0 +1,164 @@
+"""
+Keyword Cache for CreatorPulse
+Memoizes per-item keyword counts keyed by a hash of the item's text
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+class KeywordCache:
+    """Bounded LRU cache of per-item keyword counts, optionally persisted to disk"""
+
+    def __init__(self, max_items: int = 20000, path: Optional[str] = None, save_interval: float = 60):
+        """
+        Initialize keyword cache
+
+        Args:
+            max_items: Maximum number of cached items (least recently used are evicted)
+            path: Optional JSON file used to persist the cache between runs
+            save_interval: Minimum seconds between two writes of the file by save()
+        """
+        self.max_items = max_items
+        self.path = path
+        self.save_interval = save_interval
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[str, Dict[str, int]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._last_save = float('-inf')
+        self._dirty = False
+
+        if path:
+            self.load()
+
+    @staticmethod
+    def make_key(text: str, namespace: str = '') -> str:
+        """
+        Build a cache key from an item's text
+
+        Args:
+            text: Combined item text
+            namespace: Extraction settings the counts depend on (e.g. a version tag)
+
+        Returns:
+            Hex digest identifying the text under the given settings
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(namespace.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(text.encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, int]]:
+        """Get cached keyword counts, or None on a miss"""
+        with self._lock:
+            counts = self._entries.get(key)
+            if counts is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return counts
+
+    def put(self, key: str, counts: Dict[str, int]) -> None:
+        """Store keyword counts for an item"""
+        with self._lock:
+            self._entries[key] = counts
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+            self._dirty = True
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        """Get cache hit/miss statistics"""
+        return {'size': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+    def clear(self) -> None:
+        """Remove all cached entries"""
+        with self._lock:
+            self._entries.clear()
+            self._dirty = True
+
+    def load(self) -> None:
+        """Load persisted entries (oldest first) from disk"""
+        if not self.path or not os.path.exists(self.path):
+            return
+
+        try:
+            with open(self.path) as f:
+                entries = json.load(f)
+        except Exception as e:
+            print(f"Error loading keyword cache: {e}")
+            return
+
+        with self._lock:
+            for key, counts in entries.items():
+                self._entries[key] = counts
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+
+    def save(self, force: bool = False) -> None:
+        """
+        Persist entries to disk if anything changed since the last save
+
+        Writes at most once per save_interval, so callers can save after
+        every batch; pass force to write regardless (e.g. at exit).
+        """
+        if not self.path or not self._dirty:
+            return
+
+        # One writer at a time per process; others skip rather than queue up
+        if not self._save_lock.acquire(blocking=force):
+            return
+
+        try:
+            if not force and time.monotonic() - self._last_save < self.save_interval:
+                return
+
+            with self._lock:
+                snapshot = dict(self._entries)
+                self._dirty = False
+
+            # Unique temp file per writer, so processes sharing the file never mix writes
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(tmp_path, 'w') as f:
+                    json.dump(snapshot, f)
+                os.replace(tmp_path, self.path)
+                self._last_save = time.monotonic()
+            except Exception as e:
+                print(f"Error saving keyword cache: {e}")
+                self._dirty = True
+        finally:
+            self._save_lock.release()
+
+
+# Shared process-wide cache
+_keyword_cache = None
+
+def get_keyword_cache() -> KeywordCache:
+    """Get the shared keyword cache (persisted if KEYWORD_CACHE_PATH is set)"""
+    global _keyword_cache
+    if _keyword_cache is None:
+        _keyword_cache = KeywordCache(
+            max_items=int(os.getenv('KEYWORD_CACHE_MAX_ITEMS', '20000')),
+            path=os.getenv('KEYWORD_CACHE_PATH') or None,
+            save_interval=float(os.getenv('KEYWORD_CACHE_SAVE_SECONDS', '60'))
+        )
+        # Throttled saves may leave the latest entries unsaved until exit
+        atexit.register(_keyword_cache.save, force=True)
+    return _keyword_cache
@@ -0,0 +1,199 @@
+"""
+Custom Keyword Matcher for CreatorPulse
+Matches users' custom trend keywords against content with an Aho-Corasick automaton
+"""
+
+import re
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, Iterable, List, Optional, Tuple, Any
+
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase text and collapse whitespace so phrases match across line breaks"""
+    return _WHITESPACE.sub(' ', text.lower()).strip()
+
+
+class AhoCorasick:
+    """Aho-Corasick automaton for matching many patterns in one pass over the text"""
+
+    def __init__(self, patterns: Iterable[str]):
+        """
+        Build the automaton
+
+        Args:
+            patterns: Patterns to match (already normalized)
+        """
+        self.patterns: List[str] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+
+        for pattern in patterns:
+            if pattern:
+                self._add(pattern)
+        self._build_failure_links()
+
+    def _add(self, pattern: str) -> None:
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append(len(self.patterns))
+        self.patterns.append(pattern)
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                if self._fail[next_state] == next_state:
+                    self._fail[next_state] = 0
+                # Inherit matches that end at the failure state
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def search(self, text: str) -> Iterable[Tuple[int, int]]:
+        """
+        Find all pattern occurrences in a text
+
+        Args:
+            text: Normalized text to scan
+
+        Yields:
+            Tuples of (start index, pattern index)
+        """
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for pattern_index in self._output[state]:
+                yield position - len(self.patterns[pattern_index]) + 1, pattern_index
+
+
+class KeywordMatcher:
+    """Counts whole-word occurrences of a keyword list across content items"""
+
+    def __init__(self, keywords: List[str]):
+        """
+        Initialize keyword matcher
+
+        Args:
+            keywords: Keywords or phrases to match (case-insensitive)
+        """
+        self.keywords: List[str] = []
+        normalized = []
+        seen = set()
+        for keyword in keywords:
+            pattern = normalize_text(keyword)
+            if pattern and pattern not in seen:
+                seen.add(pattern)
+                self.keywords.append(keyword.strip())
+                normalized.append(pattern)
+
+        self.automaton = AhoCorasick(normalized)
+
+    def count(self, text: str) -> Dict[int, int]:
+        """
+        Count keyword occurrences in a text
+
+        Args:
+            text: Raw text to scan
+
+        Returns:
+            Mapping of keyword index to number of whole-word occurrences
+        """
+        text = normalize_text(text)
+        counts: Dict[int, int] = {}
+        for start, index in self.automaton.search(text):
+            end = start + len(self.automaton.patterns[index])
+            # Only accept matches that are not part of a longer word
+            if start > 0 and text[start - 1].isalnum():
+                continue
+            if end < len(text) and text[end].isalnum():
+                continue
+            counts[index] = counts.get(index, 0) + 1
+        return counts
+
+    def match(self, content_items: List[Dict]) -> List[Dict[str, Any]]:
+        """
+        Match keywords against content items
+
+        Args:
+            content_items: List of content dictionaries
+
+        Returns:
+            List of {'keyword', 'count', 'items'} for keywords with at least
+            one hit, sorted by count
+        """
+        if not self.keywords:
+            return []
+
+        hits: Dict[int, Dict[str, Any]] = {}
+        for item in content_items:
+            for index, count in self.count(_item_text(item)).items():
+                entry = hits.setdefault(index, {'keyword': self.keywords[index], 'count': 0, 'items': []})
+                entry['count'] += count
+                entry['items'].append(item)
+
+        return sorted(hits.values(), key=lambda entry: entry['count'], reverse=True)
+
+
+def _item_text(item: Dict) -> str:
+    """Combine the searchable fields of a content or trend item"""
+    parts = []
+    for field in ('title', 'content', 'description'):
+        if item.get(field):
+            parts.append(str(item[field]))
+    if item.get('keywords'):
+        parts.append(' '.join(str(keyword) for keyword in item['keywords']))
+    return ' \n '.join(parts)
+
+
+# Per-user matcher cache, rebuilt only when a user's keywords change
+_matcher_cache: 'OrderedDict[str, Tuple[Tuple[str, ...], KeywordMatcher]]' = OrderedDict()
+_matcher_lock = threading.Lock()
+_MAX_CACHED_MATCHERS = 1000
+
+def get_user_matcher(user_id: str, custom_keywords: Optional[List[str]]) -> KeywordMatcher:
+    """
+    Get the cached keyword matcher for a user
+
+    Args:
+        user_id: User identifier
+        custom_keywords: User's current custom keywords from trend_settings
+
+    Returns:
+        Keyword matcher built from the user's keywords
+    """
+    fingerprint = tuple(sorted(normalize_text(keyword) for keyword in (custom_keywords or [])))
+
+    with _matcher_lock:
+        cached = _matcher_cache.get(user_id)
+        if cached and cached[0] == fingerprint:
+            _matcher_cache.move_to_end(user_id)
+            return cached[1]
+
+    matcher = KeywordMatcher(custom_keywords or [])
+
+    with _matcher_lock:
+        _matcher_cache[user_id] = (fingerprint, matcher)
+        _matcher_cache.move_to_end(user_id)
+        while len(_matcher_cache) > _MAX_CACHED_MATCHERS:
+            _matcher_cache.popitem(last=False)
+
+    return matcher
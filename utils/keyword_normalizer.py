@@ -0,0 +1,144 @@
+"""
+Keyword Normalization for CreatorPulse
+Folds inflected forms ("models", "modeling") onto one keyword ("model") with a
+light suffix stemmer, memoized per distinct surface form
+"""
+
+from functools import lru_cache
+from typing import Dict, Iterable, List
+
+
+# Distinct surface forms kept in the memo table (a few MB at most)
+MEMO_SIZE = 100000
+
+# Words whose trailing "s" is not a plural, or that should never be stemmed
+_EXCEPTIONS = {
+    'news', 'series', 'species', 'always', 'perhaps', 'analytics', 'physics',
+    'economics', 'politics', 'ethics', 'mathematics', 'sometimes', 'nevertheless',
+    'during', 'thing', 'things', 'nothing', 'something', 'anything', 'everything',
+    'bring', 'string', 'strings', 'spring', 'swing', 'king', 'ring', 'wing',
+    'ceiling', 'morning', 'evening', 'need', 'speed', 'seed', 'feed', 'indeed',
+    'embed', 'shed', 'bleed', 'breed', 'proceed', 'exceed', 'succeed'
+}
+
+_VOWELS = set('aeiou')
+
+
+def _is_consonant(word: str, index: int) -> bool:
+    char = word[index]
+    if char in _VOWELS:
+        return False
+    if char == 'y':
+        return index == 0 or not _is_consonant(word, index - 1)
+    return True
+
+
+def _measure(stem: str) -> int:
+    """Number of vowel-consonant sequences in a stem (Porter's m)"""
+    measure = 0
+    previous_vowel = False
+    for index in range(len(stem)):
+        consonant = _is_consonant(stem, index)
+        if consonant and previous_vowel:
+            measure += 1
+        previous_vowel = not consonant
+    return measure
+
+
+def _has_vowel(stem: str) -> bool:
+    return any(not _is_consonant(stem, index) for index in range(len(stem)))
+
+
+def _ends_cvc(stem: str) -> bool:
+    """Stem ends consonant-vowel-consonant and the last letter is not w, x or y"""
+    return (
+        len(stem) >= 3
+        and _is_consonant(stem, len(stem) - 3)
+        and not _is_consonant(stem, len(stem) - 2)
+        and _is_consonant(stem, len(stem) - 1)
+        and stem[-1] not in 'wxy'
+    )
+
+
+def _needs_silent_e(stem: str) -> bool:
+    """Stem ends in a way English words rarely do without a final e ("serv", "produc", "releas")"""
+    if stem.endswith(('v', 'nc', 'rc', 'rg', 'dg')):
+        return True
+    if stem[-1] == 'c':
+        return not _is_consonant(stem, len(stem) - 2)
+    if stem[-1] == 's':
+        return not _is_consonant(stem, len(stem) - 2) and not _is_consonant(stem, len(stem) - 3)
+    return False
+
+
+def _strip_plural(word: str) -> str:
+    if word.endswith('sses'):
+        return word[:-2]
+    if word.endswith('ies') and len(word) > 4:
+        return word[:-3] + 'y'
+    if word.endswith(('ches', 'shes', 'xes', 'zes')):
+        return word[:-2]
+    if word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        return word[:-1]
+    return word
+
+
+def _strip_verb_suffix(word: str) -> str:
+    for suffix in ('ing', 'ed'):
+        if not word.endswith(suffix):
+            continue
+
+        stem = word[:-len(suffix)]
+        if len(stem) < 3 or not _has_vowel(stem):
+            return word
+
+        if stem.endswith(('at', 'bl', 'iz')):
+            return stem + 'e'
+        if suffix == 'ed' and stem.endswith('i'):
+            return stem[:-1] + 'y'
+        if len(stem) >= 2 and stem[-1] == stem[-2] and _is_consonant(stem, len(stem) - 1) and stem[-1] not in 'lsz':
+            return stem[:-1]
+        if _measure(stem) == 1 and _ends_cvc(stem):
+            return stem + 'e'
+        if _needs_silent_e(stem):
+            return stem + 'e'
+        return stem
+
+    return word
+
+
+@lru_cache(maxsize=MEMO_SIZE)
+def normalize_keyword(word: str) -> str:
+    """
+    Normalize a lowercase token to its keyword form
+
+    Only plural and -ed/-ing suffixes are removed, so the result is usually
+    still a readable word. Results are memoized per surface form.
+
+    Args:
+        word: Lowercase token
+
+    Returns:
+        Normalized keyword
+    """
+    if len(word) <= 4 or word in _EXCEPTIONS:
+        return word
+
+    stem = _strip_verb_suffix(_strip_plural(word))
+    return stem if len(stem) >= 3 else word
+
+
+def normalize_keywords(words: Iterable[str]) -> List[str]:
+    """Normalize a list of tokens"""
+    return [normalize_keyword(word) for word in words]
+
+
+def normalizer_stats() -> Dict[str, int]:
+    """Get memo table statistics"""
+    info = normalize_keyword.cache_info()
+    return {
+        'hits': info.hits,
+        'misses': info.misses,
+        'size': info.currsize,
+        'max_size': info.maxsize
+    }
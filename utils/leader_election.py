@@ -0,0 +1,232 @@
+"""
+Leader Election for CreatorPulse
+Ensures exactly one process (across Streamlit sessions, processes and replicas)
+runs scheduled jobs, with takeover when the leader dies
+"""
+
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Callable, Optional
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+
+def make_holder_id() -> str:
+    """Identifier of this process as a lease holder"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class FileLease:
+    """
+    Lease backed by an exclusive file lock (single host)
+
+    The kernel drops the lock when the holding process dies, so another
+    process takes over on its next acquire attempt.
+    """
+
+    def __init__(self, name: str, directory: Optional[str] = None):
+        """
+        Initialize file lease
+
+        Args:
+            name: Lease name
+            directory: Directory for the lock file (defaults to RATE_LIMIT_STATE_DIR
+                or the system temp directory)
+        """
+        import tempfile
+
+        directory = directory or os.getenv('RATE_LIMIT_STATE_DIR') or tempfile.gettempdir()
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"creatorpulse_leader_{name}.lock")
+        self._file = None
+
+    def try_acquire(self) -> bool:
+        """Acquire or keep the lease; returns whether this process holds it"""
+        if self._file is not None:
+            return True
+
+        if not FCNTL_AVAILABLE:
+            # No locking on this platform; every process considers itself leader
+            return True
+
+        lock_file = open(self.path, 'a')
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+
+        self._file = lock_file
+        return True
+
+    def release(self) -> None:
+        """Give up the lease"""
+        if self._file is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+
+class DatabaseLease:
+    """
+    Lease stored in the scheduler_leases table (multiple hosts)
+
+    The holder renews the lease before it expires; if the holder dies, the
+    lease expires after ttl_seconds and the next process to ask takes it.
+    Requires database/create_scheduler_leases.sql.
+    """
+
+    def __init__(self, db, name: str, ttl_seconds: int = 60, holder: Optional[str] = None):
+        """
+        Initialize database lease
+
+        Args:
+            db: CreatorPulseDB instance
+            name: Lease name
+            ttl_seconds: Lease duration
+            holder: Holder identifier (defaults to host, pid and a random suffix)
+        """
+        self.db = db
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.holder = holder or make_holder_id()
+
+    def try_acquire(self) -> bool:
+        """Acquire or renew the lease; returns whether this process holds it"""
+        return bool(self.db.acquire_scheduler_lease(self.name, self.holder, self.ttl_seconds))
+
+    def release(self) -> None:
+        """Give up the lease so another process can take over immediately"""
+        self.db.release_scheduler_lease(self.name, self.holder)
+
+
+class LeaderElector:
+    """Keeps trying to acquire (and renew) a lease in a background thread"""
+
+    def __init__(self, lease, ttl_seconds: int = 60):
+        """
+        Initialize leader elector
+
+        Args:
+            lease: FileLease or DatabaseLease
+            ttl_seconds: Lease duration; the lease is renewed every ttl_seconds / 3
+        """
+        self.lease = lease
+        self.ttl_seconds = ttl_seconds
+        self.renew_interval = max(ttl_seconds / 3, 1)
+        self._is_leader = False
+        self._leader_until = 0.0
+        self._stop = threading.Event()
+        self._changed = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        # Called (from the election thread) whenever this process becomes leader
+        self.on_elected: Optional[Callable[[], None]] = None
+
+    def start(self) -> None:
+        """Start campaigning in the background"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._renew()
+        self._thread = threading.Thread(target=self._run, name='leader-election', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop campaigning and release the lease"""
+        self._stop.set()
+        if self._is_leader:
+            try:
+                self.lease.release()
+            except Exception as e:
+                print(f"⚠️ Could not release leader lease: {e}")
+        self._set_leader(False)
+
+    def is_leader(self) -> bool:
+        """Whether this process currently holds an unexpired lease"""
+        return self._is_leader and time.time() < self._leader_until
+
+    def wait_for_leadership(self, timeout: float) -> bool:
+        """
+        Wait until this process is leader or the timeout passes
+
+        A follower whose job fires while a dead leader's lease is still
+        running uses this to take over the run instead of skipping it.
+        """
+        deadline = time.time() + timeout
+        with self._changed:
+            while not self.is_leader():
+                remaining = deadline - time.time()
+                if remaining <= 0 or self._stop.is_set():
+                    return False
+                self._changed.wait(min(remaining, self.renew_interval))
+        return True
+
+    def _set_leader(self, is_leader: bool) -> None:
+        with self._changed:
+            elected = is_leader and not self._is_leader
+            if is_leader != self._is_leader:
+                print("👑 This process is now the scheduler leader" if is_leader else "ℹ️ This process is no longer the scheduler leader")
+            self._is_leader = is_leader
+            self._changed.notify_all()
+
+        if elected and self.on_elected is not None:
+            try:
+                self.on_elected()
+            except Exception as e:
+                print(f"⚠️ Leader election callback failed: {e}")
+
+    def _renew(self) -> None:
+        attempted_at = time.time()
+        try:
+            acquired = self.lease.try_acquire()
+        except Exception as e:
+            print(f"⚠️ Leader lease check failed: {e}")
+            acquired = False
+
+        if acquired:
+            self._leader_until = attempted_at + self.ttl_seconds
+        self._set_leader(acquired)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.renew_interval):
+            self._renew()
+
+
+def create_leader_elector(db=None, name: str = 'scheduler', ttl_seconds: Optional[int] = None) -> LeaderElector:
+    """
+    Create an elector using SCHEDULER_LEADER_BACKEND ('database' or 'file')
+
+    Defaults to the database lease when the database is configured and the
+    lease function is installed, and to a file lock otherwise.
+
+    Args:
+        db: Optional CreatorPulseDB instance
+        name: Lease name
+        ttl_seconds: Lease duration (defaults to SCHEDULER_LEASE_TTL_SECONDS or 60)
+
+    Returns:
+        LeaderElector (not started)
+    """
+    ttl_seconds = ttl_seconds or int(os.getenv('SCHEDULER_LEASE_TTL_SECONDS', '60'))
+    backend = os.getenv('SCHEDULER_LEADER_BACKEND', '').lower()
+
+    if backend != 'file' and db is not None and db.is_configured():
+        lease = DatabaseLease(db, name, ttl_seconds)
+        try:
+            if db.acquire_scheduler_lease(name, lease.holder, ttl_seconds) is not None:
+                print(f"🗳️ Using database leader election ({lease.holder})")
+                return LeaderElector(lease, ttl_seconds)
+        except Exception:
+            pass
+        if backend == 'database':
+            print("⚠️ Database leader lease unavailable (run database/create_scheduler_leases.sql); falling back to a file lock")
+
+    print("🗳️ Using file-lock leader election (single host)")
+    return LeaderElector(FileLease(name), ttl_seconds)
@@ -0,0 +1,220 @@
+"""
+Rate Limiter for CreatorPulse
+Token bucket shared between processes through a locked state file, so the
+Streamlit app, the scheduler and scripts draw from one Google Trends budget
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from utils.clock import SYSTEM_CLOCK
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a non-blocking acquire finds no tokens available"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Rate limit '{name}' exceeded, retry in {retry_after:.1f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Token bucket whose state lives in a file guarded by an exclusive lock"""
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        capacity: float = 1.0,
+        state_dir: Optional[str] = None,
+        clock=None
+    ):
+        """
+        Initialize token bucket
+
+        Args:
+            name: Bucket name (processes using the same name share the budget)
+            rate: Tokens added per second
+            capacity: Maximum number of tokens (burst size)
+            state_dir: Directory for the state and lock files (defaults to
+                RATE_LIMIT_STATE_DIR or the system temp directory)
+            clock: Time source (defaults to the system clock)
+        """
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock or SYSTEM_CLOCK
+
+        state_dir = state_dir or os.getenv('RATE_LIMIT_STATE_DIR') or tempfile.gettempdir()
+        os.makedirs(state_dir, exist_ok=True)
+        self.state_path = os.path.join(state_dir, f"creatorpulse_ratelimit_{name}.json")
+        self.lock_path = self.state_path + '.lock'
+
+        # Serializes threads of this process; the file lock serializes processes
+        self._thread_lock = threading.Lock()
+        self._memory_state: Optional[Dict[str, float]] = None
+
+    @contextmanager
+    def _locked(self):
+        with self._thread_lock:
+            if not FCNTL_AVAILABLE:
+                # No cross-process locking on this platform; share within the process only
+                yield
+                return
+
+            with open(self.lock_path, 'a') as lock_file:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _read_state(self, now: float) -> Dict[str, float]:
+        if not FCNTL_AVAILABLE:
+            return self._memory_state or {'tokens': self.capacity, 'updated_at': now}
+
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            return {'tokens': float(state['tokens']), 'updated_at': float(state['updated_at'])}
+        except (OSError, ValueError, KeyError, TypeError):
+            return {'tokens': self.capacity, 'updated_at': now}
+
+    def _write_state(self, state: Dict[str, float]) -> None:
+        if not FCNTL_AVAILABLE:
+            self._memory_state = state
+            return
+
+        # Write to a temp file and rename so readers never see a partial file
+        tmp_path = f"{self.state_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+
+    def _refill(self, state: Dict[str, float], now: float) -> float:
+        elapsed = max(now - state['updated_at'], 0.0)
+        return min(self.capacity, state['tokens'] + elapsed * self.rate)
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """
+        Take tokens if they are available right now
+
+        Args:
+            tokens: Number of tokens to take
+
+        Returns:
+            True if the tokens were taken, False otherwise
+        """
+        with self._locked():
+            now = self.clock.time()
+            available = self._refill(self._read_state(now), now)
+
+            if available < tokens:
+                return False
+
+            self._write_state({'tokens': available - tokens, 'updated_at': now})
+            return True
+
+    def wait_time(self, tokens: float = 1.0) -> float:
+        """Seconds until the given number of tokens is available (0 if available now)"""
+        with self._locked():
+            now = self.clock.time()
+            available = self._refill(self._read_state(now), now)
+
+        if available >= tokens:
+            return 0.0
+        return (tokens - available) / self.rate
+
+    def acquire(self, tokens: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """
+        Block until tokens are taken
+
+        Args:
+            tokens: Number of tokens to take
+            timeout: Maximum seconds to wait (None waits indefinitely)
+
+        Returns:
+            True if the tokens were taken, False on timeout
+        """
+        deadline = None if timeout is None else self.clock.time() + timeout
+
+        while not self.try_acquire(tokens):
+            wait = self.wait_time(tokens)
+            if deadline is not None:
+                remaining = deadline - self.clock.time()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            # Another process may take the tokens first, so re-check after waking
+            self.clock.sleep(max(wait, 0.05))
+
+        return True
+
+    async def acquire_async(self, tokens: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """Awaitable version of acquire that does not block the event loop"""
+        deadline = None if timeout is None else self.clock.time() + timeout
+
+        while not self.try_acquire(tokens):
+            wait = self.wait_time(tokens)
+            if deadline is not None:
+                remaining = deadline - self.clock.time()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            await asyncio.sleep(max(wait, 0.05))
+
+        return True
+
+    def reset(self) -> None:
+        """Refill the bucket to capacity"""
+        with self._locked():
+            self._write_state({'tokens': self.capacity, 'updated_at': self.clock.time()})
+
+
+# Google allows roughly one pytrends request per minute before blocking
+GOOGLE_TRENDS_INTERVAL_SECONDS = 61
+
+_google_trends_limiter = None
+_google_trends_limiter_lock = threading.Lock()
+
+def get_google_trends_limiter() -> TokenBucket:
+    """Get the token bucket shared by every Google Trends caller"""
+    global _google_trends_limiter
+
+    with _google_trends_limiter_lock:
+        if _google_trends_limiter is None:
+            _google_trends_limiter = TokenBucket(
+                'google_trends',
+                rate=1.0 / GOOGLE_TRENDS_INTERVAL_SECONDS,
+                capacity=1.0
+            )
+        return _google_trends_limiter
+
+
+# Resend allows 2 API requests per second per team by default
+RESEND_REQUESTS_PER_SECOND = 2.0
+
+_resend_limiter = None
+_resend_limiter_lock = threading.Lock()
+
+def get_resend_limiter() -> TokenBucket:
+    """Get the token bucket shared by every Resend API caller (RESEND_REQUESTS_PER_SECOND)"""
+    global _resend_limiter
+
+    with _resend_limiter_lock:
+        if _resend_limiter is None:
+            rate = float(os.getenv('RESEND_REQUESTS_PER_SECOND', str(RESEND_REQUESTS_PER_SECOND)))
+            _resend_limiter = TokenBucket('resend', rate=rate, capacity=max(1.0, rate))
+        return _resend_limiter
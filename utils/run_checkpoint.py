@@ -0,0 +1,108 @@
+"""
+Run Checkpoints for CreatorPulse
+Records per-user progress of a trend discovery run so an interrupted or
+re-triggered run skips users that are already done
+"""
+
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime
+from typing import Dict, Optional, Set
+
+
+class RunCheckpoint:
+    """Per-user status of one run, stored in the database or a local JSON file"""
+
+    def __init__(self, run_key: str, db=None, directory: Optional[str] = None):
+        """
+        Initialize run checkpoint
+
+        Args:
+            run_key: Identifies the run (runs with the same key share progress)
+            db: Optional CreatorPulseDB; the local file is used if it is not
+                configured or the run tables are missing
+            directory: Directory for the local file (defaults to TRENDS_CACHE_DIR
+                or the system temp directory)
+        """
+        self.run_key = run_key
+        self.db = db
+        self.run_id: Optional[str] = None
+        self.statuses: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+        directory = directory or os.getenv('TRENDS_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'creatorpulse_trends')
+        os.makedirs(directory, exist_ok=True)
+        safe_key = ''.join(char if char.isalnum() or char in '-_' else '_' for char in run_key)
+        self.path = os.path.join(directory, f"run_{safe_key}.json")
+
+    def start(self) -> 'RunCheckpoint':
+        """Load the run's recorded progress (creating the run if it is new)"""
+        if self.db is not None and self.db.is_configured():
+            run = self.db.get_or_create_trend_run(self.run_key)
+            if run:
+                self.run_id = run['id']
+                self.statuses = {row['user_id']: row['status'] for row in self.db.get_trend_run_users(self.run_id)}
+                return self
+
+            print("⚠️ Run checkpoints unavailable in the database (run database/create_trend_discovery_runs.sql); using a local file")
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.statuses = json.load(f).get('users', {})
+        except (OSError, ValueError):
+            self.statuses = {}
+
+        return self
+
+    def completed_users(self) -> Set[str]:
+        """Users already processed successfully in this run"""
+        with self._lock:
+            return {user_id for user_id, status in self.statuses.items() if status == 'done'}
+
+    def mark_done(self, user_id: str) -> None:
+        """Record that a user was processed successfully"""
+        self._record(user_id, 'done')
+
+    def mark_failed(self, user_id: str, error: str) -> None:
+        """Record that a user failed (it is retried by the next run)"""
+        self._record(user_id, 'failed', error)
+
+    def finish(self) -> None:
+        """Mark the run as completed"""
+        with self._lock:
+            done = sum(1 for status in self.statuses.values() if status == 'done')
+            failed = len(self.statuses) - done
+
+        if self.run_id is not None:
+            self.db.finish_trend_run(self.run_id, done, failed)
+        else:
+            self._save(finished=True)
+
+    def _record(self, user_id: str, status: str, error: Optional[str] = None) -> None:
+        with self._lock:
+            self.statuses[user_id] = status
+
+        if self.run_id is not None:
+            self.db.save_trend_run_user(self.run_id, user_id, status, error)
+        else:
+            self._save()
+
+    def _save(self, finished: bool = False) -> None:
+        with self._lock:
+            state = {
+                'run_key': self.run_key,
+                'users': dict(self.statuses),
+                'updated_at': datetime.now().isoformat(),
+                'finished': finished
+            }
+
+            # Write to a temp file and rename so a crash never leaves a partial file
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(state, f)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                print(f"Warning: could not save run checkpoint: {e}")
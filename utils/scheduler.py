@@ -3,28 +3,72 @@ Scheduler Module for CreatorPulse
 Handles automated daily trend discovery jobs using APScheduler
 """
 
+import copy
 import os
-from datetime import datetime, time as dt_time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, time as dt_time
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.events import EVENT_JOB_ERROR, EVENT_JOB_EXECUTED
 import atexit
+import pytz
+from typing import Optional
+
+try:
+    from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+    SQLALCHEMY_JOBSTORE_AVAILABLE = True
+except ImportError:
+    SQLALCHEMY_JOBSTORE_AVAILABLE = False
 
 from utils.trends_discovery import TrendsDiscovery
 from utils.supabase_client import CreatorPulseDB
+from utils.keyword_matcher import get_user_matcher
+from utils.rate_limiter import get_google_trends_limiter
+from utils.leader_election import create_leader_elector
+from utils.run_checkpoint import RunCheckpoint
+
 
+# Timezone the cron jobs fire in (and run checkpoints are dated in)
+SCHEDULER_TIMEZONE = 'America/New_York'  # Adjust to your timezone
 
 # Global scheduler instance
 _scheduler = None
 
+# Leader election: only the leader runs scheduled (cron) jobs
+_leader_elector = None
+
+# Per-time-slot trend discovery jobs are named with this prefix
+SLOT_JOB_PREFIX = 'trend_discovery_'
+
+# Users whose trends are matched and saved concurrently
+MAX_USER_WORKERS = int(os.getenv('TREND_DISCOVERY_WORKERS', '8'))
+
+# How often every process re-reads the slots users picked in trend_settings
+SLOT_SYNC_MINUTES = int(os.getenv('TREND_SLOT_SYNC_MINUTES', '10'))
+
 
-def daily_trend_discovery_job():
+def daily_trend_discovery_job(schedule_time: Optional[str] = None, resume: bool = True):
     """
     Main job function that runs daily to discover trends
     This function is executed by APScheduler
+
+    Progress is checkpointed per user for each slot and scheduler-timezone
+    day, so a run that is restarted, re-fired within the misfire grace time
+    or triggered manually on the same day only processes the users that are
+    not done yet.
+
+    Args:
+        schedule_time: Only process users whose trend_settings.schedule_time
+            is this slot ('HH:MM:SS'); None processes every enabled user
+        resume: Skip users any run already processed today
+
+    Returns:
+        Number of users processed (0 if everyone was already done today)
     """
     print(f"\n{'='*60}")
     print(f"🚀 Starting daily trend discovery job at {datetime.now()}")
+    if schedule_time:
+        print(f"   Time slot: {schedule_time[:5]}")
     print(f"{'='*60}\n")
 
     db = CreatorPulseDB()
@@ -41,7 +85,7 @@ def daily_trend_discovery_job():
 
     try:
         # Get all users with enabled trend discovery
-        users = db.get_users_with_trend_discovery_enabled()
+        users = db.get_users_with_trend_discovery_enabled(schedule_time=schedule_time)
 
         if not users:
             error_msg = "No users have trend discovery enabled. Please save your settings first by clicking 'Save Settings' button."
@@ -50,49 +94,78 @@ def daily_trend_discovery_job():
 
         print(f"📊 Found {len(users)} user(s) with trend discovery enabled")
 
-        # Process each user
+        # Each slot has its own run per day in the timezone its job fires in.
+        # Slot runs also record finished users in the day's run over every
+        # user, so manual runs and restarts skip users any run finished today.
+        checkpoint = RunCheckpoint(trend_run_key(schedule_time), db).start()
+        day_checkpoint = RunCheckpoint(trend_run_key(), db).start() if schedule_time else checkpoint
+        if resume:
+            completed = checkpoint.completed_users() | day_checkpoint.completed_users()
+            pending_users = [user for user in users if user['user_id'] not in completed]
+            if len(pending_users) < len(users):
+                print(f"⏭️ Skipping {len(users) - len(pending_users)} user(s) already processed today")
+            users = pending_users
+
+        if not users:
+            print("✅ All users are already up to date for today")
+            checkpoint.finish()
+            return 0
+
+        # Users with the same categories get the same trends, so discover each
+        # distinct category set once
+        users_by_categories = {}
         for user in users:
-            user_id = user['user_id']
-            categories = user.get('categories', ['tech', 'ai', 'business'])
-            custom_keywords = user.get('custom_keywords', [])
+            categories = tuple(sorted(user.get('categories') or ['tech', 'ai', 'business']))
+            users_by_categories.setdefault(categories, []).append(user)
 
-            print(f"\n👤 Processing user: {user_id[:8]}...")
-            print(f"   Categories: {', '.join(categories)}")
-            if custom_keywords:
-                print(f"   Custom keywords: {', '.join(custom_keywords)}")
+        print(f"🗂️ {len(users_by_categories)} distinct category set(s)")
 
-            # Discover trends for user's categories
+        trends_by_categories = {}
+        for categories in users_by_categories:
+            print(f"\n🔍 Discovering trends for: {', '.join(categories)}")
             discovered_trends = trends_engine.discover_trends_for_categories(
-                categories=categories,
+                categories=list(categories),
                 max_per_category=3  # Keep it reasonable to avoid rate limits
             )
 
-            # Save discovered trends to database
-            saved_count = 0
+            # Add cached related queries; misses are queued for background
+            # enrichment (highest-ranked first) and picked up by later runs
             for trend in discovered_trends:
-                result = db.save_trending_content(
-                    user_id=user_id,
-                    source_type=trend.get('source_type', 'google_trends'),
-                    title=trend['title'],
-                    description=trend.get('description', ''),
-                    keywords=trend.get('keywords', []),
-                    url=trend.get('url', ''),
-                    metadata=trend.get('metadata', {}),
-                    search_volume=trend.get('metadata', {}).get('rank', 0),
-                    category=trend.get('category', 'all')
-                )
-
-                if result.get('success'):
-                    saved_count += 1
-
-            print(f"   ✅ Saved {saved_count}/{len(discovered_trends)} trends to database")
-
-            # Update last run timestamp
-            db.update_trend_settings_last_run(user_id)
+                trends_engine.enrich_trend_with_related(trend)
+
+            trends_by_categories[categories] = discovered_trends
+
+        # Per-user matching and writes run in a bounded pool; one failing user
+        # does not hold up or abort the others
+        failed_users = []
+        with ThreadPoolExecutor(max_workers=MAX_USER_WORKERS) as executor:
+            futures = {
+                executor.submit(process_trend_user, db, user, trends_by_categories[categories]): user['user_id']
+                for categories, group in users_by_categories.items()
+                for user in group
+            }
+
+            for future in as_completed(futures):
+                user_id = futures[future]
+                try:
+                    print(future.result())
+                    checkpoint.mark_done(user_id)
+                    if day_checkpoint is not checkpoint:
+                        day_checkpoint.mark_done(user_id)
+                except Exception as e:
+                    failed_users.append(user_id)
+                    checkpoint.mark_failed(user_id, str(e))
+                    print(f"\n👤 User {user_id[:8]}...\n   ❌ Failed: {e}")
+
+        checkpoint.finish()
+
+        if failed_users:
+            print(f"\n⚠️ {len(failed_users)}/{len(users)} user(s) failed (retried by the next run today)")
 
         print(f"\n{'='*60}")
         print(f"✨ Daily trend discovery job completed successfully!")
         print(f"{'='*60}\n")
+        return len(users) - len(failed_users)
 
     except Exception as e:
         print(f"\n{'='*60}")
@@ -102,6 +175,100 @@ def daily_trend_discovery_job():
         traceback.print_exc()
 
 
+def trend_run_key(schedule_time: Optional[str] = None) -> str:
+    """
+    Checkpoint key of today's trend discovery run for a time slot
+
+    Args:
+        schedule_time: Time slot ('HH:MM:SS'); None for a run over every user
+
+    Returns:
+        Key like 'trend_discovery:2026-10-19:09:00' (date in SCHEDULER_TIMEZONE)
+    """
+    today = datetime.now(pytz.timezone(SCHEDULER_TIMEZONE)).date().isoformat()
+    slot = schedule_time[:5] if schedule_time else 'all'
+    return f"trend_discovery:{today}:{slot}"
+
+
+def scheduled_trend_discovery_job(schedule_time: Optional[str] = None):
+    """
+    Run the daily trend discovery job for a time slot on the leader process only
+
+    Every process schedules the job, but only the holder of the leader lease
+    runs it. A follower waits up to one lease period, so it takes over the
+    run if the leader died shortly before the job fired.
+    """
+    if _leader_elector is not None and not _leader_elector.is_leader():
+        if not _leader_elector.wait_for_leadership(timeout=_leader_elector.ttl_seconds + _leader_elector.renew_interval):
+            print("ℹ️ Skipping scheduled trend discovery: another process is the scheduler leader")
+            return
+
+    daily_trend_discovery_job(schedule_time=schedule_time)
+
+
+def process_trend_user(db, user, discovered_trends):
+    """
+    Match a user's custom keywords against the shared trends and save them
+
+    Args:
+        db: CreatorPulseDB instance
+        user: Row from get_users_with_trend_discovery_enabled
+        discovered_trends: Trends for the user's category set (not modified)
+
+    Returns:
+        Log summary for the user
+    """
+    user_id = user['user_id']
+    custom_keywords = user.get('custom_keywords', [])
+
+    # Matched keywords are per user, so tag a private copy
+    discovered_trends = copy.deepcopy(discovered_trends)
+
+    lines = [f"\n👤 Processing user: {user_id[:8]}..."]
+    if custom_keywords:
+        lines.append(f"   Custom keywords: {', '.join(custom_keywords)}")
+
+    # Match the user's custom keywords against the discovered trends
+    if custom_keywords:
+        matcher = get_user_matcher(user_id, custom_keywords)
+        keyword_hits = matcher.match(discovered_trends)
+        for hit in keyword_hits:
+            for trend in hit['items']:
+                trend.setdefault('metadata', {}).setdefault('matched_keywords', []).append(hit['keyword'])
+        if keyword_hits:
+            hits_str = ', '.join(f"{hit['keyword']} ({hit['count']})" for hit in keyword_hits)
+            lines.append(f"   Keyword hits: {hits_str}")
+        else:
+            lines.append(f"   No custom keyword hits")
+
+    # Save all of the user's trends in one idempotent upsert
+    rows = [
+        db.trending_content_row(
+            user_id=user_id,
+            source_type=trend.get('source_type', 'google_trends'),
+            title=trend['title'],
+            description=trend.get('description', ''),
+            keywords=trend.get('keywords', []),
+            url=trend.get('url', ''),
+            metadata=trend.get('metadata', {}),
+            search_volume=trend.get('metadata', {}).get('rank', 0),
+            category=trend.get('category', 'all')
+        )
+        for trend in discovered_trends
+    ]
+    result = db.save_trending_content_bulk(rows)
+    if not result.get('success'):
+        raise Exception(f"Could not save trends: {result.get('error')}")
+    saved_count = result.get('count', 0)
+
+    lines.append(f"   ✅ Saved {saved_count}/{len(discovered_trends)} trends to database")
+
+    # Update last run timestamp
+    db.update_trend_settings_last_run(user_id)
+
+    return "\n".join(lines)
+
+
 def job_listener(event):
     """Listen to job execution events for logging"""
     if event.exception:
@@ -117,7 +284,7 @@ def init_scheduler(test_mode: bool = False):
     Args:
         test_mode: If True, runs job immediately for testing
     """
-    global _scheduler
+    global _scheduler, _leader_elector
 
     # Prevent multiple initializations
     if _scheduler is not None:
@@ -128,7 +295,8 @@ def init_scheduler(test_mode: bool = False):
 
     # Create scheduler
     _scheduler = BackgroundScheduler(
-        timezone='America/New_York',  # Adjust to your timezone
+        jobstores=_build_jobstores(),
+        timezone=SCHEDULER_TIMEZONE,
         job_defaults={
             'coalesce': True,  # Combine multiple pending executions
             'max_instances': 1,  # Only one instance of job at a time
@@ -149,21 +317,33 @@ def init_scheduler(test_mode: bool = False):
             id='test_trend_discovery',
             name='Test Trend Discovery Job'
         )
-    else:
-        # Schedule daily job at 9 AM
-        print("📅 Scheduling daily trend discovery job for 9:00 AM")
-        _scheduler.add_job(
-            daily_trend_discovery_job,
-            CronTrigger(hour=9, minute=0),
-            id='daily_trend_discovery',
-            name='Daily Trend Discovery Job',
-            replace_existing=True
-        )
+
+    # Campaign for leadership so only one process runs the scheduled jobs
+    if _leader_elector is None:
+        _leader_elector = create_leader_elector(CreatorPulseDB())
+        if not test_mode:
+            # Settings may have been saved by another process while this one
+            # was a follower
+            _leader_elector.on_elected = queue_trend_discovery_sync
+        _leader_elector.start()
 
     # Start the scheduler
     _scheduler.start()
     print("✅ Scheduler started successfully!")
 
+    if not test_mode:
+        # One job per schedule time chosen in trend_settings, kept up to date
+        # with slots saved through other processes
+        sync_trend_discovery_jobs()
+        _scheduler.add_job(
+            sync_trend_discovery_jobs,
+            'interval',
+            minutes=SLOT_SYNC_MINUTES,
+            id='sync_trend_discovery_jobs',
+            name='Sync Trend Discovery Slots',
+            replace_existing=True
+        )
+
     # Register shutdown hook
     atexit.register(lambda: shutdown_scheduler())
 
@@ -174,12 +354,19 @@ def shutdown_scheduler():
     """Gracefully shutdown the scheduler"""
     global _scheduler
 
+    global _leader_elector
+
     if _scheduler is not None:
         print("\n🛑 Shutting down scheduler...")
         _scheduler.shutdown(wait=False)
         _scheduler = None
         print("✅ Scheduler shut down successfully")
 
+    # Release the lease so another process takes over immediately
+    if _leader_elector is not None:
+        _leader_elector.stop()
+        _leader_elector = None
+
 
 def get_scheduler():
     """Get the current scheduler instance"""
@@ -191,6 +378,11 @@ def is_scheduler_running():
     return _scheduler is not None and _scheduler.running
 
 
+def is_scheduler_leader():
+    """Check if this process runs the scheduled jobs"""
+    return _leader_elector is not None and _leader_elector.is_leader()
+
+
 def get_scheduled_jobs():
     """Get list of scheduled jobs"""
     if _scheduler is None:
@@ -214,45 +406,133 @@ def trigger_job_manually():
     """
     print("\n🎯 Manually triggering trend discovery job...")
     try:
-        daily_trend_discovery_job()
-        return {'success': True, 'message': 'Job executed successfully'}
+        processed = daily_trend_discovery_job()
+        if processed == 0:
+            return {'success': True, 'message': 'All users were already processed today', 'processed': 0}
+        return {'success': True, 'message': 'Job executed successfully', 'processed': processed}
     except Exception as e:
         error_msg = f"Error executing job: {str(e)}"
         print(f"❌ {error_msg}")
         return {'success': False, 'error': error_msg}
 
 
-def reschedule_job(hour: int = 9, minute: int = 0):
+def queue_trend_discovery():
     """
-    Reschedule the daily job to a different time
+    Queue a one-off trend discovery run on the scheduler instead of running it
+    in the caller's thread
 
-    Args:
-        hour: Hour of day (0-23)
-        minute: Minute of hour (0-59)
+    The run starts as soon as the shared Google Trends rate limit allows.
+
+    Returns:
+        Dictionary with success status and the planned run time
     """
-    global _scheduler
+    if not is_scheduler_running():
+        return {'success': False, 'error': 'Scheduler is not running'}
 
-    if _scheduler is None:
-        print("❌ Scheduler not initialized")
-        return False
+    wait_seconds = get_google_trends_limiter().wait_time()
+    run_at = datetime.now(_scheduler.timezone) + timedelta(seconds=wait_seconds)
 
     try:
-        # Remove existing job
-        if _scheduler.get_job('daily_trend_discovery'):
-            _scheduler.remove_job('daily_trend_discovery')
-
-        # Add new job with updated schedule
         _scheduler.add_job(
             daily_trend_discovery_job,
-            CronTrigger(hour=hour, minute=minute),
-            id='daily_trend_discovery',
-            name='Daily Trend Discovery Job',
+            'date',
+            run_date=run_at,
+            id='manual_trend_discovery',
+            name='Manual Trend Discovery Job',
             replace_existing=True
         )
+        print(f"📥 Queued manual trend discovery for {run_at.strftime('%H:%M:%S')}")
+        return {'success': True, 'run_at': run_at.isoformat(), 'wait_seconds': wait_seconds}
+    except Exception as e:
+        error_msg = f"Error queueing job: {str(e)}"
+        print(f"❌ {error_msg}")
+        return {'success': False, 'error': error_msg}
+
+
+def queue_trend_discovery_sync():
+    """Run sync_trend_discovery_jobs on the scheduler as soon as possible"""
+    if _scheduler is None:
+        return
+
+    _scheduler.add_job(
+        sync_trend_discovery_jobs,
+        'date',
+        id='sync_trend_discovery_jobs_now',
+        name='Sync Trend Discovery Slots',
+        replace_existing=True
+    )
+
 
-        print(f"✅ Job rescheduled to run daily at {hour:02d}:{minute:02d}")
-        return True
+def sync_trend_discovery_jobs():
+    """
+    Create one daily job per distinct trend_settings.schedule_time
+
+    Jobs for slots nobody uses any more are removed. Runs on start-up, every
+    TREND_SLOT_SYNC_MINUTES, when this process becomes leader and whenever a
+    user saves their trend settings.
+
+    Returns:
+        Dictionary with success status and the scheduled slots
+    """
+    if _scheduler is None:
+        return {'success': False, 'error': 'Scheduler not initialized'}
+
+    db = CreatorPulseDB()
+    if not db.is_configured():
+        return {'success': False, 'error': 'Database not configured'}
+
+    try:
+        users = db.get_users_with_trend_discovery_enabled()
+        slots = sorted({normalize_schedule_time(user.get('schedule_time')) for user in users})
+        wanted = {f"{SLOT_JOB_PREFIX}{slot[:5].replace(':', '')}": slot for slot in slots}
+
+        for job in _scheduler.get_jobs():
+            # 'daily_trend_discovery' is the single 9 AM job older versions stored
+            if job.id == 'daily_trend_discovery' or (job.id.startswith(SLOT_JOB_PREFIX) and job.id not in wanted):
+                _scheduler.remove_job(job.id)
+
+        for job_id, slot in wanted.items():
+            hour, minute = int(slot[:2]), int(slot[3:5])
+            existing = _scheduler.get_job(job_id)
+            if existing is not None and list(existing.args) == [slot]:
+                continue
+
+            _scheduler.add_job(
+                scheduled_trend_discovery_job,
+                CronTrigger(hour=hour, minute=minute),
+                args=[slot],
+                id=job_id,
+                name=f"Trend Discovery {slot[:5]}",
+                replace_existing=True
+            )
+
+        print(f"📅 Trend discovery scheduled for {len(slots)} time slot(s): {', '.join(slot[:5] for slot in slots) or 'none'}")
+        return {'success': True, 'slots': slots}
 
     except Exception as e:
-        print(f"❌ Error rescheduling job: {e}")
-        return False
+        error_msg = f"Error syncing trend discovery jobs: {str(e)}"
+        print(f"❌ {error_msg}")
+        return {'success': False, 'error': error_msg}
+
+
+def normalize_schedule_time(value: Optional[str]) -> str:
+    """Normalize a schedule_time value to 'HH:MM:00' (defaults to 09:00)"""
+    try:
+        parts = str(value).split(':')
+        return f"{int(parts[0]):02d}:{int(parts[1]):02d}:00"
+    except (ValueError, IndexError):
+        return '09:00:00'
+
+
+def _build_jobstores():
+    """Persistent job store from SCHEDULER_JOBSTORE_URL, or the default memory store"""
+    url = os.getenv('SCHEDULER_JOBSTORE_URL')
+    if not url:
+        return {}
+
+    if not SQLALCHEMY_JOBSTORE_AVAILABLE:
+        print("⚠️ SCHEDULER_JOBSTORE_URL is set but SQLAlchemy is not installed; using the memory job store")
+        return {}
+
+    print("💾 Using persistent scheduler job store")
+    return {'default': SQLAlchemyJobStore(url=url)}
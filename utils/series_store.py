@@ -0,0 +1,272 @@
+"""
+Interest Series Store for CreatorPulse
+Keeps raw Google Trends interest-over-time series in compact npz files keyed
+by keyword, geo and resolution, so charts and comparisons load without API calls
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+# Series older than this many points are dropped from a file on write
+MAX_POINTS = 5000
+
+# Spacing of one point at each resolution
+STEP = {
+    'hour': np.timedelta64(1, 'h'),
+    'day': np.timedelta64(1, 'D'),
+    'week': np.timedelta64(7, 'D')
+}
+
+# Points of overlap requested with each fetch to rescale it onto the stored series
+OVERLAP_POINTS = {'hour': 24, 'day': 14, 'week': 8}
+
+
+def infer_resolution(dates: np.ndarray) -> str:
+    """Infer 'hour', 'day' or 'week' from the spacing of a date index"""
+    dates = np.asarray(dates, dtype='datetime64[s]')
+    if len(dates) < 2:
+        return 'day'
+
+    step = np.median(np.diff(dates).astype('timedelta64[s]').astype(np.int64))
+    if step <= 3600:
+        return 'hour'
+    if step <= 86400:
+        return 'day'
+    return 'week'
+
+
+class InterestSeriesStore:
+    """Columnar on-disk store of interest series (dates and values arrays per file)"""
+
+    def __init__(self, directory: Optional[str] = None):
+        """
+        Initialize series store
+
+        Args:
+            directory: Storage directory (defaults to TRENDS_CACHE_DIR/interest_series
+                or the system temp directory)
+        """
+        if directory is None:
+            base = os.getenv('TRENDS_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'creatorpulse_trends')
+            directory = os.path.join(base, 'interest_series')
+
+        self.directory = directory
+        self.index_path = os.path.join(self.directory, 'index.json')
+        self._lock = threading.Lock()
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, keyword: str, geo: str, resolution: str) -> str:
+        key = f"{keyword.strip().lower()}|{geo}|{resolution}"
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=12).hexdigest()
+        return os.path.join(self.directory, f"{digest}.npz")
+
+    def read(
+        self,
+        keyword: str,
+        geo: str = 'US',
+        resolution: str = 'day',
+        start: Optional[np.datetime64] = None,
+        end: Optional[np.datetime64] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Read a stored series
+
+        Args:
+            keyword: Keyword
+            geo: Region code
+            resolution: 'hour', 'day' or 'week'
+            start: Optional first date to include
+            end: Optional last date to include
+
+        Returns:
+            Tuple of (dates as datetime64[s], values as float32); empty arrays if nothing is stored
+        """
+        try:
+            with np.load(self._path(keyword, geo, resolution)) as data:
+                dates = data['dates'].astype('datetime64[s]')
+                values = data['values']
+        except (OSError, KeyError, ValueError):
+            return np.array([], dtype='datetime64[s]'), np.array([], dtype=np.float32)
+
+        mask = np.ones(len(dates), dtype=bool)
+        if start is not None:
+            mask &= dates >= np.datetime64(start, 's')
+        if end is not None:
+            mask &= dates <= np.datetime64(end, 's')
+        return dates[mask], values[mask]
+
+    def coverage(self, keyword: str, geo: str = 'US', resolution: str = 'day') -> Optional[Tuple[np.datetime64, np.datetime64]]:
+        """First and last stored date, or None if nothing is stored"""
+        dates, _ = self.read(keyword, geo, resolution)
+        if len(dates) == 0:
+            return None
+        return dates[0], dates[-1]
+
+    def missing_ranges(
+        self,
+        keyword: str,
+        start: np.datetime64,
+        end: np.datetime64,
+        geo: str = 'US',
+        resolution: str = 'day'
+    ) -> List[Tuple[np.datetime64, np.datetime64]]:
+        """
+        Date ranges within [start, end] that are not stored yet
+
+        Each range is widened by OVERLAP_POINTS into the stored data so the
+        fetch can be rescaled onto it, even when the request itself lies
+        entirely before or after the stored series.
+
+        Returns:
+            List of (start, end) ranges, empty if the request is fully covered
+        """
+        start = np.datetime64(start, 's')
+        end = np.datetime64(end, 's')
+        dates, _ = self.read(keyword, geo, resolution)
+        if len(dates) == 0:
+            return [(start, end)]
+
+        step = STEP[resolution]
+        overlap = step * OVERLAP_POINTS[resolution]
+        ranges = []
+        if start < dates[0]:
+            ranges.append((start, dates[0] + overlap))
+
+        # Holes inside the stored series that fall within the request
+        gaps = np.flatnonzero(np.diff(dates) > step + step // 2)
+        for gap in gaps:
+            gap_start, gap_end = dates[gap], dates[gap + 1]
+            if gap_end > start and gap_start < end:
+                ranges.append((gap_start - overlap, gap_end + overlap))
+
+        if end >= dates[-1] + step:
+            ranges.append((dates[-1] - overlap, end))
+        return ranges
+
+    def write(
+        self,
+        keyword: str,
+        dates: np.ndarray,
+        values: np.ndarray,
+        geo: str = 'US',
+        resolution: Optional[str] = None
+    ) -> None:
+        """
+        Merge a fetched series into the store
+
+        Google scales every request independently, so the new values are first
+        rescaled onto the stored series by a least-squares fit over the dates
+        both share. New values replace stored ones on shared dates (the latest
+        point of a fetch is often partial and gets revised).
+
+        A fetch that cannot be fitted (no shared dates, or no signal on them)
+        is never merged on its own scale: it replaces the stored series if it
+        reaches further forward, and is dropped otherwise.
+
+        Args:
+            keyword: Keyword
+            dates: Date index of the fetch
+            values: Interest values of the fetch
+            geo: Region code
+            resolution: Resolution (inferred from the dates if omitted)
+        """
+        dates = np.asarray(dates, dtype='datetime64[s]')
+        values = np.asarray(values, dtype=np.float64)
+        if len(dates) == 0:
+            return
+
+        resolution = resolution or infer_resolution(dates)
+
+        with self._lock:
+            old_dates, old_values = self.read(keyword, geo, resolution)
+
+            if len(old_dates):
+                shared, old_index, new_index = np.intersect1d(old_dates, dates, return_indices=True)
+                new_overlap = values[new_index]
+                old_overlap = old_values[old_index].astype(np.float64)
+                denominator = float(new_overlap @ new_overlap)
+
+                if len(shared) and denominator > 0 and old_overlap.sum() > 0:
+                    values = values * (float(new_overlap @ old_overlap) / denominator)
+                    keep = ~np.isin(old_dates, dates)
+                elif dates[-1] > old_dates[-1]:
+                    print(f"⚠️ Interest for '{keyword}' does not overlap the stored series; replacing it")
+                    keep = np.zeros(len(old_dates), dtype=bool)
+                else:
+                    print(f"⚠️ Interest for '{keyword}' does not overlap the stored series; keeping the stored series")
+                    return
+
+                dates = np.concatenate([old_dates[keep], dates])
+                values = np.concatenate([old_values[keep].astype(np.float64), values])
+                order = np.argsort(dates, kind='stable')
+                dates, values = dates[order], values[order]
+
+            dates, values = dates[-MAX_POINTS:], values[-MAX_POINTS:]
+
+            path = self._path(keyword, geo, resolution)
+            tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+            np.savez_compressed(tmp_path, dates=dates.astype(np.int64), values=values.astype(np.float32))
+            os.replace(tmp_path, path)
+
+            self._update_index(keyword, geo, resolution)
+
+    def _update_index(self, keyword: str, geo: str, resolution: str) -> None:
+        index = self._read_index()
+        entry = f"{keyword.strip().lower()}|{geo}|{resolution}"
+        if entry not in index:
+            index.append(entry)
+            tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(index, f)
+            os.replace(tmp_path, self.index_path)
+
+    def _read_index(self) -> List[str]:
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+
+    def keywords(self, geo: str = 'US', resolution: str = 'day') -> List[str]:
+        """Keywords with a stored series for a geo and resolution"""
+        keywords = []
+        for entry in self._read_index():
+            keyword, entry_geo, entry_resolution = entry.rsplit('|', 2)
+            if entry_geo == geo and entry_resolution == resolution:
+                keywords.append(keyword)
+        return keywords
+
+    def read_many(
+        self,
+        keywords: List[str],
+        geo: str = 'US',
+        resolution: str = 'day',
+        start: Optional[np.datetime64] = None,
+        end: Optional[np.datetime64] = None
+    ) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        """Read several series at once (keywords without data are omitted)"""
+        series = {}
+        for keyword in keywords:
+            dates, values = self.read(keyword, geo, resolution, start, end)
+            if len(dates):
+                series[keyword] = (dates, values)
+        return series
+
+
+# Global series store
+_series_store = None
+
+def get_series_store() -> InterestSeriesStore:
+    """Get the process-wide interest series store"""
+    global _series_store
+    if _series_store is None:
+        _series_store = InterestSeriesStore()
+    return _series_store
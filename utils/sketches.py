@@ -0,0 +1,293 @@
+"""
+Frequency Sketches for CreatorPulse
+Bounded-memory, mergeable keyword counters for trend analysis over large corpora
+"""
+
+import hashlib
+import heapq
+import math
+from typing import Dict, Iterable, List, Optional, Tuple, Any
+
+import numpy as np
+
+
+class SpaceSaving:
+    """
+    Space-Saving heavy-hitter summary
+
+    Tracks at most ``capacity`` counters. Every reported count overestimates
+    the true count by at most ``total / capacity`` (the error bound), and any
+    keyword whose true count exceeds that bound is guaranteed to be tracked.
+    """
+
+    def __init__(self, capacity: Optional[int] = None, epsilon: Optional[float] = None):
+        """
+        Initialize Space-Saving summary
+
+        Args:
+            capacity: Maximum number of tracked keywords
+            epsilon: Relative error bound; sets capacity to ceil(1 / epsilon)
+        """
+        if capacity is None:
+            if epsilon is None:
+                raise ValueError("Either capacity or epsilon is required")
+            capacity = math.ceil(1 / epsilon)
+
+        self.capacity = max(int(capacity), 1)
+        self.total = 0
+        self.counts: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self._heap: List[Tuple[int, str]] = []  # Lazy min-heap of (count, keyword)
+
+    @property
+    def error_bound(self) -> float:
+        """Maximum overestimate of any reported count"""
+        return self.total / self.capacity
+
+    def add(self, keyword: str, count: int = 1) -> None:
+        """Add ``count`` occurrences of a keyword"""
+        self.total += count
+
+        if keyword in self.counts:
+            self.counts[keyword] += count
+        elif len(self.counts) < self.capacity:
+            self.counts[keyword] = count
+            self.errors[keyword] = 0
+        else:
+            # Replace the smallest counter; its count becomes the new error
+            min_count, min_keyword = self._pop_min()
+            del self.counts[min_keyword]
+            del self.errors[min_keyword]
+            self.counts[keyword] = min_count + count
+            self.errors[keyword] = min_count
+
+        self._push(keyword)
+
+    def update(self, keywords: Iterable[str]) -> None:
+        """Add one occurrence of every keyword in an iterable"""
+        for keyword in keywords:
+            self.add(keyword)
+
+    def top(self, n: int) -> List[Tuple[str, int]]:
+        """Get the ``n`` keywords with the highest estimated counts"""
+        return heapq.nlargest(n, self.counts.items(), key=lambda kv: kv[1])
+
+    def estimate(self, keyword: str) -> int:
+        """Get the (over)estimated count of a keyword, 0 if untracked"""
+        return self.counts.get(keyword, 0)
+
+    def guaranteed(self, keyword: str) -> int:
+        """Get the lower bound on a tracked keyword's true count"""
+        return self.counts.get(keyword, 0) - self.errors.get(keyword, 0)
+
+    def merge(self, other: 'SpaceSaving') -> 'SpaceSaving':
+        """
+        Merge another summary into this one
+
+        Keywords missing from a full summary are charged that summary's
+        minimum count, which keeps every merged count an overestimate.
+
+        Args:
+            other: Summary to merge in
+
+        Returns:
+            This summary, for chaining
+        """
+        my_floor = self._min_count() if len(self.counts) >= self.capacity else 0
+        their_floor = other._min_count() if len(other.counts) >= other.capacity else 0
+
+        merged_counts = {}
+        merged_errors = {}
+        for keyword in set(self.counts) | set(other.counts):
+            if keyword in self.counts:
+                mine, my_error = self.counts[keyword], self.errors[keyword]
+            else:
+                mine, my_error = my_floor, my_floor
+            if keyword in other.counts:
+                theirs, their_error = other.counts[keyword], other.errors[keyword]
+            else:
+                theirs, their_error = their_floor, their_floor
+            merged_counts[keyword] = mine + theirs
+            merged_errors[keyword] = my_error + their_error
+
+        kept = heapq.nlargest(self.capacity, merged_counts.items(), key=lambda kv: kv[1])
+        self.counts = dict(kept)
+        self.errors = {keyword: merged_errors[keyword] for keyword in self.counts}
+        self.total += other.total
+        self._rebuild_heap()
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize summary"""
+        return {
+            'type': 'space_saving',
+            'capacity': self.capacity,
+            'total': self.total,
+            'counts': dict(self.counts),
+            'errors': dict(self.errors)
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'SpaceSaving':
+        """Restore a summary from ``to_dict`` output"""
+        summary = cls(capacity=data['capacity'])
+        summary.total = data.get('total', 0)
+        summary.counts = dict(data.get('counts', {}))
+        summary.errors = dict(data.get('errors', {}))
+        summary._rebuild_heap()
+        return summary
+
+    def _push(self, keyword: str) -> None:
+        heapq.heappush(self._heap, (self.counts[keyword], keyword))
+        # Stale entries accumulate on increments; compact occasionally
+        if len(self._heap) > 4 * self.capacity:
+            self._rebuild_heap()
+
+    def _pop_min(self) -> Tuple[int, str]:
+        while True:
+            count, keyword = heapq.heappop(self._heap)
+            if self.counts.get(keyword) == count:
+                return count, keyword
+
+    def _min_count(self) -> int:
+        return min(self.counts.values()) if self.counts else 0
+
+    def _rebuild_heap(self) -> None:
+        self._heap = [(count, keyword) for keyword, count in self.counts.items()]
+        heapq.heapify(self._heap)
+
+
+class CountMinSketch:
+    """
+    Count-Min Sketch frequency estimator
+
+    Estimates never undercount; with probability ``1 - delta`` they
+    overcount by at most ``epsilon * total``. Memory is fixed at
+    ``depth x width`` integers regardless of vocabulary size. Optionally
+    tracks the ``track_top`` keywords with the highest estimates so the
+    sketch can answer top-K queries.
+    """
+
+    def __init__(
+        self,
+        width: Optional[int] = None,
+        depth: Optional[int] = None,
+        epsilon: float = 0.001,
+        delta: float = 0.01,
+        track_top: int = 0
+    ):
+        """
+        Initialize Count-Min Sketch
+
+        Args:
+            width: Counters per row (defaults to ceil(e / epsilon))
+            depth: Number of rows (defaults to ceil(ln(1 / delta)))
+            epsilon: Relative error bound used when width is not given
+            delta: Failure probability used when depth is not given
+            track_top: Number of top keyword candidates to keep (0 disables top-K)
+        """
+        self.width = int(width or math.ceil(math.e / epsilon))
+        self.depth = int(depth or math.ceil(math.log(1 / delta)))
+        self.track_top = track_top
+        self.total = 0
+        self.table = np.zeros((self.depth, self.width), dtype=np.int64)
+        self.candidates: Dict[str, int] = {}
+        self._rows = np.arange(self.depth, dtype=np.uint64)
+
+    @property
+    def error_bound(self) -> float:
+        """Overestimate bound (holds with probability 1 - delta)"""
+        return math.e / self.width * self.total
+
+    def _indexes(self, keyword: str) -> np.ndarray:
+        # Double hashing from one stable digest so sketches merge across processes
+        digest = hashlib.blake2b(keyword.encode('utf-8'), digest_size=16).digest()
+        h1 = np.uint64(int.from_bytes(digest[:8], 'little'))
+        h2 = np.uint64(int.from_bytes(digest[8:], 'little') | 1)
+        with np.errstate(over='ignore'):
+            return ((h1 + self._rows * h2) % np.uint64(self.width)).astype(np.intp)
+
+    def add(self, keyword: str, count: int = 1) -> None:
+        """Add ``count`` occurrences of a keyword"""
+        indexes = self._indexes(keyword)
+        self.table[np.arange(self.depth), indexes] += count
+        self.total += count
+
+        if self.track_top:
+            self._track(keyword, int(self.table[np.arange(self.depth), indexes].min()))
+
+    def update(self, keywords: Iterable[str]) -> None:
+        """Add one occurrence of every keyword in an iterable"""
+        counts: Dict[str, int] = {}
+        for keyword in keywords:
+            counts[keyword] = counts.get(keyword, 0) + 1
+        for keyword, count in counts.items():
+            self.add(keyword, count)
+
+    def estimate(self, keyword: str) -> int:
+        """Get the estimated count of a keyword"""
+        return int(self.table[np.arange(self.depth), self._indexes(keyword)].min())
+
+    def top(self, n: int) -> List[Tuple[str, int]]:
+        """Get the ``n`` tracked keywords with the highest estimated counts"""
+        return heapq.nlargest(n, self.candidates.items(), key=lambda kv: kv[1])
+
+    def merge(self, other: 'CountMinSketch') -> 'CountMinSketch':
+        """
+        Merge another sketch with identical dimensions into this one
+
+        Args:
+            other: Sketch to merge in
+
+        Returns:
+            This sketch, for chaining
+        """
+        if other.width != self.width or other.depth != self.depth:
+            raise ValueError("Cannot merge Count-Min sketches with different dimensions")
+
+        self.table += other.table
+        self.total += other.total
+
+        if self.track_top:
+            for keyword in set(self.candidates) | set(other.candidates):
+                self.candidates[keyword] = self.estimate(keyword)
+            self._trim_candidates()
+
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize sketch"""
+        return {
+            'type': 'count_min',
+            'width': self.width,
+            'depth': self.depth,
+            'track_top': self.track_top,
+            'total': self.total,
+            'table': self.table.tolist(),
+            'candidates': dict(self.candidates)
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'CountMinSketch':
+        """Restore a sketch from ``to_dict`` output"""
+        sketch = cls(width=data['width'], depth=data['depth'], track_top=data.get('track_top', 0))
+        sketch.total = data.get('total', 0)
+        sketch.table = np.array(data['table'], dtype=np.int64)
+        sketch.candidates = dict(data.get('candidates', {}))
+        return sketch
+
+    def _track(self, keyword: str, estimate: int) -> None:
+        self.candidates[keyword] = estimate
+        if len(self.candidates) > 2 * self.track_top:
+            self._trim_candidates()
+
+    def _trim_candidates(self) -> None:
+        kept = heapq.nlargest(self.track_top, self.candidates.items(), key=lambda kv: kv[1])
+        self.candidates = dict(kept)
+
+
+def sketch_from_dict(data: Dict[str, Any]):
+    """Restore either sketch type from its serialized form"""
+    if data.get('type') == 'count_min':
+        return CountMinSketch.from_dict(data)
+    return SpaceSaving.from_dict(data)
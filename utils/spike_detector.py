@@ -0,0 +1,277 @@
+"""
+Streaming Spike Detector for CreatorPulse
+Keeps an exponentially weighted baseline per keyword so spikes can be
+scored without rescanning historical trend rows
+"""
+
+import json
+import math
+import os
+import time
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional, Any
+
+
+# Beyond this many empty periods the baseline is decayed in closed form
+MAX_GAP_PERIODS = 64
+
+
+@dataclass
+class KeywordBaseline:
+    """Compact EWMA state for a single keyword"""
+    mean: float = 0.0
+    variance: float = 0.0
+    periods: int = 0  # Number of completed periods folded into the baseline
+    pending: float = 0.0  # Count observed for the current (open) period
+    period_index: int = 0  # Index of the current period (epoch // period_seconds)
+    last_seen: float = 0.0  # Unix timestamp of the last observation
+
+
+class StreamingSpikeDetector:
+    """
+    Detects keyword spikes against exponentially weighted baselines
+
+    Each keyword keeps an EWMA mean and variance of its per-period count.
+    Observations for the current period are held in ``pending`` and only
+    folded into the baseline once a newer period is observed, so repeated
+    analyses on the same day do not inflate the baseline. Every update is
+    O(1) per keyword.
+    """
+
+    def __init__(
+        self,
+        half_life_periods: float = 7.0,
+        period_seconds: int = 86400,
+        min_periods: int = 3,
+        min_std: float = 1.0
+    ):
+        """
+        Initialize streaming spike detector
+
+        Args:
+            half_life_periods: Number of periods after which an observation's weight halves
+            period_seconds: Length of one baseline period (default one day)
+            min_periods: Periods required before a keyword's baseline is trusted
+            min_std: Floor for the standard deviation used in z-scores
+        """
+        self.half_life_periods = half_life_periods
+        self.period_seconds = period_seconds
+        self.min_periods = min_periods
+        self.min_std = min_std
+        self.alpha = 1 - 0.5 ** (1 / half_life_periods)
+        self.states: Dict[str, KeywordBaseline] = {}
+
+    def observe(self, keyword: str, count: float, timestamp: Optional[float] = None) -> KeywordBaseline:
+        """
+        Record the count of a keyword for the period containing ``timestamp``
+
+        The latest observation for a period replaces earlier ones, since each
+        analysis already covers the full content window.
+
+        Args:
+            keyword: Keyword to update
+            count: Mention count observed for the current period
+            timestamp: Unix timestamp of the observation (defaults to now)
+
+        Returns:
+            Updated keyword state
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        period = int(timestamp // self.period_seconds)
+
+        state = self.states.get(keyword)
+        if state is None:
+            state = KeywordBaseline(pending=float(count), period_index=period, last_seen=timestamp)
+            self.states[keyword] = state
+            return state
+
+        if period < state.period_index:
+            # Late observation for an already closed period - ignore it
+            return state
+
+        if period > state.period_index:
+            self._advance(state, period)
+
+        state.pending = float(count)
+        state.last_seen = max(state.last_seen, timestamp)
+        return state
+
+    def update(self, keyword_counts: Dict[str, float], timestamp: Optional[float] = None) -> Dict[str, float]:
+        """
+        Observe a batch of keyword counts and return their z-scores
+
+        Args:
+            keyword_counts: Mapping of keyword to current count
+            timestamp: Unix timestamp of the observation (defaults to now)
+
+        Returns:
+            Mapping of keyword to z-score (keywords without a baseline score 0.0)
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        scores = {}
+        for keyword, count in keyword_counts.items():
+            self.observe(keyword, count, timestamp)
+            scores[keyword] = self.z_score(keyword)
+        return scores
+
+    def z_score(self, keyword: str) -> float:
+        """
+        Score the current period's count of a keyword against its baseline
+
+        Args:
+            keyword: Keyword to score
+
+        Returns:
+            z-score, or 0.0 if the keyword has no trusted baseline yet
+        """
+        state = self.states.get(keyword)
+        if state is None or not self.is_warm(keyword):
+            return 0.0
+
+        std = max(math.sqrt(max(state.variance, 0.0)), self.min_std)
+        return (state.pending - state.mean) / std
+
+    def is_warm(self, keyword: str) -> bool:
+        """Check whether a keyword has enough history for a trusted baseline"""
+        state = self.states.get(keyword)
+        return state is not None and state.periods >= self.min_periods
+
+    def baseline(self, keyword: str) -> float:
+        """Get the baseline (EWMA mean per period) for a keyword"""
+        state = self.states.get(keyword)
+        return state.mean if state else 0.0
+
+    def merge(self, other: 'StreamingSpikeDetector') -> 'StreamingSpikeDetector':
+        """
+        Merge another detector's state into this one
+
+        States are treated as partitions of the same stream (e.g. different
+        users or workers), so means, variances and pending counts add up.
+        Both detectors must use the same period length and half-life.
+
+        Args:
+            other: Detector to merge in
+
+        Returns:
+            This detector, for chaining
+        """
+        if other.period_seconds != self.period_seconds or other.half_life_periods != self.half_life_periods:
+            raise ValueError("Cannot merge detectors with different period or half-life settings")
+
+        for keyword, other_state in other.states.items():
+            theirs = KeywordBaseline(**asdict(other_state))
+            mine = self.states.get(keyword)
+            if mine is None:
+                self.states[keyword] = theirs
+                continue
+
+            # Align both states on the most recent period before combining
+            period = max(mine.period_index, theirs.period_index)
+            if mine.period_index < period:
+                self._advance(mine, period)
+            if theirs.period_index < period:
+                self._advance(theirs, period)
+
+            mine.mean += theirs.mean
+            mine.variance += theirs.variance
+            mine.pending += theirs.pending
+            mine.periods = max(mine.periods, theirs.periods)
+            mine.last_seen = max(mine.last_seen, theirs.last_seen)
+
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize detector configuration and state"""
+        return {
+            'half_life_periods': self.half_life_periods,
+            'period_seconds': self.period_seconds,
+            'min_periods': self.min_periods,
+            'min_std': self.min_std,
+            'states': {keyword: asdict(state) for keyword, state in self.states.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'StreamingSpikeDetector':
+        """Restore a detector from ``to_dict`` output"""
+        detector = cls(
+            half_life_periods=data.get('half_life_periods', 7.0),
+            period_seconds=data.get('period_seconds', 86400),
+            min_periods=data.get('min_periods', 3),
+            min_std=data.get('min_std', 1.0)
+        )
+        for keyword, state in data.get('states', {}).items():
+            detector.states[keyword] = KeywordBaseline(**state)
+        return detector
+
+    def save(self, path: str) -> None:
+        """Persist detector state to a JSON file (atomic replace)"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> 'StreamingSpikeDetector':
+        """Load detector state from a JSON file, or start empty if missing"""
+        if not os.path.exists(path):
+            return cls(**kwargs)
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+    def to_rows(self, user_id: str) -> List[Dict[str, Any]]:
+        """Convert state to rows for the keyword_baselines table"""
+        rows = []
+        for keyword, state in self.states.items():
+            rows.append({
+                'user_id': user_id,
+                'keyword': keyword,
+                'mean': state.mean,
+                'variance': state.variance,
+                'periods': state.periods,
+                'pending': state.pending,
+                'period_index': state.period_index,
+                'last_seen': state.last_seen
+            })
+        return rows
+
+    def load_rows(self, rows: List[Dict[str, Any]]) -> None:
+        """Load state from keyword_baselines rows"""
+        for row in rows:
+            self.states[row['keyword']] = KeywordBaseline(
+                mean=float(row.get('mean') or 0.0),
+                variance=float(row.get('variance') or 0.0),
+                periods=int(row.get('periods') or 0),
+                pending=float(row.get('pending') or 0.0),
+                period_index=int(row.get('period_index') or 0),
+                last_seen=float(row.get('last_seen') or 0.0)
+            )
+
+    def _fold(self, state: KeywordBaseline, value: float) -> None:
+        """Fold one completed period's count into the EWMA baseline"""
+        if state.periods == 0:
+            state.mean = value
+            state.variance = 0.0
+        else:
+            diff = value - state.mean
+            increment = self.alpha * diff
+            state.mean += increment
+            state.variance = (1 - self.alpha) * (state.variance + diff * increment)
+        state.periods += 1
+
+    def _advance(self, state: KeywordBaseline, period: int) -> None:
+        """Close the pending period and account for empty periods up to ``period``"""
+        self._fold(state, state.pending)
+
+        gap = period - state.period_index - 1
+        for _ in range(min(gap, MAX_GAP_PERIODS)):
+            self._fold(state, 0.0)
+
+        if gap > MAX_GAP_PERIODS:
+            # Remaining empty periods only shrink the baseline towards zero
+            decay = (1 - self.alpha) ** (gap - MAX_GAP_PERIODS)
+            state.mean *= decay
+            state.variance *= decay
+            state.periods += gap - MAX_GAP_PERIODS
+
+        state.pending = 0.0
+        state.period_index = period
@@ -335,24 +335,98 @@ class CreatorPulseDB:
             return {'success': False, 'error': 'Database not configured'}
 
         try:
-            self.client.table('trending_content').insert({
-                'user_id': user_id,
-                'source_type': source_type,
-                'title': title,
-                'description': description,
-                'keywords': keywords or [],
-                'url': url,
-                'metadata': metadata or {},
-                'search_volume': search_volume,
-                'category': category,
-                'is_active': True
-            }).execute()
+            self.client.table('trending_content').insert(
+                self.trending_content_row(
+                    user_id=user_id,
+                    source_type=source_type,
+                    title=title,
+                    description=description,
+                    keywords=keywords,
+                    url=url,
+                    metadata=metadata,
+                    search_volume=search_volume,
+                    category=category
+                )
+            ).execute()
             return {'success': True}
         except Exception as e:
             error_msg = str(e)
             print(f"Error saving trending content: {error_msg}")
             return {'success': False, 'error': error_msg}
 
+    @staticmethod
+    def trending_content_row(
+        user_id: str,
+        source_type: str,
+        title: str,
+        description: str = '',
+        keywords: List[str] = None,
+        url: str = '',
+        metadata: Dict = None,
+        search_volume: int = 0,
+        category: str = 'all'
+    ) -> Dict:
+        """Build a trending_content row"""
+        return {
+            'user_id': user_id,
+            'source_type': source_type,
+            'title': title,
+            'description': description,
+            'keywords': keywords or [],
+            'url': url,
+            'metadata': metadata or {},
+            'search_volume': search_volume,
+            'category': category,
+            'is_active': True
+        }
+
+    def save_trending_content_bulk(self, rows: List[Dict], batch_size: int = 500) -> Dict:
+        """
+        Upsert many trending_content rows in as few requests as possible
+
+        Rows are keyed by (user_id, title, category, discovered_on), so
+        re-running discovery on the same day updates rows instead of adding
+        duplicates. Requires database/add_trending_content_dedupe.sql.
+
+        Args:
+            rows: Rows built with trending_content_row
+            batch_size: Maximum rows per request
+
+        Returns:
+            Dictionary with success status and number of rows written
+        """
+        if not self.client:
+            return {'success': False, 'error': 'Database not configured'}
+
+        if not rows:
+            return {'success': True, 'count': 0}
+
+        from datetime import datetime, timezone
+        discovered_on = datetime.now(timezone.utc).date().isoformat()
+
+        # The same trend may appear twice in one batch (e.g. in two categories
+        # of the snapshot); Postgres rejects an upsert touching a row twice
+        unique_rows = {}
+        for row in rows:
+            row = {**row, 'discovered_on': row.get('discovered_on') or discovered_on}
+            unique_rows[(row['user_id'], row['title'], row.get('category'), row['discovered_on'])] = row
+        rows = list(unique_rows.values())
+
+        written = 0
+        try:
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start:start + batch_size]
+                self.client.table('trending_content').upsert(
+                    batch,
+                    on_conflict='user_id,title,category,discovered_on'
+                ).execute()
+                written += len(batch)
+            return {'success': True, 'count': written}
+        except Exception as e:
+            error_msg = str(e)
+            print(f"Error bulk saving trending content: {error_msg}")
+            return {'success': False, 'error': error_msg, 'count': written}
+
     def get_trending_content(self, user_id: str, days_back: int = 7) -> List[Dict]:
         """Get trending content for a user from the last N days"""
         if not self.client:
@@ -405,6 +479,202 @@ class CreatorPulseDB:
             print(f"Error deleting trending content: {e}")
             return False
 
+    # ===== TREND ROLLUP OPERATIONS =====
+
+    def get_trend_rollups(
+        self,
+        user_id: Optional[str],
+        source: str = 'content',
+        granularity: str = 'day',
+        days_back: int = 30,
+        keywords: Optional[List[str]] = None
+    ) -> List[Dict]:
+        """
+        Get hourly or daily trend aggregates
+
+        Args:
+            user_id: User to read rollups for, or None for the global rollup
+            source: 'content' (keywords from sources) or 'google_trends'
+            granularity: 'hour' or 'day'
+            days_back: How many days of buckets to return
+            keywords: Optional keyword filter
+
+        Returns:
+            List of rollup rows ordered by bucket_start
+        """
+        if not self.client:
+            return []
+
+        try:
+            from datetime import datetime, timedelta
+            cutoff_date = (datetime.now() - timedelta(days=days_back)).isoformat()
+
+            query = self.client.table('trend_rollups').select(
+                'keyword, bucket_start, mention_count, observations, max_spike_factor'
+            ).eq('source', source).eq('granularity', granularity).gte('bucket_start', cutoff_date)
+
+            if user_id:
+                query = query.eq('user_id', user_id)
+            else:
+                query = query.is_('user_id', 'null')
+
+            if keywords:
+                query = query.in_('keyword', keywords)
+
+            response = query.order('bucket_start').execute()
+            return response.data
+        except Exception as e:
+            print(f"Error fetching trend rollups: {e}")
+            return []
+
+    # ===== KEYWORD BASELINE OPERATIONS =====
+
+    def get_keyword_baselines(self, user_id: str, keywords: Optional[List[str]] = None) -> List[Dict]:
+        """Get streaming spike-detection baselines for a user (optionally only some keywords)"""
+        if not self.client:
+            return []
+
+        try:
+            query = self.client.table('keyword_baselines').select('*').eq('user_id', user_id)
+
+            if keywords:
+                query = query.in_('keyword', keywords)
+
+            response = query.execute()
+            return response.data
+        except Exception as e:
+            print(f"Error fetching keyword baselines: {e}")
+            return []
+
+    def save_keyword_baselines(self, rows: List[Dict]) -> bool:
+        """Upsert streaming spike-detection baselines"""
+        if not self.client:
+            return False
+
+        if not rows:
+            return True
+
+        try:
+            self.client.table('keyword_baselines').upsert(
+                rows,
+                on_conflict='user_id,keyword'
+            ).execute()
+            return True
+        except Exception as e:
+            print(f"Error saving keyword baselines: {e}")
+            return False
+
+    # ===== SCHEDULER LEASE OPERATIONS =====
+
+    def acquire_scheduler_lease(self, name: str, holder: str, ttl_seconds: int) -> Optional[bool]:
+        """
+        Acquire or renew a scheduler leader lease
+
+        Returns:
+            True if holder holds the lease, False if another process does,
+            None if the lease could not be checked
+        """
+        if not self.client:
+            return None
+
+        try:
+            response = self.client.rpc('acquire_scheduler_lease', {
+                'p_name': name,
+                'p_holder': holder,
+                'p_ttl_seconds': ttl_seconds
+            }).execute()
+            return bool(response.data)
+        except Exception as e:
+            print(f"Error acquiring scheduler lease: {e}")
+            return None
+
+    def release_scheduler_lease(self, name: str, holder: str) -> bool:
+        """Release a scheduler leader lease held by holder"""
+        if not self.client:
+            return False
+
+        try:
+            self.client.rpc('release_scheduler_lease', {
+                'p_name': name,
+                'p_holder': holder
+            }).execute()
+            return True
+        except Exception as e:
+            print(f"Error releasing scheduler lease: {e}")
+            return False
+
+    # ===== TREND DISCOVERY RUN OPERATIONS =====
+
+    def get_or_create_trend_run(self, run_key: str) -> Optional[Dict]:
+        """Get the trend discovery run for a key, creating it if needed"""
+        if not self.client:
+            return None
+
+        try:
+            response = self.client.table('trend_discovery_runs').select('*').eq('run_key', run_key).execute()
+            if response.data:
+                return response.data[0]
+
+            response = self.client.table('trend_discovery_runs').upsert(
+                {'run_key': run_key},
+                on_conflict='run_key'
+            ).execute()
+            return response.data[0] if response.data else None
+        except Exception as e:
+            print(f"Error getting trend discovery run: {e}")
+            return None
+
+    def get_trend_run_users(self, run_id: str) -> List[Dict]:
+        """Get per-user statuses recorded for a trend discovery run"""
+        if not self.client:
+            return []
+
+        try:
+            response = self.client.table('trend_discovery_run_users').select(
+                'user_id, status, error'
+            ).eq('run_id', run_id).execute()
+            return response.data
+        except Exception as e:
+            print(f"Error getting trend discovery run users: {e}")
+            return []
+
+    def save_trend_run_user(self, run_id: str, user_id: str, status: str, error: Optional[str] = None) -> bool:
+        """Record a user's outcome within a trend discovery run"""
+        if not self.client:
+            return False
+
+        try:
+            from datetime import datetime
+            self.client.table('trend_discovery_run_users').upsert({
+                'run_id': run_id,
+                'user_id': user_id,
+                'status': status,
+                'error': error,
+                'updated_at': datetime.now().isoformat()
+            }, on_conflict='run_id,user_id').execute()
+            return True
+        except Exception as e:
+            print(f"Error saving trend discovery run user: {e}")
+            return False
+
+    def finish_trend_run(self, run_id: str, users_done: int, users_failed: int) -> bool:
+        """Mark a trend discovery run as completed"""
+        if not self.client:
+            return False
+
+        try:
+            from datetime import datetime
+            self.client.table('trend_discovery_runs').update({
+                'status': 'completed',
+                'finished_at': datetime.now().isoformat(),
+                'users_done': users_done,
+                'users_failed': users_failed
+            }).eq('id', run_id).execute()
+            return True
+        except Exception as e:
+            print(f"Error finishing trend discovery run: {e}")
+            return False
+
     # ===== TREND SETTINGS OPERATIONS =====
 
     def get_user_trend_settings(self, user_id: str) -> Optional[Dict]:
@@ -458,13 +728,19 @@ class CreatorPulseDB:
             print(f"Error saving trend settings: {error_msg}")
             return {'success': False, 'error': error_msg}
 
-    def get_users_with_trend_discovery_enabled(self) -> List[Dict]:
-        """Get all users who have trend discovery enabled"""
+    def get_users_with_trend_discovery_enabled(self, schedule_time: Optional[str] = None) -> List[Dict]:
+        """Get all users who have trend discovery enabled (optionally only one schedule time slot)"""
         if not self.client:
             return []
 
         try:
-            response = self.client.table('trend_settings').select('*').eq('enabled', True).execute()
+            query = self.client.table('trend_settings').select('*').eq('enabled', True)
+            if schedule_time == '09:00:00':
+                # Users without a schedule_time run in the default 9 AM slot
+                query = query.or_('schedule_time.eq.09:00:00,schedule_time.is.null')
+            elif schedule_time:
+                query = query.eq('schedule_time', schedule_time)
+            response = query.execute()
             return response.data
         except Exception as e:
             print(f"Error fetching users with trend discovery enabled: {e}")
@@ -7,19 +7,45 @@ from collections import Counter
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
 import re
+import time
+
+from utils.spike_detector import StreamingSpikeDetector
+from utils.sketches import CountMinSketch, SpaceSaving
+from utils.keyword_cache import KeywordCache, get_keyword_cache
+from utils.keyword_matcher import get_user_matcher
+from utils.keyword_normalizer import normalize_keyword
+
+
+# Bump when keyword extraction changes so cached per-item counts are not reused
+KEYWORD_EXTRACTION_VERSION = 'v2'
 
 
 class TrendDetector:
     """Detects trending topics and keyword spikes in content"""
 
-    def __init__(self, db=None):
+    def __init__(
+        self,
+        db=None,
+        user_id: Optional[str] = None,
+        spike_detector: Optional[StreamingSpikeDetector] = None,
+        sketch_epsilon: float = 0.001,
+        keyword_cache: Optional[KeywordCache] = None
+    ):
         """
         Initialize trend detector
 
         Args:
             db: Optional database client for historical data
+            user_id: Optional user whose keyword baselines are read and updated
+            spike_detector: Optional in-memory streaming detector (used instead of the database baselines)
+            sketch_epsilon: Relative error bound of the approximate (sketch) counting mode
+            keyword_cache: Per-item keyword count cache (defaults to the shared cache)
         """
         self.db = db
+        self.user_id = user_id
+        self.spike_detector = spike_detector
+        self.sketch_epsilon = sketch_epsilon
+        self.keyword_cache = keyword_cache if keyword_cache is not None else get_keyword_cache()
         self.stop_words = {
             'the', 'be', 'to', 'of', 'and', 'a', 'in', 'that', 'have',
             'i', 'it', 'for', 'not', 'on', 'with', 'he', 'as', 'you',
@@ -40,6 +66,9 @@ class TrendDetector:
         """
         Extract meaningful keywords from text
 
+        Inflected forms are folded onto one keyword ("models", "modeling" ->
+        "model") so they are counted together.
+
         Args:
             text: Input text to analyze
             min_length: Minimum keyword length
@@ -56,12 +85,16 @@ class TrendDetector:
             if word not in self.stop_words and len(word) >= min_length
         ]
 
-        return keywords
+        # Normalize inflections, then drop forms that fold onto stop words ("makes" -> "make")
+        keywords = [normalize_keyword(word) for word in keywords]
+        return [word for word in keywords if word not in self.stop_words]
 
     def analyze_content(
         self,
         content_items: List[Dict],
-        top_n: int = 20
+        top_n: int = 20,
+        approximate: bool = False,
+        sketch=None
     ) -> List[Dict[str, Any]]:
         """
         Analyze content items and extract trending keywords
@@ -69,64 +102,134 @@ class TrendDetector:
         Args:
             content_items: List of content dictionaries
             top_n: Number of top keywords to return
+            approximate: Count with a bounded-memory Space-Saving summary
+                instead of an exact Counter
+            sketch: Optional SpaceSaving or CountMinSketch (with track_top) to
+                count into; lets callers merge sketches across users or workers
 
         Returns:
             List of trending keyword dictionaries
+
+        Raises:
+            ValueError: If sketch is a CountMinSketch without track_top, which
+                could not report any keywords
         """
-        all_keywords = []
+        if isinstance(sketch, CountMinSketch) and sketch.track_top <= 0:
+            raise ValueError("CountMinSketch needs track_top > 0 to report top keywords")
+
+        if approximate or sketch is not None:
+            if sketch is None:
+                sketch = SpaceSaving(epsilon=self.sketch_epsilon)
 
-        # Extract keywords from all content
-        for item in content_items:
-            # Combine title and content
-            text = ""
-            if 'title' in item:
-                text += item['title'] + " "
-            if 'content' in item:
-                text += str(item['content']) + " "
-            if 'description' in item:
-                text += str(item['description']) + " "
+            for item in content_items:
+                for keyword, count in self.item_keyword_counts(item).items():
+                    sketch.add(keyword, count)
+
+            top_keywords = sketch.top(top_n)
+        else:
+            # Count keywords across all content (per-item counts are cached)
+            keyword_counts = Counter()
+            for item in content_items:
+                keyword_counts.update(self.item_keyword_counts(item))
 
-            keywords = self.extract_keywords(text)
-            all_keywords.extend(keywords)
+            # Get top keywords
+            top_keywords = keyword_counts.most_common(top_n)
 
-        # Count frequency
-        keyword_counts = Counter(all_keywords)
+        self.keyword_cache.save()
 
-        # Get top keywords
-        top_keywords = keyword_counts.most_common(top_n)
+        return self.format_keyword_counts(top_keywords, len(content_items))
 
-        # Format results
+    def format_keyword_counts(self, top_keywords: List, total_items: int) -> List[Dict[str, Any]]:
+        """
+        Format (keyword, count) pairs as trending keyword dictionaries
+
+        Args:
+            top_keywords: List of (keyword, count) tuples, highest first
+            total_items: Number of content items the counts came from
+
+        Returns:
+            List of trending keyword dictionaries
+        """
         trending = []
         for keyword, count in top_keywords:
             trending.append({
                 'keyword': keyword,
                 'count': count,
-                'relevance_score': self._calculate_relevance(keyword, count, len(content_items))
+                'relevance_score': self._calculate_relevance(keyword, count, total_items)
             })
 
         return trending
 
+    def item_keyword_counts(self, item: Dict) -> Dict[str, int]:
+        """
+        Get keyword counts for a single content item
+
+        Counts are memoized by a hash of the item's text, so unchanged items
+        are only tokenized once.
+
+        Args:
+            item: Content dictionary
+
+        Returns:
+            Mapping of keyword to occurrences in the item
+        """
+        text = self._item_text(item)
+        key = KeywordCache.make_key(text, KEYWORD_EXTRACTION_VERSION)
+
+        counts = self.keyword_cache.get(key)
+        if counts is None:
+            counts = dict(Counter(self.extract_keywords(text)))
+            self.keyword_cache.put(key, counts)
+
+        return counts
+
+    def _item_text(self, item: Dict) -> str:
+        """Combine title, content and description of a content item"""
+        text = ""
+        if 'title' in item:
+            text += item['title'] + " "
+        if 'content' in item:
+            text += str(item['content']) + " "
+        if 'description' in item:
+            text += str(item['description']) + " "
+        return text
+
     def detect_spikes(
         self,
         current_keywords: List[Dict],
         historical_data: Optional[List[Dict]] = None,
-        spike_threshold: float = 2.0
+        spike_threshold: float = 2.0,
+        z_threshold: float = 2.0,
+        history_days: int = 7
     ) -> List[Dict[str, Any]]:
         """
         Detect keyword spikes compared to historical baseline
 
+        When no historical data is passed and a streaming baseline is available
+        (an attached spike detector, or a configured database with a user_id),
+        spikes are scored as z-scores against per-keyword EWMA baselines.
+        Otherwise the current counts are compared with the per-day average of
+        the historical rows.
+
         Args:
             current_keywords: Current keyword frequencies
             historical_data: Historical keyword data (optional)
             spike_threshold: Multiplier to detect spike (default 2x)
+            z_threshold: Minimum z-score to report a spike with streaming baselines
+            history_days: Number of days covered by the historical data
 
         Returns:
             List of keywords with detected spikes
         """
+        if historical_data is None:
+            streaming_spikes = self._detect_spikes_streaming(current_keywords, z_threshold)
+            if streaming_spikes is not None:
+                return streaming_spikes
+
         if not historical_data and self.db and self.db.is_configured():
             # Try to get from database if available
             try:
-                historical_data = self._get_historical_keywords()
+                historical_data = self._get_historical_keywords(days=history_days)
             except Exception:
                 historical_data = []
 
@@ -134,7 +237,7 @@ class TrendDetector:
             # No historical data, return top keywords as trending
             return current_keywords[:10]
 
-        # Build historical baseline
+        # Build historical baseline (average mentions per day)
         historical_counts = {}
         for item in historical_data:
             keyword = item.get('keyword')
@@ -142,6 +245,9 @@ class TrendDetector:
             if keyword:
                 historical_counts[keyword] = historical_counts.get(keyword, 0) + count
 
+        days = max(history_days, 1)
+        historical_counts = {keyword: count / days for keyword, count in historical_counts.items()}
+
         # Calculate average baseline
         if historical_counts:
             avg_baseline = sum(historical_counts.values()) / len(historical_counts)
@@ -160,7 +266,7 @@ class TrendDetector:
             if spike_factor >= spike_threshold:
                 spikes.append({
                     **keyword_data,
-                    'baseline': baseline,
+                    'baseline': round(baseline, 2),
                     'spike_factor': round(spike_factor, 2),
                     'is_spike': True,
                     'trend': 'rising' if spike_factor > 2 else 'steady'
@@ -168,11 +274,69 @@ class TrendDetector:
 
         return spikes
 
+    def _detect_spikes_streaming(
+        self,
+        current_keywords: List[Dict],
+        z_threshold: float
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Score current keywords against streaming EWMA baselines
+
+        Returns:
+            List of spikes sorted by z-score, or None when no streaming
+            baseline is available or none of the keywords has enough history
+        """
+        detector = self.spike_detector
+        persist = False
+
+        if detector is None:
+            if not (self.user_id and self.db and self.db.is_configured()):
+                return None
+
+            # Only load the rows for keywords we are about to score
+            detector = StreamingSpikeDetector()
+            keywords = [k['keyword'] for k in current_keywords]
+            detector.load_rows(self.db.get_keyword_baselines(self.user_id, keywords))
+            persist = True
+
+        scores = detector.update(
+            {k['keyword']: k['count'] for k in current_keywords},
+            time.time()
+        )
+
+        if persist:
+            self.db.save_keyword_baselines(detector.to_rows(self.user_id))
+
+        if not any(detector.is_warm(k['keyword']) for k in current_keywords):
+            return None
+
+        spikes = []
+        for keyword_data in current_keywords:
+            keyword = keyword_data['keyword']
+            z_score = scores.get(keyword, 0.0)
+
+            if z_score >= z_threshold:
+                baseline = detector.baseline(keyword)
+                spike_factor = keyword_data['count'] / max(baseline, 1)
+                spikes.append({
+                    **keyword_data,
+                    'baseline': round(baseline, 2),
+                    'spike_factor': round(spike_factor, 2),
+                    'z_score': round(z_score, 2),
+                    'is_spike': True,
+                    'trend': 'rising' if spike_factor > 2 else 'steady'
+                })
+
+        spikes.sort(key=lambda spike: spike['z_score'], reverse=True)
+        return spikes
+
     def get_trending_topics(
         self,
         content_items: List[Dict],
         include_spikes: bool = True,
-        top_n: int = 10
+        top_n: int = 10,
+        approximate: bool = False,
+        custom_keywords: Optional[List[str]] = None
     ) -> Dict[str, Any]:
         """
         Get comprehensive trending topics analysis
@@ -181,13 +345,53 @@ class TrendDetector:
             content_items: List of content items to analyze
             include_spikes: Whether to include spike detection
             top_n: Number of top trends to return
+            approximate: Use bounded-memory approximate counting
+            custom_keywords: User's custom keywords to count across the content
 
         Returns:
             Dictionary with trending analysis
         """
         # Extract current keywords
-        current_keywords = self.analyze_content(content_items, top_n=20)
+        current_keywords = self.analyze_content(content_items, top_n=20, approximate=approximate)
+
+        # Count the user's custom keywords in one pass over the content
+        custom_keyword_hits = []
+        if custom_keywords:
+            matcher = get_user_matcher(self.user_id or '', custom_keywords)
+            custom_keyword_hits = [
+                {'keyword': hit['keyword'], 'count': hit['count'], 'items': len(hit['items'])}
+                for hit in matcher.match(content_items)
+            ]
+
+        return self.build_trending_report(
+            current_keywords,
+            total_items=len(content_items),
+            include_spikes=include_spikes,
+            top_n=top_n,
+            custom_keyword_hits=custom_keyword_hits
+        )
+
+    def build_trending_report(
+        self,
+        current_keywords: List[Dict],
+        total_items: int,
+        include_spikes: bool = True,
+        top_n: int = 10,
+        custom_keyword_hits: Optional[List[Dict]] = None
+    ) -> Dict[str, Any]:
+        """
+        Run spike detection and storage on already counted keywords
 
+        Args:
+            current_keywords: Trending keyword dictionaries (see analyze_content)
+            total_items: Number of content items behind the counts
+            include_spikes: Whether to include spike detection
+            top_n: Number of top trends to return
+            custom_keyword_hits: Hits of the user's custom keywords
+
+        Returns:
+            Dictionary with trending analysis
+        """
         # Detect spikes if requested
         if include_spikes:
             spikes = self.detect_spikes(current_keywords)
@@ -203,7 +407,8 @@ class TrendDetector:
 
         return {
             'trending_keywords': spikes[:top_n],
-            'total_analyzed': len(content_items),
+            'custom_keyword_hits': custom_keyword_hits or [],
+            'total_analyzed': total_items,
             'analyzed_at': datetime.now().isoformat(),
             'has_spikes': len(spikes) > 0
         }
@@ -241,6 +446,13 @@ class TrendDetector:
             else:
                 output += f"• **{keyword}** - {count} mentions\n"
 
+        if trends.get('custom_keyword_hits'):
+            followed = ", ".join(
+                f"**{hit['keyword']}** ({hit['count']})"
+                for hit in trends['custom_keyword_hits'][:max_trends]
+            )
+            output += f"\n🎯 Keywords you follow: {followed}\n"
+
         output += "\n*These topics are generating buzz in your sources*\n\n"
 
         return output
@@ -253,15 +465,26 @@ class TrendDetector:
         return round((frequency_score + length_bonus) / 2, 3)
 
     def _get_historical_keywords(self, days: int = 7) -> List[Dict]:
-        """Get historical keyword data from database"""
+        """Get historical keyword data (one row per keyword and day) from the daily rollups"""
         if not self.db or not self.db.is_configured():
             return []
 
         try:
-            # Get keywords from last N days
+            # Daily rollups hold the sum over every analysis run that day;
+            # average them so repeated runs do not inflate the baseline
+            rollups = self.db.get_trend_rollups(self.user_id, source='content', granularity='day', days_back=days)
+            if rollups:
+                return [
+                    {
+                        'keyword': row['keyword'],
+                        'count': row.get('mention_count', 0) / max(row.get('observations') or 1, 1)
+                    }
+                    for row in rollups
+                ]
+
+            # Fall back to raw rows if rollups are not set up yet
             cutoff_date = datetime.now() - timedelta(days=days)
 
-            # This assumes a trends table exists (we'll create it)
             result = self.db.client.table('trends')\
                 .select('keyword, mention_count as count')\
                 .gte('detected_at', cutoff_date.isoformat())\
@@ -280,6 +503,7 @@ class TrendDetector:
             # Store top keywords for historical tracking
             for keyword_data in keywords[:20]:
                 self.db.client.table('trends').insert({
+                    'user_id': self.user_id,
                     'keyword': keyword_data['keyword'],
                     'mention_count': keyword_data['count'],
                     'detected_at': datetime.now().isoformat()
@@ -0,0 +1,99 @@
+"""
+Trends Cache for CreatorPulse
+Shared on-disk snapshots of Google Trends responses, so identical requests are
+made once per refresh period instead of once per user and category
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+class SnapshotStore:
+    """Time-stamped JSON snapshots keyed by request, shared between processes through disk"""
+
+    def __init__(self, namespace: str, ttl_seconds: float, directory: Optional[str] = None):
+        """
+        Initialize snapshot store
+
+        Args:
+            namespace: Kind of data stored (used as a subdirectory)
+            ttl_seconds: Age after which a snapshot is considered stale
+            directory: Base directory (defaults to TRENDS_CACHE_DIR or the
+                system temp directory)
+        """
+        base = directory or os.getenv('TRENDS_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'creatorpulse_trends')
+        self.directory = os.path.join(base, namespace)
+        self.ttl_seconds = ttl_seconds
+        self._memory: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=12).hexdigest()
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def get_entry(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a snapshot regardless of age
+
+        Returns:
+            Dictionary with 'data' and 'fetched_at' (Unix timestamp), or None
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+
+        # Another process may have written a newer snapshot to disk
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                disk_entry = json.load(f)
+            if disk_entry.get('key') == key and (entry is None or disk_entry['fetched_at'] > entry['fetched_at']):
+                entry = disk_entry
+                with self._lock:
+                    self._memory[key] = entry
+        except (OSError, ValueError, KeyError):
+            pass
+
+        return entry
+
+    def get(self, key: str, max_age: Optional[float] = None) -> Optional[Any]:
+        """
+        Get a snapshot if it is fresh
+
+        Args:
+            key: Request key
+            max_age: Maximum age in seconds (defaults to the store TTL)
+
+        Returns:
+            Stored data, or None when missing or stale
+        """
+        entry = self.get_entry(key)
+        if entry is None:
+            return None
+
+        max_age = self.ttl_seconds if max_age is None else max_age
+        if time.time() - entry['fetched_at'] > max_age:
+            return None
+
+        return entry['data']
+
+    def put(self, key: str, data: Any) -> None:
+        """Store a snapshot (atomically replaces any previous one)"""
+        entry = {'key': key, 'fetched_at': time.time(), 'data': data}
+
+        with self._lock:
+            self._memory[key] = entry
+
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Warning: could not write trends snapshot: {e}")
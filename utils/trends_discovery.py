@@ -3,12 +3,17 @@ Trends Discovery Module for CreatorPulse
 Handles fetching trending topics from Google Trends using pytrends
 """
 
-import time
+import copy
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 from pytrends.request import TrendReq
+import numpy as np
 import pandas as pd
 
+from utils.rate_limiter import TokenBucket, RateLimitExceeded, get_google_trends_limiter
+from utils.trends_cache import SnapshotStore
+from utils.series_store import InterestSeriesStore, get_series_store
+
 
 class TrendsDiscovery:
     """Discovers trending topics using Google Trends API"""
@@ -26,37 +31,78 @@ class TrendsDiscovery:
         'sports': 20,  # Sports
     }
 
-    def __init__(self):
-        """Initialize pytrends connection"""
+    # pytrends accepts at most 5 keywords per payload
+    MAX_KEYWORDS_PER_REQUEST = 5
+
+    # How long a daily trending-searches snapshot is reused
+    DAILY_TRENDS_TTL_SECONDS = 3600
+
+    # How long related queries for a keyword are reused
+    RELATED_QUERIES_TTL_SECONDS = 24 * 3600
+
+    def __init__(
+        self,
+        rate_limiter: Optional[TokenBucket] = None,
+        blocking: bool = True,
+        snapshot_store: Optional[SnapshotStore] = None,
+        related_cache: Optional[SnapshotStore] = None,
+        series_store: Optional[InterestSeriesStore] = None
+    ):
+        """
+        Initialize pytrends connection
+
+        Args:
+            rate_limiter: Token bucket for Google requests (defaults to the
+                bucket shared by all processes)
+            blocking: Wait for the rate limit; if False, requests raise
+                RateLimitExceeded instead so callers can queue the work
+            snapshot_store: Store for shared daily-trends snapshots
+            related_cache: Store for related queries keyed by keyword
+            series_store: Store for raw interest-over-time series
+        """
+        self.rate_limiter = rate_limiter or get_google_trends_limiter()
+        self.blocking = blocking
+        self.daily_snapshots = snapshot_store or SnapshotStore('daily_trends', self.DAILY_TRENDS_TTL_SECONDS)
+        self.related_cache = related_cache or get_related_queries_cache()
+        self.series_store = series_store or get_series_store()
         try:
             # Initialize TrendReq with automatic language detection
             self.pytrends = TrendReq(hl='en-US', tz=360)
-            self.last_request_time = 0
-            self.rate_limit_seconds = 61  # Wait 61 seconds between requests
         except Exception as e:
             print(f"Error initializing pytrends: {e}")
             self.pytrends = None
 
     def _rate_limit(self):
         """Enforce rate limiting to avoid Google blocking"""
-        if self.last_request_time:
-            elapsed = time.time() - self.last_request_time
-            if elapsed < self.rate_limit_seconds:
-                wait_time = self.rate_limit_seconds - elapsed
-                print(f"Rate limiting: waiting {wait_time:.1f}s...")
-                time.sleep(wait_time)
-        self.last_request_time = time.time()
-
-    def fetch_daily_trends(self, country: str = 'US') -> List[Dict[str, Any]]:
+        if self.rate_limiter.try_acquire():
+            return
+
+        wait_time = self.rate_limiter.wait_time()
+        if not self.blocking:
+            raise RateLimitExceeded(self.rate_limiter.name, wait_time)
+
+        print(f"Rate limiting: waiting {wait_time:.1f}s...")
+        self.rate_limiter.acquire()
+
+    def fetch_daily_trends(self, country: str = 'US', max_age: Optional[float] = None) -> List[Dict[str, Any]]:
         """
         Fetch daily trending searches (real-time trends)
 
+        The result is a snapshot shared by every user, category and process
+        for the refresh period, so Google is queried at most once per country
+        per period.
+
         Args:
             country: Country code (US, GB, IN, etc.)
+            max_age: Maximum snapshot age in seconds (defaults to DAILY_TRENDS_TTL_SECONDS)
 
         Returns:
             List of trending topics with metadata
         """
+        snapshot = self.daily_snapshots.get(country, max_age=max_age)
+        if snapshot is not None:
+            return copy.deepcopy(snapshot)
+
         if not self.pytrends:
             print("pytrends not initialized")
             return []
@@ -64,6 +110,11 @@ class TrendsDiscovery:
         try:
             self._rate_limit()
 
+            # Another process may have refreshed the snapshot while we waited
+            snapshot = self.daily_snapshots.get(country, max_age=max_age)
+            if snapshot is not None:
+                return copy.deepcopy(snapshot)
+
             # Get trending searches for today
             trending_searches_df = self.pytrends.trending_searches(pn=country)
 
@@ -84,9 +135,13 @@ class TrendsDiscovery:
                     }
                 })
 
+            self.daily_snapshots.put(country, trends)
+
             print(f"✅ Fetched {len(trends)} daily trending searches for {country}")
-            return trends
+            return copy.deepcopy(trends)
 
+        except RateLimitExceeded:
+            raise
         except Exception as e:
             print(f"Error fetching daily trends: {e}")
             return []
@@ -107,7 +162,8 @@ class TrendsDiscovery:
             return []
 
         try:
-            # Get trending searches first (no category filter in trending_searches)
+            # Get trending searches first (no category filter in trending_searches);
+            # every category reuses the same daily snapshot
             trends = self.fetch_daily_trends()
 
             # If we want category-specific trends, we need to analyze interest
@@ -121,6 +177,8 @@ class TrendsDiscovery:
 
             return trends[:max_results]
 
+        except RateLimitExceeded:
+            raise
         except Exception as e:
             print(f"Error fetching trending topics: {e}")
             return []
@@ -129,8 +187,12 @@ class TrendsDiscovery:
         """
         Fetch interest over time for specific keywords
 
+        Up to 5 keywords are fetched in one request. Longer lists are fetched
+        in anchored batches (see fetch_interest_over_time_batched) so every
+        keyword is kept and values stay comparable.
+
         Args:
-            keywords: List of keywords to analyze (max 5)
+            keywords: List of keywords to analyze
             timeframe: Timeframe for analysis ('today 3-m', 'today 12-m', 'today 5-y', etc.)
 
         Returns:
@@ -143,38 +205,35 @@ class TrendsDiscovery:
         if not keywords:
             return {}
 
-        # Limit to 5 keywords (pytrends limitation)
-        keywords = keywords[:5]
-
-        try:
-            self._rate_limit()
+        if len(keywords) > self.MAX_KEYWORDS_PER_REQUEST:
+            batched = self.fetch_interest_over_time_batched(keywords, timeframe=timeframe)
+            if not batched:
+                return {}
 
-            # Build payload
-            self.pytrends.build_payload(
-                kw_list=keywords,
-                timeframe=timeframe,
-                geo='US'
-            )
+            return {
+                'keywords': batched['keywords'],
+                'timeframe': timeframe,
+                'stats': {
+                    keyword: self._interest_stats(batched['values'][row])
+                    for row, keyword in enumerate(batched['keywords'])
+                },
+                'anchor': batched['anchor'],
+                'fetched_at': batched['fetched_at']
+            }
 
-            # Get interest over time
-            interest_df = self.pytrends.interest_over_time()
+        try:
+            interest_df = self._fetch_interest_frame(keywords, timeframe)
 
             if interest_df.empty:
                 print(f"No interest data found for keywords: {keywords}")
                 return {}
 
-            # Calculate average interest for each keyword
+            # Calculate average interest for each keyword and keep the raw series
             keyword_stats = {}
             for keyword in keywords:
                 if keyword in interest_df.columns:
-                    values = interest_df[keyword].values
-                    keyword_stats[keyword] = {
-                        'average': float(values.mean()),
-                        'max': float(values.max()),
-                        'min': float(values.min()),
-                        'current': float(values[-1]) if len(values) > 0 else 0,
-                        'trending': 'up' if len(values) > 1 and values[-1] > values[-2] else 'down'
-                    }
+                    keyword_stats[keyword] = self._interest_stats(interest_df[keyword].values)
+                    self.series_store.write(keyword, interest_df.index.values, interest_df[keyword].values)
 
             return {
                 'keywords': keywords,
@@ -183,20 +242,226 @@ class TrendsDiscovery:
                 'fetched_at': datetime.now().isoformat()
             }
 
+        except RateLimitExceeded:
+            raise
         except Exception as e:
             print(f"Error fetching interest over time: {e}")
             return {}
 
-    def fetch_related_queries(self, keyword: str) -> Dict[str, Any]:
+    def fetch_interest_over_time_batched(
+        self,
+        keywords: List[str],
+        timeframe: str = 'today 3-m',
+        anchor: Optional[str] = None,
+        geo: str = 'US'
+    ) -> Dict[str, Any]:
+        """
+        Fetch interest over time for any number of keywords on one common scale
+
+        Google scales every request to its own maximum (100), so separate
+        requests are not comparable. Keywords are fetched in groups of 4 plus
+        a shared anchor keyword, and each group is rescaled so that its anchor
+        series matches the anchor in the first group where it is not all
+        zero. The merged values are then rescaled so the overall maximum is
+        100.
+
+        Pick an anchor of moderate popularity: one that dwarfs the other
+        keywords rounds them to 0, one that is dwarfed by them rounds itself
+        to 0 and leaves its group unscalable.
+
+        Args:
+            keywords: Keywords to compare (any number)
+            timeframe: Timeframe for analysis
+            anchor: Anchor keyword included in every request (defaults to the first keyword)
+            geo: Region code
+
+        Returns:
+            Dictionary with 'keywords', 'dates' (datetime64 array), 'values'
+            (float array of shape keywords x dates), 'anchor', 'requests',
+            'unscaled' (keywords whose group could not be rescaled) and
+            'fetched_at'. Empty if nothing could be fetched.
+        """
+        if not self.pytrends:
+            print("pytrends not initialized")
+            return {}
+
+        keywords = list(dict.fromkeys(keyword for keyword in keywords if keyword))
+        if not keywords:
+            return {}
+
+        anchor = anchor or keywords[0]
+        others = [keyword for keyword in keywords if keyword != anchor]
+        group_size = self.MAX_KEYWORDS_PER_REQUEST - 1
+        groups = [others[start:start + group_size] for start in range(0, len(others), group_size)] or [[]]
+
+        dates = None
+        reference_anchor = None
+        rows: Dict[str, np.ndarray] = {}
+        unscaled: List[str] = []
+        requests = 0
+
+        try:
+            for group in groups:
+                interest_df = self._fetch_interest_frame([anchor] + group, timeframe, geo=geo)
+                requests += 1
+
+                if interest_df.empty:
+                    unscaled.extend(group)
+                    continue
+
+                if dates is None:
+                    dates = interest_df.index.values
+                else:
+                    interest_df = interest_df.reindex(dates)
+
+                frame = interest_df.fillna(0)
+                anchor_values = frame[anchor].to_numpy(dtype=float) if anchor in frame.columns else np.zeros(len(dates))
+
+                if anchor_values.sum() <= 0:
+                    # An all-zero anchor gives nothing to scale this group by
+                    rows.setdefault(anchor, anchor_values)
+                    unscaled.extend(group)
+                    scale = 1.0
+                elif reference_anchor is None:
+                    # The first group with a usable anchor sets the common scale
+                    reference_anchor = anchor_values
+                    rows[anchor] = anchor_values
+                    scale = 1.0
+                else:
+                    # Least-squares factor mapping this group's anchor onto the reference anchor
+                    scale = float(anchor_values @ reference_anchor) / float(anchor_values @ anchor_values)
+                    if scale <= 0:
+                        # The anchors never rise together, so the fit says nothing
+                        unscaled.extend(group)
+                        scale = 1.0
+
+                for keyword in group:
+                    if keyword in frame.columns:
+                        rows[keyword] = frame[keyword].to_numpy(dtype=float) * scale
+
+        except RateLimitExceeded:
+            raise
+        except Exception as e:
+            print(f"Error fetching batched interest over time: {e}")
+
+        if dates is None:
+            return {}
+
+        found = [keyword for keyword in [anchor] + others if keyword in rows]
+        values = np.vstack([rows[keyword] for keyword in found])
+
+        peak = values.max()
+        if peak > 0:
+            values = values * (100.0 / peak)
+
+        for row, keyword in enumerate(found):
+            self.series_store.write(keyword, dates, values[row], geo=geo)
+
+        print(f"✅ Fetched interest for {len(found)} keywords in {requests} request(s)")
+
+        return {
+            'keywords': found,
+            'dates': dates,
+            'values': values,
+            'anchor': anchor,
+            'timeframe': timeframe,
+            'requests': requests,
+            'unscaled': unscaled,
+            'fetched_at': datetime.now().isoformat()
+        }
+
+    def fetch_interest_series(
+        self,
+        keywords: List[str],
+        days: int = 90,
+        geo: str = 'US'
+    ) -> Dict[str, Any]:
+        """
+        Get raw interest series, fetching only what the local store is missing
+
+        Keywords whose stored series already covers the window are served
+        from disk. The rest are fetched together (in anchored batches) over
+        the smallest window covering their missing ranges plus a short overlap
+        used to rescale onto the stored data.
+
+        Args:
+            keywords: Keywords to load
+            days: Number of days back from today
+            geo: Region code
+
+        Returns:
+            Dictionary mapping keyword to (dates, values) arrays
+        """
+        resolution = resolution_for_days(days)
+        end = np.datetime64(datetime.now().replace(microsecond=0))
+        start = end - np.timedelta64(days, 'D')
+
+        missing = []
+        for keyword in keywords:
+            for range_start, range_end in self.series_store.missing_ranges(keyword, start, end, geo, resolution):
+                missing.append((keyword, range_start, range_end))
+
+        if missing and self.pytrends:
+            fetch_keywords = list(dict.fromkeys(keyword for keyword, _, _ in missing))
+            fetch_start = min(range_start for _, range_start, _ in missing)
+            fetch_end = max(range_end for _, _, range_end in missing)
+
+            # Google picks the resolution from the window length, so widen short
+            # gaps just enough to get the same resolution as the stored series
+            fetch_start = min(fetch_start, fetch_end - np.timedelta64(MIN_WINDOW_DAYS[resolution], 'D'))
+            timeframe = f"{str(fetch_start)[:10]} {str(fetch_end)[:10]}"
+            print(f"📥 Fetching interest for {len(fetch_keywords)} keyword(s) over {timeframe}")
+            self.fetch_interest_over_time_batched(fetch_keywords, timeframe=timeframe, geo=geo)
+
+        return self.series_store.read_many(keywords, geo, resolution, start, end)
+
+    def _fetch_interest_frame(self, keywords: List[str], timeframe: str, geo: str = 'US') -> pd.DataFrame:
+        """Fetch one interest_over_time payload (at most 5 keywords) through the rate limiter"""
+        self._rate_limit()
+
+        self.pytrends.build_payload(
+            kw_list=keywords,
+            timeframe=timeframe,
+            geo=geo
+        )
+
+        interest_df = self.pytrends.interest_over_time()
+        if 'isPartial' in interest_df.columns:
+            interest_df = interest_df.drop(columns=['isPartial'])
+        return interest_df
+
+    @staticmethod
+    def _interest_stats(values) -> Dict[str, Any]:
+        """Summary statistics of one keyword's interest series"""
+        values = np.asarray(values, dtype=float)
+        return {
+            'average': float(values.mean()) if len(values) > 0 else 0,
+            'max': float(values.max()) if len(values) > 0 else 0,
+            'min': float(values.min()) if len(values) > 0 else 0,
+            'current': float(values[-1]) if len(values) > 0 else 0,
+            'trending': 'up' if len(values) > 1 and values[-1] > values[-2] else 'down'
+        }
+
+    def fetch_related_queries(self, keyword: str, use_cache: bool = True) -> Dict[str, Any]:
         """
         Fetch related queries for a keyword
 
+        Results are cached per keyword for RELATED_QUERIES_TTL_SECONDS and
+        shared by every user and process.
+
         Args:
             keyword: Keyword to analyze
+            use_cache: Return a fresh cached result instead of calling Google
 
         Returns:
             Dictionary with related queries (rising and top)
         """
+        cache_key = related_queries_key(keyword)
+        if use_cache:
+            cached = self.related_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
         if not self.pytrends:
             print("pytrends not initialized")
             return {}
@@ -215,6 +480,8 @@ class TrendsDiscovery:
             related_queries = self.pytrends.related_queries()
 
             if not related_queries or keyword not in related_queries:
+                # Cache misses too, so keywords without data are not refetched
+                self.related_cache.put(cache_key, {})
                 return {}
 
             result = {
@@ -235,8 +502,11 @@ class TrendsDiscovery:
                 if not top_df.empty:
                     result['top'] = top_df['query'].head(10).tolist()
 
+            self.related_cache.put(cache_key, result)
             return result
 
+        except RateLimitExceeded:
+            raise
         except Exception as e:
             print(f"Error fetching related queries: {e}")
             return {}
@@ -268,19 +538,20 @@ class TrendsDiscovery:
 
             all_trends.extend(trends)
 
-            # Rate limit between categories
-            if len(categories) > 1:
-                time.sleep(2)  # Small delay between categories
-
         print(f"✅ Total trends discovered: {len(all_trends)}")
         return all_trends
 
-    def enrich_trend_with_related(self, trend: Dict[str, Any]) -> Dict[str, Any]:
+    def enrich_trend_with_related(self, trend: Dict[str, Any], blocking: bool = False) -> Dict[str, Any]:
         """
         Enrich a trend with related queries
 
+        Uses the related-queries cache. On a miss the keyword is queued for
+        background enrichment (higher-ranked trends first) and the trend is
+        returned unchanged, unless blocking is True.
+
         Args:
             trend: Trend dictionary to enrich
+            blocking: Fetch from Google on a cache miss instead of queueing
 
         Returns:
             Enriched trend dictionary
@@ -289,18 +560,68 @@ class TrendsDiscovery:
             return trend
 
         keyword = trend['title']
-        related = self.fetch_related_queries(keyword)
+        if blocking:
+            related = self.fetch_related_queries(keyword)
+        else:
+            related = self.related_cache.get(related_queries_key(keyword))
+            if related is None:
+                from utils.enrichment_queue import get_enrichment_queue
+                rank = trend.get('metadata', {}).get('rank') or 1000
+                get_enrichment_queue().submit(keyword, priority=rank)
+                return trend
+
+        return apply_related_queries(trend, related)
+
+
+# Shortest window (in days) for which Google returns each resolution
+MIN_WINDOW_DAYS = {'hour': 1, 'day': 8, 'week': 270}
+
+
+def resolution_for_days(days: int) -> str:
+    """Resolution Google returns for a window of the given length"""
+    if days <= 7:
+        return 'hour'
+    if days <= 269:
+        return 'day'
+    return 'week'
+
+
+def related_queries_key(keyword: str) -> str:
+    """Cache key for a keyword's related queries"""
+    return keyword.strip().lower()
+
+
+def apply_related_queries(trend: Dict[str, Any], related: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Add related queries to a trend's metadata and keywords
+
+    Args:
+        trend: Trend dictionary to enrich
+        related: Result of TrendsDiscovery.fetch_related_queries
+
+    Returns:
+        Enriched trend dictionary
+    """
+    if related:
+        # Add related queries to metadata
+        if 'metadata' not in trend:
+            trend['metadata'] = {}
+
+        trend['metadata']['related_rising'] = related.get('rising', [])
+        trend['metadata']['related_top'] = related.get('top', [])
+
+        # Update keywords list with related queries
+        all_related = related.get('rising', []) + related.get('top', [])
+        trend['keywords'] = list(set(trend.get('keywords', []) + all_related[:5]))
 
-        if related:
-            # Add related queries to metadata
-            if 'metadata' not in trend:
-                trend['metadata'] = {}
+    return trend
 
-            trend['metadata']['related_rising'] = related.get('rising', [])
-            trend['metadata']['related_top'] = related.get('top', [])
 
-            # Update keywords list with related queries
-            all_related = related.get('rising', []) + related.get('top', [])
-            trend['keywords'] = list(set(trend.get('keywords', []) + all_related[:5]))
+_related_queries_cache = None
 
-        return trend
+def get_related_queries_cache() -> SnapshotStore:
+    """Get the related-queries cache shared by every TrendsDiscovery instance"""
+    global _related_queries_cache
+    if _related_queries_cache is None:
+        _related_queries_cache = SnapshotStore('related_queries', TrendsDiscovery.RELATED_QUERIES_TTL_SECONDS)
+    return _related_queries_cache